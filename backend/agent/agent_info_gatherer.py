@@ -3,12 +3,40 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from tools.tool_calling import (
     search_document_library_mcp_tool_def, 
     web_search_mcp_tool_def,
-    call_mcp_tools
+    call_mcp_tools,
+    format_output_for_llm,
+    format_output_for_log
 )
+from tools.search_document_library import search_document_library
+from tools.web_search import web_search
+from services.openai_service import bind_tools_cached
+from services.metrics import timed
 
-async def gather_information(user_prompt_text: str, llm, async_log_callback=None, company_context: str = "", tenant_id: str = ""):
+async def prefetch_information(user_prompt_text: str, tenant_id: str = "", async_log_callback=None) -> str:
+    """
+    Speculatively run the document-library and web searches on the raw prompt, before the
+    info agent's first LLM call. Returns the successful results formatted for the LLM.
+    """
+    doc_result, web_result = await asyncio.gather(
+        asyncio.to_thread(search_document_library, user_prompt_text, tenant_id),
+        asyncio.to_thread(web_search, user_prompt_text),
+        return_exceptions=True
+    )
+
+    sections = []
+    for tool_name, output in (("search_document_library", doc_result), ("web_search", web_result)):
+        if not isinstance(output, dict) or "error" in output:
+            continue
+        if async_log_callback:
+            await async_log_callback(format_output_for_log(tool_name, output), event_type="tool")
+        sections.append(f"Results from {tool_name} for the original request:\n{format_output_for_llm(tool_name, output)}")
+
+    return "\n\n".join(sections)
+
+async def gather_information(user_prompt_text: str, llm, async_log_callback=None, company_context: str = "", tenant_id: str = "", prefetched_info: str = ""):
     """
     Agent 1: Gather comprehensive information relevant to the user's request.
+    prefetched_info holds speculative search results; when present the first round can usually skip tool calls.
     """
     async def _log(message):
         if async_log_callback:
@@ -18,7 +46,8 @@ async def gather_information(user_prompt_text: str, llm, async_log_callback=None
 
     await _log("\n=== PHASE 1: INFORMATION GATHERING ===")
     
-    llm_with_info_tools = llm.bind_tools(
+    llm_with_info_tools = bind_tools_cached(
+        llm,
         [search_document_library_mcp_tool_def, web_search_mcp_tool_def],
         tool_choice="auto"
     )
@@ -40,6 +69,15 @@ async def gather_information(user_prompt_text: str, llm, async_log_callback=None
     """
 
     info_human_message = f"Please gather information for this request: '{user_prompt_text}'"
+
+    if prefetched_info:
+        info_human_message += f"""
+
+        Preliminary searches have already been run on this request. If these results cover the key facts,
+        provide your summary now without calling tools. Only call tools to fill specific gaps.
+
+        {prefetched_info}
+        """
     
     messages = [SystemMessage(content=info_system_message), HumanMessage(content=info_human_message)]
     
@@ -50,7 +88,8 @@ async def gather_information(user_prompt_text: str, llm, async_log_callback=None
         for round_num in range(max_rounds):
             await _log(f"Round {round_num + 1}/{max_rounds}: Calling model...")
             
-            response = await llm_with_info_tools.ainvoke(messages)
+            async with timed("llm", "info.gather"):
+                response = await llm_with_info_tools.ainvoke(messages)
             
             if not response.tool_calls:
                 await _log("Model finished gathering information.")
@@ -63,12 +102,13 @@ async def gather_information(user_prompt_text: str, llm, async_log_callback=None
             tool_messages, _ = await call_mcp_tools(response, async_log_callback, tenant_id)
             messages.extend(tool_messages)
 
-            follow_up_response = await llm_with_info_tools.ainvoke(messages + [
-                HumanMessage(content=f"""
-                             Decide if you have gathered enough information. 
-                             If you have, provide a detailed summary of your findings and do not call anymore tools.
-                             List all of the KEY FACTS, CONCEPTS, AND NUMBERS.
-                             """)])
+            async with timed("llm", "info.summarize"):
+                follow_up_response = await llm_with_info_tools.ainvoke(messages + [
+                    HumanMessage(content=f"""
+                                 Decide if you have gathered enough information. 
+                                 If you have, provide a detailed summary of your findings and do not call anymore tools.
+                                 List all of the KEY FACTS, CONCEPTS, AND NUMBERS.
+                                 """)])
             
             return follow_up_response
 
@@ -1,6 +1,8 @@
 import asyncio
 from langchain_core.messages import SystemMessage, HumanMessage
 from tools.tool_calling import generate_image_mcp_tool_def, call_mcp_tools, image_web_search_mcp_tool_def, create_diagram_mcp_tool_def
+from services.openai_service import bind_tools_cached
+from services.metrics import timed
 
 async def create_media_for_post(post_content: str, modality: str, llm, async_log_callback=None, tenant_id: str = "", image_description: str = ""):
     """
@@ -15,7 +17,7 @@ async def create_media_for_post(post_content: str, modality: str, llm, async_log
     await _log(f"\n=== PHASE 3: VISUAL CONTENT CREATION FOR {modality.upper()} ===")
     
     # Bind image generation and diagram creation tools
-    llm_with_image_tool = llm.bind_tools([image_web_search_mcp_tool_def, create_diagram_mcp_tool_def, generate_image_mcp_tool_def], tool_choice="auto")
+    llm_with_image_tool = bind_tools_cached(llm, [image_web_search_mcp_tool_def, create_diagram_mcp_tool_def, generate_image_mcp_tool_def], tool_choice="auto")
     
     # Get platform-specific visual content creation instructions
     system_message = get_image_system_message(modality)
@@ -37,7 +39,8 @@ async def create_media_for_post(post_content: str, modality: str, llm, async_log
     
     try:
         await _log(f"Invoking LLM for {modality} visual content creation...")
-        response = await asyncio.wait_for(llm_with_image_tool.ainvoke(messages), timeout=60.0)
+        async with timed("llm", "multimodal.create"):
+            response = await asyncio.wait_for(llm_with_image_tool.ainvoke(messages), timeout=60.0)
         
         # Track generated images/diagrams
         generated_images = []
@@ -2,6 +2,8 @@ import asyncio
 import uuid
 from langchain_core.messages import SystemMessage, HumanMessage
 from tools.tool_calling import (search_linkedin_posts_mcp_tool_def, search_blog_posts_mcp_tool_def, call_mcp_tools)
+from services.openai_service import bind_tools_cached, with_structured_output_cached
+from services.metrics import timed
 
 
 # AGENT 2: Create viral social media content using modality-specific tools and strategies.
@@ -20,7 +22,7 @@ async def create_viral_post(user_prompt_text: str, gathered_info: str, llm, asyn
     tools = get_tools_for_modality(modality)
     await _log(f"Using {len(tools)} {modality}-optimized tools for viral content creation")
     
-    llm_with_tools = llm.bind_tools(tools, tool_choice="auto")
+    llm_with_tools = bind_tools_cached(llm, tools, tool_choice="auto")
     
     # Get modality-specific system message
     system_message = get_system_message_for_modality(modality, company_context)
@@ -49,7 +51,8 @@ async def create_viral_post(user_prompt_text: str, gathered_info: str, llm, asyn
     ]
     
     # Phase 1 – research
-    response = await llm_with_tools.ainvoke(messages)
+    async with timed("llm", "compose.research"):
+        response = await llm_with_tools.ainvoke(messages)
     messages.append(response)
 
     # Handle any tool calls returned from the first pass
@@ -77,7 +80,7 @@ async def create_viral_post(user_prompt_text: str, gathered_info: str, llm, asyn
         }
     }
 
-    llm_structured = llm.with_structured_output(structured_schema)
+    llm_structured = with_structured_output_cached(llm, structured_schema)
 
     # Add final instruction for structured output
     messages.append(HumanMessage(content=f"""
@@ -87,11 +90,36 @@ async def create_viral_post(user_prompt_text: str, gathered_info: str, llm, asyn
         IMPORTANT: Format the content and image in tandem based on the provided examples of successful {modality} posts. They should complement each other and not be repetitive.
         """))
 
-    structured_response = await llm_structured.ainvoke(messages)
+    async with timed("llm", "compose.structured"):
+        if async_log_callback:
+            # Stream the post text to the caller as the model writes it
+            structured_response = await _stream_structured_response(llm_structured, messages, async_log_callback)
+        else:
+            structured_response = await llm_structured.ainvoke(messages)
 
     await _log(f"{modality.title()} content creation complete.")
     return structured_response
 
+async def _stream_structured_response(llm_structured, messages, async_log_callback):
+    """
+    Stream the structured output, forwarding newly written post_content text as token events.
+    Returns the final parsed dictionary.
+    """
+    structured_response = {}
+    emitted_chars = 0
+
+    async for partial in llm_structured.astream(messages):
+        if not isinstance(partial, dict):
+            continue
+
+        structured_response = partial
+        post_content = partial.get("post_content") or ""
+        if len(post_content) > emitted_chars:
+            await async_log_callback(post_content[emitted_chars:], event_type="token")
+            emitted_chars = len(post_content)
+
+    return structured_response
+
 def get_tools_for_modality(modality: str):
     """
     Get the appropriate toolset for the specified content modality.
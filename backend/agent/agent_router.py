@@ -2,7 +2,8 @@ import asyncio
 import json
 from typing import Dict, Any, Optional
 from langchain_core.messages import SystemMessage, HumanMessage
-from services.openai_service import initialize_llm
+from services.openai_service import initialize_llm, bind_tools_cached
+from services.metrics import timed
 from agent.agent_calling import AGENT_REGISTRY
 from agent.context import get_company_context
 
@@ -57,7 +58,7 @@ async def route_followup_query(
     await _log(f"Routing follow-up query: {followup_query[:100]}...")
     
     try:
-        # Initialize router LLM
+        # Shared process-wide router LLM
         router_llm = initialize_llm()
         
         # Get company context
@@ -98,8 +99,9 @@ async def route_followup_query(
         ]
         
         # Get router decision
-        router_llm_with_tools = router_llm.bind_tools(build_router_functions(), tool_choice="auto")
-        response = await router_llm_with_tools.ainvoke(messages)
+        router_llm_with_tools = bind_tools_cached(router_llm, build_router_functions(), tool_choice="auto")
+        async with timed("llm", "router.dispatch"):
+            response = await router_llm_with_tools.ainvoke(messages)
         
         if not response.tool_calls:
             await _log("Router did not call any tools, treating as compose request")
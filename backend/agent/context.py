@@ -1,30 +1,50 @@
-import asyncio
-from services.supabase_service import supabase
+import os
+from services.data_access import fetch_tenant
+from services.cache import AsyncTTLCache
+from services.generation_cache import generation_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+COMPANY_CONTEXT_COLUMNS = 'context_description, target_audience, market_need, industry, core_value_prop'
+
+# Company context rarely changes and is read several times per request, so keep it per tenant
+company_context_cache = AsyncTTLCache(
+    name="company_context",
+    ttl_seconds=float(os.getenv("COMPANY_CONTEXT_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("COMPANY_CONTEXT_CACHE_SIZE", "1024")),
+)
+
 async def get_company_context(tenant_id: str = "dummy_tenant_id") -> str:
-   
+
     try:
-        # Query the tenants table for the context_description
-        response = supabase.table('tenants').select('context_description, target_audience, market_need, industry, core_value_prop').eq('id', tenant_id).execute()
-        
-        if response.data and len(response.data) > 0:
-            lines = []
-            lines.append("Here is helpful context about the core value proposition of the company: ")
-            lines.append(str(response.data[0].get('context_description', '')))
-            lines.append("Target audience: " + str(response.data[0].get('target_audience', '')))
-            lines.append("Market need: " + str(response.data[0].get('market_need', '')))
-            lines.append("Industry: " + str(response.data[0].get('industry', '')))
-            lines.append("Core value prop: " + str(response.data[0].get('core_value_prop', '')))
-            return "\n".join(lines)
-        else:
-            logger.warning(f"No tenant found with ID")
-            return ""
-            
+        return await company_context_cache.get_or_load(tenant_id, lambda: _load_company_context(tenant_id))
+
     except Exception as e:
         logger.error(f"Error fetching company context for tenant")
         return ""
 
+async def _load_company_context(tenant_id: str) -> str:
+    # Query the tenants table for the context_description
+    tenant = await fetch_tenant(tenant_id, columns=COMPANY_CONTEXT_COLUMNS)
+
+    if tenant:
+        lines = []
+        lines.append("Here is helpful context about the core value proposition of the company: ")
+        lines.append(str(tenant.get('context_description', '')))
+        lines.append("Target audience: " + str(tenant.get('target_audience', '')))
+        lines.append("Market need: " + str(tenant.get('market_need', '')))
+        lines.append("Industry: " + str(tenant.get('industry', '')))
+        lines.append("Core value prop: " + str(tenant.get('core_value_prop', '')))
+        return "\n".join(lines)
+    else:
+        logger.warning(f"No tenant found with ID")
+        return ""
+
+def invalidate_company_context(tenant_id: str):
+    """Drop the cached context (and generations built on it) so the next read reflects an update."""
+    company_context_cache.invalidate(tenant_id)
+    generation_cache.invalidate_tenant(tenant_id)
 
+def get_company_context_cache_stats() -> dict:
+    return company_context_cache.stats()
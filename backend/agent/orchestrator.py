@@ -1,15 +1,20 @@
 import asyncio
 from datetime import datetime
 from services.openai_service import initialize_llm
-from agent.agent_info_gatherer import gather_information
+from agent.agent_info_gatherer import gather_information, prefetch_information
 from agent.agent_post_creator import create_viral_post
 from agent.agent_multimodal_creator import create_media_for_post
 from agent.context import get_company_context
+from services.embeddings_service import shared_embeddings
+from services.generation_cache import generation_cache, context_version, GENERATION_CACHE_ENABLED
 
-async def generate_post_for_prompt(user_prompt_text: str, async_log_callback: callable = None, modality: str = "linkedin", tenant_id: str = "", generate_image: bool = False):
+async def generate_post_for_prompt(user_prompt_text: str, async_log_callback: callable = None, modality: str = "linkedin", tenant_id: str = "", generate_image: bool = False, speculative_retrieval: bool = False, use_cache: bool = True):
     """
     Main orchestration function for generating social media content.
-   "
+    With speculative_retrieval, document and web searches on the raw prompt start alongside the
+    company context fetch, and their results seed the information-gathering agent.
+    With use_cache, a near-identical earlier prompt for the same tenant and modality returns its
+    stored result, and a similar one reuses its gathered information (skipping phase 1).
     """
 
     # Only run if tenant_id is provided
@@ -23,7 +28,7 @@ async def generate_post_for_prompt(user_prompt_text: str, async_log_callback: ca
             print(f"[LOG] {message}") 
 
     try:
-        # Initialize the LLM
+        # Shared process-wide LLM client
         llm = initialize_llm()
         await _log("GPT-4o LLM initialized successfully with Responses API")
         
@@ -34,11 +39,46 @@ async def generate_post_for_prompt(user_prompt_text: str, async_log_callback: ca
         current_date = datetime.now().strftime("%B %d, %Y")
         general_context = f"You are a marketing agent for a company. The current date is {current_date}. "
         
-        company_context = await get_company_context(tenant_id)
+        use_cache = use_cache and GENERATION_CACHE_ENABLED and shared_embeddings is not None
+        prompt_embedding = None
+
+        async def _embed_prompt():
+            if not use_cache:
+                return None
+            try:
+                return await asyncio.to_thread(shared_embeddings.embed_query, user_prompt_text)
+            except Exception as e:
+                print(f"[orchestrator WARNING] Generation cache skipped, prompt embedding failed: {e}")
+                return None
+
+        prefetched_info = ""
+        if speculative_retrieval:
+            await _log("Running speculative document and web search...")
+            company_context, prefetched_info, prompt_embedding = await asyncio.gather(
+                get_company_context(tenant_id),
+                prefetch_information(user_prompt_text, tenant_id, async_log_callback),
+                _embed_prompt()
+            )
+        else:
+            company_context, prompt_embedding = await asyncio.gather(get_company_context(tenant_id), _embed_prompt())
+        version = context_version(company_context)
         company_context = general_context + company_context
-        
-        # Agent 1: Information Gathering
-        gathered_info = await gather_information(user_prompt_text, llm, async_log_callback, company_context, tenant_id)
+
+        cache_status, cached_result, gathered_info = "miss", None, ""
+        if prompt_embedding is not None:
+            cache_status, cached_result, gathered_info = generation_cache.lookup(
+                tenant_id, modality, generate_image, version, prompt_embedding
+            )
+        if cache_status == "hit":
+            await _log("Returning cached generation for a near-identical prompt")
+            cached_result["cache"] = "hit"
+            return cached_result
+
+        # Agent 1: Information Gathering (skipped on a warm start from a similar cached prompt)
+        if cache_status == "warm":
+            await _log("Reusing gathered information from a similar cached prompt")
+        else:
+            gathered_info = await gather_information(user_prompt_text, llm, async_log_callback, company_context, tenant_id, prefetched_info)
         
         # Agent 2: Viral Post Creation (returns structured response)
         post_response = await create_viral_post(user_prompt_text, gathered_info, llm, async_log_callback, company_context, modality, tenant_id)
@@ -60,6 +100,10 @@ async def generate_post_for_prompt(user_prompt_text: str, async_log_callback: ca
             "modality": modality
         }
         
+        if prompt_embedding is not None and post_content:
+            generation_cache.store(tenant_id, modality, generate_image, version, prompt_embedding, result, gathered_info)
+        result["cache"] = cache_status
+        
         return result
 
     except Exception as llm_error:
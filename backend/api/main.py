@@ -1,6 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from api.routes import user_queries, uploads, auth, company_data
+from agent.context import get_company_context_cache_stats
+from services.embeddings_service import get_embedding_cache_stats
+from services.search_cache import get_search_cache_stats
+from services.job_queue import generation_job_queue, ingestion_job_queue
+from services.vector_index import viral_content_index, get_viral_index_stats
+from services.lexical_index import get_lexical_index_stats
+from services.signed_urls import get_signed_url_cache_stats
+from services.generation_cache import get_generation_cache_stats
+from services.metrics import register_stats_collector, render_prometheus
+from infra.pdf_extraction import shutdown_extraction_pool
 import os
 
 app = FastAPI()
@@ -27,10 +38,36 @@ app.include_router(user_queries.router, prefix="/queries", tags=["queries"])
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(company_data.router, prefix="/api", tags=["company_data"])
 
+# Component counters exposed as gauges alongside the phase latency histograms
+register_stats_collector("audienceai_company_context_cache", get_company_context_cache_stats)
+register_stats_collector("audienceai_embedding_cache", get_embedding_cache_stats)
+register_stats_collector("audienceai_search_cache", get_search_cache_stats)
+register_stats_collector("audienceai_generation_jobs", generation_job_queue.stats)
+register_stats_collector("audienceai_ingestion_jobs", ingestion_job_queue.stats)
+register_stats_collector("audienceai_viral_index", get_viral_index_stats)
+register_stats_collector("audienceai_lexical_index", get_lexical_index_stats)
+register_stats_collector("audienceai_signed_url_cache", get_signed_url_cache_stats)
+register_stats_collector("audienceai_generation_cache", get_generation_cache_stats)
+
+@app.on_event("startup")
+async def load_viral_content_index():
+    # Example searches use the RPC until the local replica is loaded
+    await viral_content_index.start()
+
+@app.on_event("shutdown")
+async def stop_viral_content_index():
+    await viral_content_index.stop()
+    shutdown_extraction_pool()
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 @app.get("/ping")
 async def ping():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: per-phase latency histograms and cache/queue gauges."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field, validator
-from services.supabase_service import supabase
+from services.data_access import tenant_exists
 import uuid
 import logging
 
@@ -36,9 +36,7 @@ async def signin(request: SignInRequest):
         logger.info(f"Attempting signin for tenant_id: {request.tenant_id}")
         
         # Query the tenants table to check if the UUID exists
-        response = supabase.table('tenants').select('id').eq('id', request.tenant_id).execute()
-        
-        if not response.data:
+        if not await tenant_exists(request.tenant_id):
             logger.warning(f"Invalid tenant_id attempted: {request.tenant_id}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from agent.context import get_company_context
-from services.supabase_service import supabase
+from agent.context import get_company_context, invalidate_company_context, get_company_context_cache_stats
+from services.data_access import fetch_tenant, update_tenant
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,10 +20,9 @@ async def get_company_data(tenant_id: str = "dummy_tenant_id"):
     """Get company data from tenants table"""
     try:
         # Query the tenants table for company information
-        response = supabase.table('tenants').select('context_description, target_audience, market_need, industry, core_value_prop').eq('id', tenant_id).execute()
+        company_data = await fetch_tenant(tenant_id, columns='context_description, target_audience, market_need, industry, core_value_prop')
         
-        if response.data and len(response.data) > 0:
-            company_data = response.data[0]
+        if company_data:
             return {
                 "success": True,
                 "data": {
@@ -69,15 +68,23 @@ async def update_company_data(data: CompanyDataUpdate, tenant_id: str = "dummy_t
             }
 
         # Update the tenants table
-        response = supabase.table('tenants').update(update_data).eq('id', tenant_id).execute()
+        updated_rows = await update_tenant(tenant_id, update_data)
         
-        if response.data and len(response.data) > 0:
+        # Agents read the cached context, so drop it even if the update returned no rows
+        invalidate_company_context(tenant_id)
+
+        if updated_rows:
             return {
                 "success": True,
                 "message": "Company data updated successfully",
-                "data": response.data[0]
+                "data": updated_rows[0]
             }
             
     except Exception as e:
         logger.error(f"Error updating company data: {e}")
-        raise HTTPException(status_code=500, detail="Failed to update company data") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to update company data")
+
+@router.get("/cache-stats")
+async def get_company_context_cache_metrics():
+    """Hit/miss counters for the per-tenant company context cache"""
+    return get_company_context_cache_stats()
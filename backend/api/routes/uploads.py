@@ -1,10 +1,13 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, status, Form
+from fastapi import APIRouter, File, UploadFile, HTTPException, status, Form, Query
 from fastapi.responses import JSONResponse
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
+import asyncio
 import io
 import uuid
 from pydantic import BaseModel
-from infra.pdf_uploader import process_and_add_pdf
+from api.streaming import drain_event_queue, sse_response
+from infra.pdf_uploader import process_and_add_pdf_async
+from services.job_queue import ingestion_job_queue, QueueFullError
 
 router = APIRouter()
 
@@ -13,16 +16,69 @@ class DocumentUploadResponse(BaseModel):
     message: str
     filename: str
     chunks_created: Optional[int] = None
+    document_id: Optional[str] = None
+
+class IngestionJobResponse(BaseModel):
+    filename: str
+    accepted: bool
+    message: str
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+    status_url: Optional[str] = None
+    events_url: Optional[str] = None
+
+class IngestionJobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "succeeded", "failed"
+    filename: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = {}  # pages_extracted, chunks_created, chunks_embedded, chunks_reused, rows_inserted, ...
+    result: Optional[DocumentUploadResponse] = None
+    error: Optional[str] = None
 
 class DocumentListResponse(BaseModel):
     documents: List[dict]
     total_count: int
 
 
+def _upload_response(filename: str, success: bool, message: str, details: Dict[str, Any]) -> DocumentUploadResponse:
+    return DocumentUploadResponse(
+        success=success,
+        message=message,
+        filename=filename,
+        chunks_created=details.get("chunks_created") if success else None,
+        document_id=details.get("document_id")
+    )
+
+
+async def _run_ingestion_job(job, filename: str, file_content: bytes, tenant_id: str) -> Dict[str, Any]:
+    """Ingest one uploaded file inside a job worker, publishing stage counters as progress events."""
+    loop = asyncio.get_running_loop()
+
+    def on_progress(snapshot: Dict[str, Any]):
+        # Called from the ingestion pipeline threads; job events must be published on the loop
+        loop.call_soon_threadsafe(lambda: job.update_progress(**snapshot))
+
+    success, message, details = await process_and_add_pdf_async(file_content, filename, tenant_id, on_progress)
+    job.update_progress(**details)
+    if not success:
+        raise RuntimeError(message)
+    return _upload_response(filename, success, message, details).dict()
+
+
 @router.post("/upload-multiple", response_model=List[DocumentUploadResponse])
-async def upload_multiple_documents(files: List[UploadFile] = File(...), tenant_id: str = Form(...)):
+async def upload_multiple_documents(
+    files: List[UploadFile] = File(...),
+    tenant_id: str = Form(...),
+    async_mode: bool = Query(False, alias="async", description="Queue ingestion jobs and return 202 with job ids")
+):
     """
     Upload and process multiple PDF documents.
+    With ?async=true each accepted file becomes a background ingestion job and the response
+    (202) lists the job ids; poll GET /uploads/jobs/{job_id} or stream GET /uploads/jobs/{job_id}/events
+    for per-file progress.
     """
 
     try:
@@ -40,17 +96,19 @@ async def upload_multiple_documents(files: List[UploadFile] = File(...), tenant_
             detail="Maximum 10 files allowed per batch upload"
         )
     
-    results = []
+    # Validate and read every file first; results keep the order of the uploaded files
+    results: List[Optional[DocumentUploadResponse]] = [None] * len(files)
+    accepted = []
     
-    for file in files:
+    for position, file in enumerate(files):
         try:
             # Validate file type
             if not file.filename.lower().endswith('.pdf'):
-                results.append(DocumentUploadResponse(
+                results[position] = DocumentUploadResponse(
                     success=False,
                     message="Only PDF files are supported",
                     filename=file.filename
-                ))
+                )
                 continue
             
             # Read file content
@@ -59,49 +117,139 @@ async def upload_multiple_documents(files: List[UploadFile] = File(...), tenant_
             # Validate file size
             MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
             if len(file_content) > MAX_FILE_SIZE:
-                results.append(DocumentUploadResponse(
+                results[position] = DocumentUploadResponse(
                     success=False,
                     message="File size exceeds 10MB limit",
                     filename=file.filename
-                ))
+                )
                 continue
             
             if len(file_content) == 0:
-                results.append(DocumentUploadResponse(
+                results[position] = DocumentUploadResponse(
                     success=False,
                     message="Empty file",
                     filename=file.filename
-                ))
+                )
                 continue
             
-            # Process the PDF with tenant_id
-            success, message = process_and_add_pdf(file_content, file.filename, tenant_id.strip())
-            
-            chunks_created = None
-            if success:
-                try:
-                    if "chunks" in message:
-                        chunks_created = int(message.split("as ")[1].split(" chunks")[0])
-                except:
-                    pass
-            
-            results.append(DocumentUploadResponse(
-                success=success,
-                message=message,
-                filename=file.filename,
-                chunks_created=chunks_created
-            ))
+            accepted.append((position, file.filename, file_content))
             
         except Exception as e:
-            results.append(DocumentUploadResponse(
+            results[position] = DocumentUploadResponse(
                 success=False,
                 message=f"Error processing file: {str(e)}",
                 filename=file.filename
-            ))
+            )
+    
+    if async_mode:
+        return await _submit_ingestion_jobs(files, results, accepted, tenant_id.strip())
+    
+    async def process(position: int, filename: str, file_content: bytes):
+        try:
+            # Extract, embed, insert and upload on the bounded ingest executor, off the event loop
+            success, message, details = await process_and_add_pdf_async(file_content, filename, tenant_id.strip())
+            results[position] = _upload_response(filename, success, message, details)
+            
+        except Exception as e:
+            results[position] = DocumentUploadResponse(
+                success=False,
+                message=f"Error processing file: {str(e)}",
+                filename=filename
+            )
+    
+    # Files are processed concurrently, up to INGEST_MAX_CONCURRENT_FILES at a time per worker
+    await asyncio.gather(*(process(*item) for item in accepted))
     
     return results
 
 
+async def _submit_ingestion_jobs(files: List[UploadFile], results: List[Optional[DocumentUploadResponse]],
+                                 accepted: list, tenant_id: str) -> JSONResponse:
+    """Queue one ingestion job per accepted file; rejected files keep their validation message."""
+    jobs: List[Optional[IngestionJobResponse]] = [
+        IngestionJobResponse(filename=result.filename, accepted=False, message=result.message)
+        if result is not None else None
+        for result in results
+    ]
+    
+    for position, filename, file_content in accepted:
+        try:
+            job = await ingestion_job_queue.submit(
+                "ingestion",
+                lambda job, filename=filename, file_content=file_content: _run_ingestion_job(job, filename, file_content, tenant_id),
+                params={"filename": filename, "tenant_id": tenant_id}
+            )
+        except QueueFullError as e:
+            jobs[position] = IngestionJobResponse(filename=filename, accepted=False, message=str(e))
+            continue
+        
+        jobs[position] = IngestionJobResponse(
+            filename=filename,
+            accepted=True,
+            message="Ingestion job queued",
+            job_id=job.id,
+            status=job.status,
+            status_url=f"/uploads/jobs/{job.id}",
+            events_url=f"/uploads/jobs/{job.id}/events"
+        )
+    
+    return JSONResponse(
+        content=[job.dict() for job in jobs],
+        status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.get("/jobs/metrics")
+async def get_ingestion_job_metrics():
+    """
+    Queue depth, running ingestions and throughput counters for the ingestion worker pool.
+    """
+    return ingestion_job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobStatusResponse)
+async def get_ingestion_job(job_id: str):
+    """
+    Poll an ingestion job: per-stage progress while it runs, the upload result once it has succeeded.
+    """
+    job = ingestion_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+    return IngestionJobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        filename=job.params.get("filename", ""),
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        progress=job.progress,
+        result=job.result,
+        error=job.error
+    )
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ingestion_job_events(job_id: str):
+    """
+    Stream an ingestion job's progress events over SSE, replaying anything published before the client connected.
+    """
+    job = ingestion_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        subscriber = job.subscribe()
+        try:
+            async for frame in drain_event_queue(subscriber):
+                yield frame
+        finally:
+            # Disconnecting only stops the stream; ingestion keeps running for later polling
+            job.unsubscribe(subscriber)
+
+    return sse_response(event_stream())
+
+
 @router.delete("/delete/{document_id}")
 async def delete_document(document_id: str):
     """
@@ -8,6 +8,10 @@ import logging
 import uuid
 from agent.orchestrator import generate_post_for_prompt
 from agent.agent_router import route_followup_query
+from api.streaming import drain_event_queue, sse_response
+from services.job_queue import generation_job_queue, QueueFullError
+from services.metrics import start_request_timings, summarize_timings
+from datetime import datetime
 import time
 
 
@@ -23,6 +27,8 @@ class QueryRequest(BaseModel):
     stream: Optional[bool] = Field(default=False, description="Whether to stream the response")
     tenant_id: str = Field(..., description="Tenant ID for company context (required UUID)")
     generate_image: Optional[bool] = Field(default=False, description="Whether to generate an image for the post")
+    speculative_retrieval: Optional[bool] = Field(default=False, description="Run document and web searches on the raw prompt before the first LLM call")
+    use_cache: Optional[bool] = Field(default=True, description="Allow returning or warm-starting from a cached generation for a near-identical prompt")
     
     @validator('tenant_id')
     def validate_tenant_id(cls, v):
@@ -71,11 +77,40 @@ class QueryResponse(BaseModel):
     message: str
     modality: str
     execution_time: Optional[float] = None
+    timings: Optional[Dict[str, Any]] = None  # Per-phase latency breakdown (llm, tool, embedding, supabase)
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    queue_depth: int
+    status_url: str
+    events_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "succeeded", "failed"
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[QueryResponse] = None
+    error: Optional[str] = None
 
 class StreamMessage(BaseModel):
-    type: str  # "log", "progress", "result", "error"
+    type: str  # "log", "tool", "token", "progress", "result", "error"
     message: str
     timestamp: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+
+def _stream_event(event_type: str, message: str, data: Optional[Dict[str, Any]] = None) -> tuple:
+    """Build an (event_type, payload) item for the SSE event queue."""
+    payload = StreamMessage(
+        type=event_type,
+        message=message,
+        timestamp=datetime.now().isoformat(),
+        data=data
+    ).dict()
+    return event_type, payload
 
 
 @router.post("/generate", response_model=QueryResponse)
@@ -86,11 +121,14 @@ async def generate_content(request: QueryRequest):
     """
     start_time = time.time()
     
-    # Capture logs during generation
+    # Capture logs and timing spans during generation
     captured_logs = []
+    spans = start_request_timings()
     
-    async def log_callback(message: str):
+    async def log_callback(message: str, event_type: str = "log"):
         """Callback to capture logs during generation"""
+        if event_type == "token":
+            return  # The full post is returned in the response body
         captured_logs.append(message)
         logger.info(f"Generation log: {message}")
     
@@ -103,7 +141,9 @@ async def generate_content(request: QueryRequest):
             async_log_callback=log_callback,
             modality=request.modality,
             tenant_id=request.tenant_id,
-            generate_image=request.generate_image
+            generate_image=request.generate_image,
+            speculative_retrieval=request.speculative_retrieval,
+            use_cache=request.use_cache
         )
         
         execution_time = time.time() - start_time
@@ -124,7 +164,8 @@ async def generate_content(request: QueryRequest):
             content=result,
             message=f"{request.modality.title()} content generated successfully",
             modality=request.modality,
-            execution_time=execution_time
+            execution_time=execution_time,
+            timings=summarize_timings(spans)
         )
         
     except Exception as e:
@@ -137,6 +178,184 @@ async def generate_content(request: QueryRequest):
         )
 
 
+@router.post("/generate-stream")
+async def generate_content_stream(request: QueryRequest):
+    """
+    Generate social media content and stream progress as Server-Sent Events.
+    Emits log, tool and token events while the pipeline runs, then a single result or error event.
+    """
+    start_time = time.time()
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def log_callback(message: str, event_type: str = "log"):
+        """Forward pipeline events straight to the client"""
+        events.put_nowait(_stream_event(event_type, message))
+        if event_type != "token":
+            logger.info(f"Generation log: {message}")
+
+    async def run_generation():
+        spans = start_request_timings()
+        try:
+            logger.info(f"Streaming {request.modality} query: {request.prompt[:100]}...")
+
+            result = await generate_post_for_prompt(
+                user_prompt_text=request.prompt,
+                async_log_callback=log_callback,
+                modality=request.modality,
+                tenant_id=request.tenant_id,
+                generate_image=request.generate_image,
+                speculative_retrieval=request.speculative_retrieval,
+                use_cache=request.use_cache
+            )
+
+            if not isinstance(result, dict):
+                result = {
+                    'post_content': result,
+                    'generated_images': []
+                }
+
+            response = QueryResponse(
+                success=True,
+                content=result,
+                message=f"{request.modality.title()} content generated successfully",
+                modality=request.modality,
+                execution_time=time.time() - start_time,
+                timings=summarize_timings(spans)
+            )
+            events.put_nowait(_stream_event("result", response.message, response.dict()))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming {request.modality} content: {str(e)}")
+            events.put_nowait(_stream_event("error", f"Failed to generate {request.modality} content: {str(e)}"))
+        finally:
+            events.put_nowait(None)
+
+    async def event_stream():
+        # Queue an event up front so the client gets its first byte before any LLM call
+        events.put_nowait(_stream_event("progress", f"Started {request.modality} content generation"))
+        generation_task = asyncio.create_task(run_generation())
+        try:
+            async for frame in drain_event_queue(events):
+                yield frame
+        finally:
+            # Client disconnected or stream finished: never leave the pipeline running unobserved
+            if not generation_task.done():
+                generation_task.cancel()
+
+    return sse_response(event_stream())
+
+
+async def _run_generation_job(job, request: QueryRequest) -> Dict[str, Any]:
+    """Run one generation pipeline inside a job worker, publishing its events to the job."""
+    start_time = time.time()
+    spans = start_request_timings()
+
+    async def log_callback(message: str, event_type: str = "log"):
+        job.publish(*_stream_event(event_type, message))
+
+    logger.info(f"Job {job.id}: processing {request.modality} query: {request.prompt[:100]}...")
+
+    result = await generate_post_for_prompt(
+        user_prompt_text=request.prompt,
+        async_log_callback=log_callback,
+        modality=request.modality,
+        tenant_id=request.tenant_id,
+        generate_image=request.generate_image,
+        speculative_retrieval=request.speculative_retrieval,
+        use_cache=request.use_cache
+    )
+
+    if not isinstance(result, dict):
+        result = {
+            'post_content': result,
+            'generated_images': []
+        }
+
+    return QueryResponse(
+        success=True,
+        content=result,
+        message=f"{request.modality.title()} content generated successfully",
+        modality=request.modality,
+        execution_time=time.time() - start_time,
+        timings=summarize_timings(spans)
+    ).dict()
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_generation_job(request: QueryRequest):
+    """
+    Queue a content generation job and return its id immediately.
+    Poll GET /queries/jobs/{job_id} or subscribe to GET /queries/jobs/{job_id}/events for the result.
+    """
+    try:
+        job = await generation_job_queue.submit(
+            "generation",
+            lambda job: _run_generation_job(job, request),
+            params={"modality": request.modality, "tenant_id": request.tenant_id}
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        queue_depth=generation_job_queue.stats()["queue_depth"],
+        status_url=f"/queries/jobs/{job.id}",
+        events_url=f"/queries/jobs/{job.id}/events"
+    )
+
+
+@router.get("/jobs/metrics")
+async def get_generation_job_metrics():
+    """
+    Queue depth, running pipelines and throughput counters for the generation worker pool.
+    """
+    return generation_job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_generation_job(job_id: str):
+    """
+    Poll the status of a generation job; includes the result once it has succeeded.
+    """
+    job = generation_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_generation_job_events(job_id: str):
+    """
+    Stream a generation job's events over SSE, replaying anything published before the client connected.
+    """
+    job = generation_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        subscriber = job.subscribe()
+        try:
+            async for frame in drain_event_queue(subscriber):
+                yield frame
+        finally:
+            # Disconnecting only stops the stream; the job keeps running for later polling
+            job.unsubscribe(subscriber)
+
+    return sse_response(event_stream())
+
+
 @router.post("/followup", response_model=QueryResponse)
 async def handle_followup_query(request: FollowUpRequest):
     """
@@ -145,11 +364,14 @@ async def handle_followup_query(request: FollowUpRequest):
     """
     start_time = time.time()
     
-    # Capture logs during follow-up processing
+    # Capture logs and timing spans during follow-up processing
     captured_logs = []
+    spans = start_request_timings()
     
-    async def log_callback(message: str):
+    async def log_callback(message: str, event_type: str = "log"):
         """Callback to capture logs during follow-up processing"""
+        if event_type == "token":
+            return  # The full post is returned in the response body
         captured_logs.append(message)
         logger.info(f"Follow-up log: {message}")
     
@@ -183,7 +405,8 @@ async def handle_followup_query(request: FollowUpRequest):
             content=updated_content,
             message=f"{request.modality.title()} content updated successfully based on follow-up",
             modality=request.modality,
-            execution_time=execution_time
+            execution_time=execution_time,
+            timings=summarize_timings(spans)
         )
         
     except Exception as e:
@@ -206,6 +429,8 @@ async def get_query_status():
         from agent.orchestrator import generate_post_for_prompt
         from agent.agent_router import route_followup_query
         from services.openai_service import initialize_llm
+        from services.embeddings_service import get_embedding_cache_stats
+        from services.search_cache import get_search_cache_stats
         
         # Try to initialize LLM to check if services are available
         llm = initialize_llm()
@@ -215,7 +440,10 @@ async def get_query_status():
             "service": "user_queries",
             "llm_initialized": True,
             "orchestrator_available": True,
-            "router_available": True
+            "router_available": True,
+            "generation_jobs": generation_job_queue.stats(),
+            "embedding_cache": get_embedding_cache_stats(),
+            "search_cache": get_search_cache_stats()
         }
     except Exception as e:
         logger.warning(f"Service health check failed: {str(e)}")
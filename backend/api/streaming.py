@@ -0,0 +1,43 @@
+import asyncio
+import json
+from typing import AsyncIterator, Any, Dict, Optional
+from fastapi.responses import StreamingResponse
+
+# Headers that stop proxies (nginx, Vercel, etc.) from buffering the event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+# Comment frames keep idle connections open while a long LLM call is in flight
+KEEPALIVE_INTERVAL_SECONDS = 15.0
+
+
+def format_sse_event(event_type: str, payload: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Event frame."""
+    return f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def drain_event_queue(events: asyncio.Queue, keepalive_interval: float = KEEPALIVE_INTERVAL_SECONDS) -> AsyncIterator[str]:
+    """
+    Yield SSE frames from a queue of (event_type, payload) items until a None sentinel arrives.
+    Emits keep-alive comments whenever the queue stays empty for keepalive_interval seconds.
+    """
+    while True:
+        try:
+            item: Optional[tuple] = await asyncio.wait_for(events.get(), timeout=keepalive_interval)
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+
+        if item is None:
+            break
+
+        event_type, payload = item
+        yield format_sse_event(event_type, payload)
+
+
+def sse_response(event_source: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async iterator of SSE frames in a streaming HTTP response."""
+    return StreamingResponse(event_source, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,92 @@
+"""
+Embedding throughput benchmark: chunks/sec for the remote Nomic API versus the local CPU backend.
+
+Embeds synthetic ~1000-character chunks (the ingestion chunk size) with each requested
+provider, the way ingestion does (embed_documents over one document's chunks), and reports
+chunks/sec, per-call latency and agreement between providers. Runs against the real
+backends: "remote" needs NOMIC_API_KEY, "local" needs sentence-transformers.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embeddings --providers remote local --chunks 256 --documents 4
+    EMBEDDINGS_LOCAL_BACKEND=onnx python -m benchmarks.bench_embeddings --providers local
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.embedding_providers import create_embeddings
+
+MODEL_NAME = "nomic-embed-text-v1.5"
+DIMENSIONALITY = 768
+CHUNK_CHARACTERS = 1000
+
+_WORDS = (
+    "revenue growth quarter customers pipeline retention churn product launch market enterprise "
+    "pricing onboarding platform integration security compliance analytics forecast margin team "
+    "hiring roadmap feature adoption partner channel campaign engagement audience conversion"
+).split()
+
+
+def synthetic_chunks(count: int, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        words = [f"Section {i}:"]
+        while sum(len(word) + 1 for word in words) < CHUNK_CHARACTERS:
+            words.append(rng.choice(_WORDS))
+        chunks.append(" ".join(words)[:CHUNK_CHARACTERS])
+    return chunks
+
+
+def run_provider(provider: str, chunks: list[str], documents: int):
+    embeddings = create_embeddings(MODEL_NAME, DIMENSIONALITY, provider=provider)
+    embeddings.embed_documents(chunks[:2])  # Warm up: model load, connection setup
+
+    per_document = max(1, len(chunks) // documents)
+    vectors = []
+    call_seconds = []
+    start = time.perf_counter()
+    for offset in range(0, len(chunks), per_document):
+        call_start = time.perf_counter()
+        vectors.extend(embeddings.embed_documents(chunks[offset:offset + per_document]))
+        call_seconds.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return np.asarray(vectors, dtype=np.float32), len(chunks) / elapsed, call_seconds
+
+
+def main(args):
+    chunks = synthetic_chunks(args.chunks)
+    print(f"{len(chunks)} chunks of ~{CHUNK_CHARACTERS} chars in {args.documents} embed_documents calls\n")
+    print(f"{'provider':<10} {'chunks/s':>10} {'mean call s':>12} {'max call s':>11}")
+
+    results = {}
+    for provider in args.providers:
+        try:
+            vectors, rate, call_seconds = run_provider(provider, chunks, args.documents)
+        except Exception as e:
+            print(f"{provider:<10} unavailable: {e}")
+            continue
+        results[provider] = vectors
+        print(f"{provider:<10} {rate:10.1f} {np.mean(call_seconds):12.3f} {max(call_seconds):11.3f}")
+
+    if "remote" in results and "local" in results:
+        remote, local = results["remote"], results["local"]
+        remote = remote / np.linalg.norm(remote, axis=1, keepdims=True)
+        local = local / np.linalg.norm(local, axis=1, keepdims=True)
+        agreement = np.sum(remote * local, axis=1)
+        print(f"\nremote vs local cosine similarity: mean {agreement.mean():.4f}, min {agreement.min():.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", nargs="+", default=["remote", "local"], choices=["remote", "local"])
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--documents", type=int, default=4, help="Split the chunks into this many embed_documents calls")
+    main(parser.parse_args())
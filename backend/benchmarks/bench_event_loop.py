@@ -0,0 +1,83 @@
+"""
+Event-loop stall benchmark for the Supabase data-access layer.
+
+Fires N concurrent tenant lookups against a fake Supabase client with fixed latency while a
+heartbeat task measures how late the event loop wakes it up. Compares the old pattern
+(sync client called inside the coroutine) against services.data_access.
+
+Usage (from backend/):
+    python -m benchmarks.bench_event_loop --requests 50 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fakes import FakeSupabase, install_fake_supabase
+
+HEARTBEAT_INTERVAL = 0.005
+
+
+async def _heartbeat(lags: list, stop: asyncio.Event):
+    """Record how far past its deadline each 5 ms sleep wakes up."""
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run_scenario(name: str, make_request, num_requests: int):
+    lags = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    await asyncio.sleep(0.02)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(make_request(i) for i in range(num_requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await heartbeat
+
+    print(f"{name:<28} wall={elapsed * 1000:8.1f} ms  "
+          f"loop lag p50={_percentile(lags, 50) * 1000:6.2f} ms  "
+          f"p99={_percentile(lags, 99) * 1000:7.2f} ms  max={max(lags, default=0) * 1000:7.2f} ms")
+
+
+async def main(num_requests: int, latency_ms: float):
+    client = install_fake_supabase(FakeSupabase(latency_seconds=latency_ms / 1000.0))
+    client.tables["tenants"] = [{"id": f"tenant-{i}", "industry": "SaaS"} for i in range(num_requests)]
+
+    from services import data_access
+
+    async def blocking_request(i: int):
+        # Pre-refactor pattern: synchronous client call inside an async handler
+        client.table('tenants').select('id').eq('id', f"tenant-{i}").execute()
+
+    async def data_access_request(i: int):
+        await data_access.fetch_tenant(f"tenant-{i}", columns='id')
+
+    print(f"{num_requests} concurrent tenant lookups, {latency_ms:.0f} ms simulated Supabase latency, "
+          f"{data_access.SUPABASE_MAX_WORKERS} executor workers\n")
+    await _run_scenario("sync client in coroutine", blocking_request, num_requests)
+    await _run_scenario("services.data_access", data_access_request, num_requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency_ms))
@@ -0,0 +1,55 @@
+"""
+PDF text extraction benchmark: pages/sec for serial extraction versus the process pool.
+
+Builds a fixture corpus of text-only PDFs (benchmarks/pdf_fixture.py) and extracts every
+document with each worker count, checking that the reassembled text matches the serial run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_extraction --documents 3 --pages 120 --workers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.pdf_fixture import synthetic_report_pdf
+from infra.pdf_extraction import iter_pdf_pages, shutdown_extraction_pool
+
+
+def extract_corpus(corpus: list[bytes], workers: int, pages_per_task: int) -> tuple[list[list[str]], float]:
+    start = time.perf_counter()
+    texts = [list(iter_pdf_pages(pdf_bytes, workers=workers, pages_per_task=pages_per_task)) for pdf_bytes in corpus]
+    return texts, time.perf_counter() - start
+
+
+def main(args):
+    corpus = [synthetic_report_pdf(args.pages, seed=seed) for seed in range(args.documents)]
+    total_pages = args.documents * args.pages
+    print(f"{args.documents} PDFs x {args.pages} pages ({sum(map(len, corpus)) / 1024:.0f} KiB), "
+          f"{args.pages_per_task} pages per task, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>7} {'seconds':>8} {'pages/s':>8} {'speedup':>8}  text")
+
+    baseline = None
+    reference = None
+    for workers in args.workers:
+        if workers > 1:
+            # Start the pool outside the timed run; spawn start-up is a one-off per process
+            list(iter_pdf_pages(corpus[0], workers=workers, pages_per_task=args.pages_per_task))
+        texts, elapsed = extract_corpus(corpus, workers, args.pages_per_task)
+        reference = reference or texts
+        baseline = baseline or elapsed
+        print(f"{workers:>7} {elapsed:8.2f} {total_pages / elapsed:8.1f} {baseline / elapsed:7.2f}x  "
+              f"{'matches' if texts == reference else 'DIFFERS'}")
+    shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+"""
+Offline end-to-end benchmark for the post-generation pipeline.
+
+Runs generate_post_for_prompt (gather -> compose) against in-process fakes: a scripted chat
+model with deterministic tool calls, hash-seeded embeddings, canned Linkup results and an
+in-memory Supabase with the two search RPCs. Each fake sleeps for a configurable latency, so
+results reflect orchestration cost and concurrency behaviour, not vendor speed or API quota.
+
+Reports throughput, p50/p95/p99 end-to-end latency, per-phase time and peak memory.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline --requests 200 --concurrency 16
+    python -m benchmarks.bench_pipeline --llm-latency-ms 800 --supabase-latency-ms 30 --speculative
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Must be set before application modules read their configuration
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["LINKUP_CACHE_PATH"] = ""
+os.environ.setdefault("LINKUP_API_KEY", "offline-benchmark")
+
+from benchmarks.fakes import FakeSupabase, ScriptedChatModel, install_fake_modules, seed_fake_supabase
+
+TENANT_ID = "bench-tenant"
+
+PROMPTS = [
+    "Write a post announcing our Q3 revenue growth",
+    "Share three lessons from migrating to a new data platform",
+    "Explain why engineering leaders should care about latency budgets",
+    "Celebrate the launch of our analytics dashboard",
+    "Summarize the key findings of our customer survey",
+    "Post about hiring for our platform team",
+    "Compare our product against legacy reporting tools",
+    "Give a behind-the-scenes look at our release process",
+]
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _noop_callback(message, event_type="log"):
+    return None
+
+
+async def _run(args) -> None:
+    client = FakeSupabase(latency_seconds=args.supabase_latency_ms / 1000.0)
+    seed_fake_supabase(client, TENANT_ID, num_documents=args.documents, num_viral_posts=args.viral_posts)
+    install_fake_modules(
+        client,
+        embeddings_latency=args.embedding_latency_ms / 1000.0,
+        linkup_latency=args.linkup_latency_ms / 1000.0,
+    )
+
+    from services.openai_service import set_shared_llm
+    from services.metrics import start_request_timings, summarize_timings
+    from agent.orchestrator import generate_post_for_prompt
+    from agent.agent_router import route_followup_query
+    from services.vector_index import viral_content_index
+
+    if args.local_index:
+        await viral_content_index.start()
+
+    model = ScriptedChatModel(latency_seconds=args.llm_latency_ms / 1000.0, queries_per_tool=args.queries_per_tool)
+    set_shared_llm(model)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    phase_totals = {}
+    failures = 0
+
+    async def one_request(i: int):
+        nonlocal failures
+        prompt = f"{PROMPTS[i % len(PROMPTS)]} (variant {i % args.distinct_prompts})"
+        async with semaphore:
+            spans = start_request_timings()
+            start = time.perf_counter()
+            try:
+                result = await generate_post_for_prompt(
+                    prompt,
+                    _noop_callback,
+                    modality="blog" if i % 4 == 0 else "linkedin",
+                    tenant_id=TENANT_ID,
+                    speculative_retrieval=args.speculative,
+                    use_cache=args.generation_cache,
+                )
+                if args.followups:
+                    await route_followup_query("Make it shorter", result, result["modality"], TENANT_ID, _noop_callback)
+            except Exception as e:
+                failures += 1
+                if args.verbose:
+                    print(f"request {i} failed: {e}", file=sys.__stderr__)
+                return
+            latencies.append(time.perf_counter() - start)
+            for phase, totals in summarize_timings(spans)["phases"].items():
+                phase_totals[phase] = phase_totals.get(phase, 0.0) + totals["seconds"]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # The pipeline prints progress from tools; keep the benchmark output readable
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    await viral_content_index.stop()
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    completed = len(latencies)
+    print(f"{args.requests} requests at concurrency {args.concurrency} "
+          f"(llm={args.llm_latency_ms:.0f} ms, embed={args.embedding_latency_ms:.0f} ms, "
+          f"linkup={args.linkup_latency_ms:.0f} ms, supabase={args.supabase_latency_ms:.0f} ms"
+          f"{', speculative' if args.speculative else ''}{', with follow-ups' if args.followups else ''}"
+          f"{', local viral index' if args.local_index else ''})\n")
+    print(f"completed      {completed}  failed {failures}")
+    print(f"wall           {elapsed:8.2f} s")
+    print(f"throughput     {completed / elapsed if elapsed else 0.0:8.2f} req/s")
+    print(f"latency p50    {_percentile(latencies, 50) * 1000:8.1f} ms")
+    print(f"latency p95    {_percentile(latencies, 95) * 1000:8.1f} ms")
+    print(f"latency p99    {_percentile(latencies, 99) * 1000:8.1f} ms")
+    print(f"peak traced    {peak_traced / (1024 * 1024):8.1f} MiB")
+    print(f"max RSS        {max_rss_kb / 1024:8.1f} MiB")
+    print(f"llm calls      {model.calls}   supabase round trips {client.round_trips}")
+    if completed:
+        print("\nmean time per request by phase (spans overlap when tools run concurrently):")
+        for phase, seconds in sorted(phase_totals.items()):
+            print(f"  {phase:<10} {seconds / completed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct-prompts", type=int, default=1000, help="Lower values exercise the caches")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=30.0)
+    parser.add_argument("--linkup-latency-ms", type=float, default=150.0)
+    parser.add_argument("--supabase-latency-ms", type=float, default=20.0)
+    parser.add_argument("--queries-per-tool", type=int, default=1, help="Search calls per tool in each model turn")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--viral-posts", type=int, default=200)
+    parser.add_argument("--speculative", action="store_true", help="Enable speculative pre-retrieval")
+    parser.add_argument("--followups", action="store_true", help="Run one routed follow-up per request")
+    parser.add_argument("--local-index", action="store_true", help="Serve example searches from the in-process viral_content index")
+    parser.add_argument("--generation-cache", action="store_true", help="Serve repeated prompts from the semantic generation cache")
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(_run(parser.parse_args()))
@@ -0,0 +1,189 @@
+"""
+Re-ingestion benchmark: embedding calls and time to re-upload an edited PDF.
+
+Ingests a synthetic report (benchmarks/pdf_fixture.py) into an in-memory Supabase, then
+re-uploads it unchanged, lightly edited (a few lines rewritten, inserted and deleted across
+the document) and as a renamed copy. Content hashing should leave the unchanged upload a
+no-op and embed only the chunks around each edit.
+
+Also checks correctness and exits non-zero on a mismatch: the edited document's rows must match
+a fresh ingest of the same PDF (same content per chunk_index, total_chunks set, no leftovers),
+and an update that fails on a chunk write or on the storage upload must leave the previous
+rows and stored file exactly as they were.
+
+Usage (from backend/):
+    python -m benchmarks.bench_reingestion --pages 200 --edits 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fakes import FakeBucket, FakeQuery, FakeSupabase, install_fake_modules
+from benchmarks.pdf_fixture import make_text_pdf, synthetic_report_pages
+
+TENANT_ID = "bench-tenant"
+FRESH_TENANT_ID = "bench-tenant-fresh"  # No stored chunks, so nothing is reused
+
+
+def edited_pages(pages: list[list[str]], edits: int) -> list[list[str]]:
+    """Spread edits across the document, cycling through rewrite, insert and delete."""
+    edited = [list(lines) for lines in pages]
+    for edit in range(edits):
+        page = edited[(edit + 1) * len(edited) // (edits + 1)]
+        line = len(page) // 2
+        if edit % 3 == 0:
+            page[line] = f"Revised figure {edit}: retention improved after the pricing change."
+        elif edit % 3 == 1:
+            page.insert(line, f"New paragraph {edit}: the partner channel opened two new regions.")
+        else:
+            del page[line:line + 3]
+    return edited
+
+
+def document_rows(supabase: FakeSupabase, tenant_id: str, filename: str, columns: list[str]) -> list[dict]:
+    rows = [
+        row for row in supabase.tables.get("internal_documents", [])
+        if row.get("tenant_id") == tenant_id and row.get("file_name") == filename
+    ]
+    return sorted(({column: row.get(column) for column in columns} for row in rows), key=lambda row: str(row["id"]))
+
+
+def check_matches_fresh_ingest(supabase: FakeSupabase, pdf_uploader, pdf_bytes: bytes, filename: str) -> list[str]:
+    """Compare the updated document with the same PDF ingested from scratch for another tenant."""
+    _, message, details = pdf_uploader.process_and_add_pdf(pdf_bytes, filename, FRESH_TENANT_ID)
+    if details["outcome"] != "added":
+        return [f"fresh ingest failed: {message}"]
+    columns = ["id", "content", "chunk_index", "total_chunks", "chunk_hash", "document_hash", "embedding", "document_id"]
+    updated = document_rows(supabase, TENANT_ID, filename, columns)
+    fresh = document_rows(supabase, FRESH_TENANT_ID, filename, columns)
+    problems = []
+    if len(updated) != len(fresh):
+        problems.append(f"{len(updated)} rows after the update, {len(fresh)} from a fresh ingest")
+    if len({row["document_id"] for row in updated}) != 1:
+        problems.append("rows of the updated document span several document ids")
+    by_index = {}
+    for row in updated:
+        if row["chunk_index"] in by_index:
+            problems.append(f"chunk_index {row['chunk_index']} stored twice")
+        by_index[row["chunk_index"]] = row
+        if row["total_chunks"] != len(fresh):
+            problems.append(f"chunk {row['chunk_index']} has total_chunks {row['total_chunks']}, expected {len(fresh)}")
+    for expected in fresh:
+        row = by_index.get(expected["chunk_index"])
+        if row is None:
+            problems.append(f"chunk_index {expected['chunk_index']} missing after the update")
+            continue
+        for field in ("content", "chunk_hash", "document_hash", "embedding"):
+            if row[field] != expected[field]:
+                problems.append(f"chunk {expected['chunk_index']}: {field} differs from a fresh ingest")
+    return problems[:10]
+
+
+def check_failed_update_restores(supabase: FakeSupabase, pdf_uploader, pdf_bytes: bytes, filename: str,
+                                 failure: str) -> list[str]:
+    """Force an in-place update to fail and compare the document with its state beforehand."""
+    columns = [column.strip() for column in pdf_uploader.PREVIOUS_VERSION_COLUMNS.split(",")]
+    before = document_rows(supabase, TENANT_ID, filename, columns)
+    stored_before = dict(supabase.storage_objects)
+
+    chunk_writes = []
+
+    def failing_write(query):
+        # Let the first chunk write through so the rollback has something to undo
+        if query._table == "internal_documents" and query._action in ("insert", "upsert"):
+            chunk_writes.append(query._action)
+            if len(chunk_writes) > 1:
+                raise RuntimeError(f"forced {query._action} failure")
+        return original_execute(query)
+
+    def failing_upload(bucket, path, file, file_options=None):
+        raise RuntimeError("forced upload failure")
+
+    original_execute = FakeQuery.execute
+    patch = (mock.patch.object(FakeQuery, "execute", failing_write) if failure == "write"
+             else mock.patch.object(FakeBucket, "upload", failing_upload))
+    with patch:
+        _, message, details = pdf_uploader.process_and_add_pdf(pdf_bytes, filename, TENANT_ID)
+
+    problems = []
+    if details["outcome"] != "failed":
+        problems.append(f"update succeeded despite the forced {failure} failure")
+    if failure == "write" and len(chunk_writes) < 2:
+        problems.append("the update made fewer than two chunk writes; the check does not exercise rollback")
+    after = document_rows(supabase, TENANT_ID, filename, columns)
+    if after != before:
+        changed = sum(1 for old, new in zip(before, after) if old != new) + abs(len(after) - len(before))
+        problems.append(f"{changed} rows differ from the previous version ({len(before)} before, {len(after)} after)")
+    if supabase.storage_objects != stored_before:
+        problems.append("stored files changed")
+    return problems
+
+
+def main(args):
+    supabase = FakeSupabase()
+    install_fake_modules(supabase)
+    from infra import pdf_uploader
+
+    embeddings = pdf_uploader._initialize_embeddings()
+    embed_documents = embeddings.embed_documents
+    counts = {"calls": 0, "texts": 0}
+
+    def counting_embed_documents(texts):
+        counts["calls"] += 1
+        counts["texts"] += len(texts)
+        return embed_documents(texts)
+
+    embeddings.embed_documents = counting_embed_documents
+
+    pages = synthetic_report_pages(args.pages)
+    original = make_text_pdf(pages)
+    edited = make_text_pdf(edited_pages(pages, args.edits))
+    scenarios = [
+        ("initial upload", original, "report.pdf"),
+        ("unchanged re-upload", original, "report.pdf"),
+        (f"{args.edits} edits", edited, "report.pdf"),
+        ("renamed copy", edited, "report-copy.pdf"),
+    ]
+
+    print(f"{args.pages}-page report, embed batch {pdf_uploader.INGEST_EMBED_BATCH_SIZE}\n")
+    print(f"{'scenario':<20} {'outcome':<8} {'chunks':>6} {'embedded':>8} {'calls':>5} "
+          f"{'inserted':>8} {'updated':>7} {'deleted':>7} {'seconds':>8}")
+    for label, pdf_bytes, filename in scenarios:
+        counts.update(calls=0, texts=0)
+        start = time.perf_counter()
+        _, message, details = pdf_uploader.process_and_add_pdf(pdf_bytes, filename, TENANT_ID)
+        elapsed = time.perf_counter() - start
+        if details["outcome"] == "failed":
+            print(f"{label:<20} failed: {message}")
+            continue
+        print(f"{label:<20} {details['outcome']:<8} {details['chunks_created']:6d} {counts['texts']:8d} {counts['calls']:5d} "
+              f"{details['rows_inserted']:8d} {details['rows_updated']:7d} {details['rows_deleted']:7d} {elapsed:8.2f}")
+
+    # The renamed copy reused embeddings from the tenant; the fresh ingest runs with counting as well
+    checks = [("update matches a fresh ingest", check_matches_fresh_ingest(supabase, pdf_uploader, edited, "report.pdf"))]
+    further_edit = make_text_pdf(edited_pages(pages, args.edits + 2))
+    for failure in ("write", "upload"):
+        checks.append((f"failed update ({failure}) restores previous rows",
+                       check_failed_update_restores(supabase, pdf_uploader, further_edit, "report.pdf", failure)))
+
+    print()
+    failed = False
+    for label, problems in checks:
+        print(f"{label:<48} {'ok' if not problems else 'FAILED'}")
+        for problem in problems:
+            print(f"    {problem}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=3, help="Lines rewritten, inserted or deleted across the document")
+    main(parser.parse_args())
@@ -0,0 +1,117 @@
+"""
+Local vector search benchmark: exact float32 search versus two-stage search with a Matryoshka
+prefix and/or quantized (int8, binary) first-stage codes, rescored with the full vectors.
+
+Builds a synthetic corpus whose energy is concentrated in the leading dimensions (as with
+Matryoshka-trained models such as nomic-embed-text-v1.5), then measures recall@k against
+exact search, single-query throughput and index memory (heap and memory-mapped) for each
+configuration.
+
+Reference run (50k rows, 200 queries, 200 candidates, full vectors memory-mapped):
+
+    configuration        recall  queries/s  heap MiB
+    exact float32         1.000       65.1     146.5
+    two-stage 256d        1.000      312.6      48.8
+    int8 codes            1.000       74.6      36.6
+    int8 256d             1.000      232.0      12.2
+    binary 256d           1.000      307.3       1.5
+
+int8 codes without a prefix are widened back to float32 while scanning. They save memory
+but scan at about exact-search speed, so VectorIndex warns about that setup. The throughput
+gain comes from the Matryoshka prefix.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_search --rows 50000 --queries 200 --k 5
+    python -m benchmarks.bench_vector_search --storage int8 binary --spill-dir ""  # everything on the heap
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fakes import FakeSupabase, install_fake_supabase
+
+install_fake_supabase(FakeSupabase())
+
+from services.vector_index import VECTOR_INDEX_SPILL_DIR, VectorIndex
+
+DIMENSIONALITY = 768
+
+
+def synthetic_corpus(rows: int, queries: int, seed: int = 7):
+    """Clustered vectors with per-dimension scale decaying along the vector, plus noisy near-duplicate queries."""
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(1.0 + np.arange(DIMENSIONALITY) / 48.0)
+    centers = rng.standard_normal((max(1, rows // 50), DIMENSIONALITY)) * scale
+    corpus = centers[rng.integers(0, len(centers), rows)] + 0.6 * rng.standard_normal((rows, DIMENSIONALITY)) * scale
+    targets = corpus[rng.integers(0, rows, queries)]
+    query_vectors = targets + 0.4 * rng.standard_normal((queries, DIMENSIONALITY)) * scale
+    return corpus.astype(np.float32), query_vectors.astype(np.float32)
+
+
+def build_index(name: str, corpus: np.ndarray, **kwargs) -> VectorIndex:
+    index = VectorIndex(name, **kwargs)
+    index.replace_all({"bench": [({"id": i}, vector) for i, vector in enumerate(corpus)]})
+    return index
+
+
+def evaluate(index: VectorIndex, queries: np.ndarray, k: int, truth: list):
+    start = time.perf_counter()
+    results = [index.search(query, "bench", k) for query in queries]
+    elapsed = time.perf_counter() - start
+    recall = np.mean([
+        len({row["id"] for row in found} & expected) / len(expected)
+        for found, expected in zip(results, truth)
+    ])
+    stats = index.stats()
+    return recall, len(queries) / elapsed, stats["bytes"], stats["spilled_bytes"]
+
+
+def main(args):
+    corpus, queries = synthetic_corpus(args.rows, args.queries)
+    exact = build_index("exact", corpus)
+    truth = [{row["id"] for row in exact.search(query, "bench", args.k)} for query in queries]
+
+    configurations = [("exact float32", exact)]
+    for dims in args.short_dims:
+        configurations.append((
+            f"two-stage {dims}d/{args.candidates}",
+            build_index(f"short{dims}", corpus, short_dimensionality=dims, rerank_candidates=args.candidates,
+                        spill_dir=args.spill_dir),
+        ))
+    for storage in args.storage:
+        configurations.append((
+            f"{storage} codes/{args.candidates}",
+            build_index(storage, corpus, rerank_candidates=args.candidates, storage=storage, spill_dir=args.spill_dir),
+        ))
+        for dims in args.short_dims:
+            configurations.append((
+                f"{storage} {dims}d/{args.candidates}",
+                build_index(f"{storage}{dims}", corpus, short_dimensionality=dims, rerank_candidates=args.candidates,
+                            storage=storage, spill_dir=args.spill_dir),
+            ))
+
+    print(f"{args.rows} rows x {DIMENSIONALITY}d, {args.queries} queries, recall@{args.k} vs exact\n")
+    print(f"{'configuration':<28} {'recall':>7} {'queries/s':>10} {'heap MiB':>9} {'mmap MiB':>9}")
+    for name, index in configurations:
+        recall, qps, resident, spilled = evaluate(index, queries, args.k, truth)
+        print(f"{name:<28} {recall:7.3f} {qps:10.1f} {resident / (1024 * 1024):9.1f} {spilled / (1024 * 1024):9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=200, help="First-stage shortlist size")
+    parser.add_argument("--short-dims", type=int, nargs="+", default=[256, 128])
+    parser.add_argument("--storage", nargs="*", default=["int8", "binary"], choices=["int8", "binary"],
+                        help="Quantized first-stage encodings to compare")
+    parser.add_argument("--spill-dir", default=VECTOR_INDEX_SPILL_DIR,
+                        help="Memory-map full vectors of two-stage indexes from here (\"\" keeps them on the heap)")
+    main(parser.parse_args())
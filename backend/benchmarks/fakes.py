@@ -0,0 +1,540 @@
+"""
+In-process stand-ins for external services, used by the offline benchmarks.
+
+Each fake sleeps for a configurable latency to mimic a network round trip, so the
+benchmarks measure orchestration overhead and concurrency rather than vendor speed.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import sys
+import time
+import types
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+
+class FakeQuery:
+    """Chainable query builder supporting the subset of postgrest used in this codebase."""
+
+    def __init__(self, store: "FakeSupabase", table: str):
+        self._store = store
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._payload = None
+        self._filters = []
+        self._limit = None
+
+    def select(self, columns: str = "*", **kwargs):
+        self._action = "select"
+        self._columns = columns
+        return self
+
+    def insert(self, rows):
+        self._action = "insert"
+        self._payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self._action = "upsert"
+        self._payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values: Dict[str, Any]):
+        self._action = "update"
+        self._payload = values
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def lte(self, column: str, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) <= value)
+        return self
+
+    def in_(self, column: str, values):
+        allowed = set(values)
+        self._filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def or_(self, filters: str):
+        """PostgREST or=(...) filter: comma-separated column.op.value terms, and(...) groups nested."""
+        condition = _parse_or_filter(filters)
+        self._filters.append(condition)
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        # Repeated calls add tiebreakers, as in postgrest
+        self._orders = getattr(self, "_orders", []) + [(column, desc)]
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int):
+        self._range = (start, end)
+        return self
+
+    def _matches(self, row) -> bool:
+        return all(condition(row) for condition in self._filters)
+
+    def _project(self, row):
+        if self._columns.strip() == "*":
+            return dict(row)
+        columns = [column.strip() for column in self._columns.split(",")]
+        return {column: row.get(column) for column in columns}
+
+    def execute(self) -> FakeResponse:
+        self._store._sleep()
+        rows = self._store.tables.setdefault(self._table, [])
+
+        if self._action in ("insert", "upsert"):
+            inserted = []
+            for payload in self._payload:
+                row = dict(payload)
+                if self._action == "upsert" and "id" in row:
+                    rows[:] = [existing for existing in rows if existing.get("id") != row["id"]]
+                row.setdefault("id", str(uuid.uuid4()))
+                row.setdefault("created_at", time.time())
+                rows.append(row)
+                inserted.append(dict(row))
+            return FakeResponse(inserted)
+
+        matched = [row for row in rows if self._matches(row)]
+
+        if self._action == "update":
+            for row in matched:
+                row.update(self._payload)
+            return FakeResponse([dict(row) for row in matched])
+
+        if self._action == "delete":
+            rows[:] = [row for row in rows if not self._matches(row)]
+            return FakeResponse([dict(row) for row in matched])
+
+        for column, desc in reversed(getattr(self, "_orders", [])):
+            matched.sort(key=lambda row: row.get(column) or 0, reverse=desc)
+        window = getattr(self, "_range", None)
+        if window:
+            matched = matched[window[0]:window[1] + 1]
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        return FakeResponse([self._project(row) for row in matched])
+
+
+def _split_terms(text: str) -> List[str]:
+    terms, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return [term.strip() for term in terms if term.strip()]
+
+
+_FILTER_OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def _parse_filter_term(term: str):
+    if term.startswith("and(") or term.startswith("or("):
+        combine = all if term.startswith("and(") else any
+        conditions = [_parse_filter_term(part) for part in _split_terms(term[term.index("(") + 1:-1])]
+        return lambda row: combine(condition(row) for condition in conditions)
+    column, operator, raw = term.split(".", 2)
+    raw = raw[1:-1] if raw.startswith('"') and raw.endswith('"') else raw
+    compare = _FILTER_OPERATORS[operator]
+
+    def condition(row):
+        value = row.get(column)
+        if value is None:
+            return False
+        # Filter values arrive as text; compare numbers as numbers
+        expected = type(value)(raw) if isinstance(value, (int, float)) and not isinstance(value, bool) else raw
+        return compare(value if isinstance(value, (int, float)) else str(value), expected)
+    return condition
+
+
+def _parse_or_filter(filters: str):
+    conditions = [_parse_filter_term(term) for term in _split_terms(filters)]
+    return lambda row: any(condition(row) for condition in conditions)
+
+
+class FakeRpc:
+    def __init__(self, store: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self._store = store
+        self._name = name
+        self._params = params
+
+    def execute(self) -> FakeResponse:
+        self._store._sleep()
+        handler = self._store.rpc_handlers.get(self._name)
+        return FakeResponse(handler(self._store, self._params) if handler else [])
+
+
+class FakeBucket:
+    def __init__(self, store: "FakeSupabase", bucket: str):
+        self._store = store
+        self._bucket = bucket
+
+    def upload(self, path: str, file: bytes, file_options=None):
+        self._store._sleep()
+        self._store.storage_objects[(self._bucket, path)] = file
+        return FakeResponse({"path": path})
+
+    def remove(self, paths: List[str]):
+        self._store._sleep()
+        removed = [path for path in paths if self._store.storage_objects.pop((self._bucket, path), None) is not None]
+        return [{"name": path} for path in removed]
+
+    def create_signed_url(self, path: str, expires_in: int):
+        self._store._sleep()
+        return {"signedURL": f"https://storage.local/{self._bucket}/{path}?expires_in={expires_in}"}
+
+    def create_signed_urls(self, paths: List[str], expires_in: int):
+        self._store._sleep()
+        return [
+            {"path": path, "signedURL": f"https://storage.local/{self._bucket}/{path}?expires_in={expires_in}", "error": None}
+            for path in paths
+        ]
+
+
+class FakeStorage:
+    def __init__(self, store: "FakeSupabase"):
+        self._store = store
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self._store, bucket)
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client: tables are lists of dicts, RPCs are Python callables
+    registered in rpc_handlers, and storage is a dict keyed by (bucket, path).
+    Every round trip blocks for latency_seconds, exactly like the real synchronous client.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, tables: Optional[Dict[str, List[dict]]] = None):
+        self.latency_seconds = latency_seconds
+        self.tables: Dict[str, List[dict]] = tables or {}
+        self.rpc_handlers: Dict[str, Any] = {}
+        self.storage_objects: Dict[tuple, bytes] = {}
+        self.storage = FakeStorage(self)
+        self.round_trips = 0
+
+    def _sleep(self):
+        self.round_trips += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> FakeRpc:
+        return FakeRpc(self, name, params)
+
+
+def install_fake_supabase(client: FakeSupabase):
+    """
+    Register a stand-in services.supabase_service module so importing application code
+    does not need SUPABASE_URL or the supabase package.
+    """
+    module = sys.modules.get("services.supabase_service")
+    if module is None:
+        module = types.ModuleType("services.supabase_service")
+        sys.modules["services.supabase_service"] = module
+    module.supabase = client
+    return client
+
+
+# --- Embeddings ---
+
+def fake_embedding(text: str, dimensionality: int = 768) -> List[float]:
+    """Deterministic unit vector derived from the text, so equal texts embed identically."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensionality)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class FakeEmbeddings:
+    """Stand-in for NomicEmbeddings: same constructor keywords, blocking latency per call."""
+
+    latency_seconds = 0.0
+
+    def __init__(self, model: str = "nomic-embed-text-v1.5", dimensionality: int = 768, **kwargs):
+        self.model = model
+        self.dimensionality = dimensionality
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return fake_embedding("search_query: " + text, self.dimensionality)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [fake_embedding("search_document: " + text, self.dimensionality) for text in texts]
+
+    def embed(self, texts: List[str], *, task_type: str) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [fake_embedding(f"{task_type}: " + text, self.dimensionality) for text in texts]
+
+
+# --- Linkup ---
+
+class FakeLinkupResult:
+    def __init__(self, result_type: str, name: str, url: str, content: str = ""):
+        self.type = result_type
+        self.name = name
+        self.url = url
+        self.content = content
+
+
+class FakeLinkupResponse:
+    def __init__(self, results: List[FakeLinkupResult]):
+        self.results = results
+
+
+class FakeLinkupClient:
+    """Stand-in for linkup.LinkupClient returning canned text (and optionally image) results."""
+
+    latency_seconds = 0.0
+    calls = 0
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key
+
+    def search(self, query: str, depth: str = "standard", output_type: str = "searchResults", include_images: bool = False):
+        FakeLinkupClient.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        results = [
+            FakeLinkupResult("text", f"Result {i + 1} for {query[:40]}", f"https://example.com/{i}",
+                             f"Market data point {i + 1} about {query[:80]}. Growth was {10 + i}% year over year.")
+            for i in range(5)
+        ]
+        if include_images:
+            results += [FakeLinkupResult("image", f"Image {i + 1} for {query[:40]}", f"https://example.com/img/{i}.png") for i in range(5)]
+        return FakeLinkupResponse(results)
+
+
+# --- Chat model ---
+
+def _message_text(message) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+class ScriptedChatModel:
+    """
+    Duck-typed chat model that emits deterministic tool calls instead of calling OpenAI.
+
+    On the first call of a turn it requests every "search" tool it is bound to, queries_per_tool
+    times with distinct queries (or dispatches the router to router_agent); once tool results
+    are present it answers in plain text.
+    Structured-output runnables return a post/image-description dict, streamed in chunks.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, router_agent: str = "compose", stream_chunks: int = 20, queries_per_tool: int = 1):
+        self.latency_seconds = latency_seconds
+        self.queries_per_tool = max(1, queries_per_tool)
+        self.router_agent = router_agent
+        self.stream_chunks = max(1, stream_chunks)
+        self.calls = 0
+
+    def bind_tools(self, tools, tool_choice: str = "auto"):
+        return _ScriptedToolRunnable(self, [tool["name"] for tool in tools])
+
+    def with_structured_output(self, schema):
+        return _ScriptedStructuredRunnable(self)
+
+    async def _simulate_latency(self, seconds: Optional[float] = None):
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds if seconds is None else seconds)
+
+
+class _ScriptedToolRunnable:
+    def __init__(self, model: ScriptedChatModel, tool_names: List[str]):
+        self._model = model
+        self._tool_names = tool_names
+
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage, ToolMessage
+
+        await self._model._simulate_latency()
+        request_text = _message_text(messages[-1])[:200]
+
+        if "dispatch_agent" in self._tool_names:
+            return AIMessage(content="", tool_calls=[{
+                "name": "dispatch_agent",
+                "args": {"agent": self._model.router_agent, "args": {}, "reasoning": "scripted"},
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }])
+
+        if any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(content=f"Summary of findings for: {request_text}")
+
+        search_tools = [name for name in self._tool_names if "search" in name and name != "image_web_search"]
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": {"query": f"{name} brief {n}: {request_text}"}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+            for name in search_tools
+            for n in range(self._model.queries_per_tool)
+        ])
+
+
+class _ScriptedStructuredRunnable:
+    def __init__(self, model: ScriptedChatModel):
+        self._model = model
+
+    def _result(self, messages) -> Dict[str, str]:
+        request_text = _message_text(messages[-1])[:120]
+        post = " ".join(f"Scripted post sentence {i} about {request_text}." for i in range(8))
+        return {"post_content": post, "image_description": f"A clean diagram illustrating {request_text}"}
+
+    async def ainvoke(self, messages):
+        await self._model._simulate_latency()
+        return self._result(messages)
+
+    async def astream(self, messages):
+        self._model.calls += 1
+        result = self._result(messages)
+        post = result["post_content"]
+        chunks = self._model.stream_chunks
+        step = max(1, math.ceil(len(post) / chunks))
+        for end in range(step, len(post) + step, step):
+            await asyncio.sleep(self._model.latency_seconds / chunks)
+            yield {"post_content": post[:end]}
+        yield result
+
+
+# --- Corpus seeding and RPC stand-ins ---
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _rpc_search_internal_documents(store: FakeSupabase, params: Dict[str, Any]) -> List[dict]:
+    rows = [row for row in store.tables.get("internal_documents", []) if row.get("tenant_id") == params.get("input_tenant_id")]
+    scored = [dict(row, similarity=_dot(params["query_embedding"], row["embedding"])) for row in rows]
+    scored.sort(key=lambda row: row["similarity"], reverse=True)
+    return scored[:params.get("match_count", 3)]
+
+
+def _rpc_search_viral_content(store: FakeSupabase, params: Dict[str, Any]) -> List[dict]:
+    rows = [row for row in store.tables.get("viral_content", []) if row.get("type") == params.get("type")]
+    scored = [dict(row, similarity=_dot(params["query_embedding"], row["embedding"])) for row in rows]
+    scored.sort(key=lambda row: row["similarity"], reverse=True)
+    return scored[:params.get("match_count", 5)]
+
+
+def seed_fake_supabase(client: FakeSupabase, tenant_id: str, num_documents: int = 20, chunks_per_document: int = 10,
+                       num_viral_posts: int = 200, dimensionality: int = 768):
+    """Fill the fake with one tenant, a document library and a viral-content corpus, and register the RPCs."""
+    client.tables["tenants"] = [{
+        "id": tenant_id,
+        "context_description": "An offline benchmark company",
+        "target_audience": "Engineering leaders",
+        "market_need": "Faster content",
+        "industry": "SaaS",
+        "core_value_prop": "Deterministic benchmarks",
+    }]
+
+    documents = []
+    for doc_index in range(num_documents):
+        document_id = str(uuid.uuid4())
+        for chunk_index in range(chunks_per_document):
+            content = f"Document {doc_index} chunk {chunk_index}: revenue grew {chunk_index * 3}% in region {doc_index}."
+            documents.append({
+                "id": str(uuid.uuid4()),
+                "tenant_id": tenant_id,
+                "document_id": document_id,
+                "file_name": f"report_{doc_index}.pdf",
+                "content": content,
+                "embedding": fake_embedding(content, dimensionality),
+                "chunk_index": chunk_index,
+                "total_chunks": chunks_per_document,
+                "metadata": {"chunk_size": len(content), "document_type": "pdf_chunk"},
+                "created_at": time.time(),
+            })
+    client.tables["internal_documents"] = documents
+
+    viral = []
+    for post_index in range(num_viral_posts):
+        content_type = "blog" if post_index % 4 == 0 else "linkedin"
+        content = f"Viral {content_type} post {post_index}: a hook, three insights and a call to action."
+        viral.append({
+            "id": post_index + 1,
+            "type": content_type,
+            "content": content,
+            "embedding": fake_embedding(content, dimensionality),
+            "target_audience": "Founders",
+            "media_description": "Carousel",
+            "content_url": f"https://example.com/post/{post_index}",
+            "created_at": time.time(),
+        })
+    client.tables["viral_content"] = viral
+
+    client.rpc_handlers["search_internal_documents"] = _rpc_search_internal_documents
+    client.rpc_handlers["search_viral_content"] = _rpc_search_viral_content
+    return client
+
+
+def install_fake_modules(supabase_client: FakeSupabase, embeddings_latency: float = 0.0, linkup_latency: float = 0.0):
+    """
+    Register stand-ins for every external SDK the pipeline touches (Supabase, Nomic, Linkup)
+    before application modules are imported. OpenAI is replaced via set_shared_llm.
+    """
+    install_fake_supabase(supabase_client)
+
+    FakeEmbeddings.latency_seconds = embeddings_latency
+    nomic_module = types.ModuleType("langchain_nomic")
+    nomic_module.NomicEmbeddings = FakeEmbeddings
+    sys.modules["langchain_nomic"] = nomic_module
+
+    FakeLinkupClient.latency_seconds = linkup_latency
+    linkup_module = types.ModuleType("linkup")
+    linkup_module.LinkupClient = FakeLinkupClient
+    sys.modules["linkup"] = linkup_module
@@ -0,0 +1,63 @@
+"""
+Hand-built PDF fixtures for ingestion benchmarks: text-only pages in the base-14 Helvetica
+font, written object by object so no PDF library is needed to generate them.
+"""
+
+import random
+
+_WORDS = (
+    "revenue growth quarter customers pipeline retention churn product launch market enterprise "
+    "pricing onboarding platform integration security compliance analytics forecast margin team "
+    "hiring roadmap feature adoption partner channel campaign engagement audience conversion"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(pages: list[list[str]]) -> bytes:
+    """A PDF with one page per entry, each drawing its lines top to bottom."""
+    page_count = len(pages)
+    font_id = 3 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(page_count))}] /Count {page_count} >>".encode(),
+    ]
+    for i, lines in enumerate(pages):
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        ).encode())
+        content = "\n".join(["BT /F1 9 Tf 36 760 Td 11 TL"] + [f"({_escape(line)}) '" for line in lines] + ["ET"]).encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
+
+
+def synthetic_report_pdf(page_count: int, lines_per_page: int = 60, seed: int = 5) -> bytes:
+    """A report-like PDF: every line a numbered sentence of business vocabulary."""
+    return make_text_pdf(synthetic_report_pages(page_count, lines_per_page, seed))
+
+
+def synthetic_report_pages(page_count: int, lines_per_page: int = 60, seed: int = 5) -> list[list[str]]:
+    """The page lines behind synthetic_report_pdf, for building edited versions of a report."""
+    rng = random.Random(seed)
+    pages = []
+    for page in range(page_count):
+        lines = []
+        for line in range(lines_per_page):
+            words = " ".join(rng.choice(_WORDS) for _ in range(12))
+            lines.append(f"{page + 1}.{line + 1} {words.capitalize()} grew {rng.randint(1, 99)}% year over year.")
+        pages.append(lines)
+    return pages
@@ -0,0 +1,161 @@
+import io
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pdfplumber
+
+# Multi-core PDF text extraction. pdfplumber's extract_text is pure Python and CPU-bound, so
+# larger PDFs are split into page ranges extracted by a process pool and reassembled in order.
+# Kept free of service imports so pool workers start quickly.
+
+# --- Extraction Configuration ---
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))  # <= 1 extracts serially
+PDF_EXTRACT_PAGES_PER_TASK = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "8"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))  # Smaller PDFs are not worth the IPC
+# A page taking longer than this yields no text instead of stalling the whole document (pool only)
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "20"))
+PDF_EXTRACT_TMP_DIR = os.getenv("PDF_EXTRACT_TMP_DIR", "") or None
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+_timer_fired = False
+
+def _raise_page_timeout(signum, frame):
+    # pdfplumber re-raises errors from inside pdfminer as PdfminerException, so also leave a flag
+    global _timer_fired
+    _timer_fired = True
+    raise _PageTimeout()
+
+
+def _release_page(page):
+    # Without this pdfplumber keeps every page's layout cached until the file is closed
+    if hasattr(page, "close"):
+        page.close()
+    else:
+        page.flush_cache()
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, page_timeout: float) -> list[tuple[str, bool]]:
+    """Pool task: (text, timed_out) for pages [start, stop). Runs on a worker's main thread, so SIGALRM is usable."""
+    global _timer_fired
+    use_timer = page_timeout > 0 and threading.current_thread() is threading.main_thread()
+    if use_timer:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    results = []
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages[start:stop]:
+                _timer_fired = False
+                try:
+                    if use_timer:
+                        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                    results.append((page.extract_text() or "", False))
+                except Exception:
+                    if not _timer_fired:
+                        raise
+                    results.append(("", True))
+                finally:
+                    if use_timer:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                    _release_page(page)
+    finally:
+        if use_timer:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return results
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn: forking a process that runs event-loop and executor threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_pages_serial(pdf_bytes: bytes, start: int = 0):
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages[start:]:
+            try:
+                yield page.extract_text() or ""
+            finally:
+                _release_page(page)
+
+
+def _count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_pages(pdf_bytes: bytes, workers: int = PDF_EXTRACT_WORKERS,
+                   pages_per_task: int = PDF_EXTRACT_PAGES_PER_TASK, page_timeout: float = PDF_PAGE_TIMEOUT_SECONDS):
+    """
+    Yield the text of each page in order. PDFs of at least PDF_PARALLEL_MIN_PAGES pages are
+    extracted by the process pool in page ranges, keeping at most 2 * workers ranges in flight so
+    a slow consumer bounds memory. Falls back to serial extraction if the pool breaks.
+    """
+    if workers <= 1:
+        yield from _iter_pages_serial(pdf_bytes)
+        return
+
+    # Workers read the PDF from a temp file instead of receiving the bytes with every task
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=PDF_EXTRACT_TMP_DIR) as handle:
+        handle.write(pdf_bytes)
+        handle.flush()
+        page_count = _count_pages(handle.name)
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            yield from _iter_pages_serial(pdf_bytes)
+            return
+
+        pool = _get_pool(workers)
+        ranges = deque((start, min(start + pages_per_task, page_count)) for start in range(0, page_count, max(1, pages_per_task)))
+        in_flight = deque()
+        yielded = 0
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < 2 * workers:
+                    start, stop = ranges.popleft()
+                    in_flight.append(pool.submit(_extract_page_range, handle.name, start, stop, page_timeout))
+                for text, timed_out in in_flight.popleft().result():
+                    if timed_out:
+                        print(f"[pdf_extraction WARNING] Page {yielded + 1} timed out after {page_timeout}s, skipping its text")
+                    yielded += 1
+                    yield text
+        except BrokenProcessPool as e:
+            print(f"[pdf_extraction WARNING] Extraction pool failed, continuing serially from page {yielded + 1}: {e}")
+            _discard_pool(pool)
+            yield from _iter_pages_serial(pdf_bytes, start=yielded)
+        finally:
+            for future in in_flight:
+                future.cancel()
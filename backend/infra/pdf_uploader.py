@@ -1,14 +1,24 @@
 # MANUALLY CALL TO BATCH INGEST PDFS FROM DIRECTORY
 
+import asyncio
+import contextvars
+import functools
+import hashlib
 import pdfplumber
 import os
-import io
+import queue
+import threading
 import uuid
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from langchain_nomic import NomicEmbeddings
-from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from services.supabase_service import supabase
+from infra.pdf_extraction import iter_pdf_pages
+from services.lexical_index import tenant_lexical_indexes
+from services.embedding_providers import EMBEDDINGS_PROVIDER, create_embeddings
+from services.vector_index import parse_embedding
 
 # --- Constants ---
 EMBEDDINGS_MODEL_NAME = "nomic-embed-text-v1.5"
@@ -19,6 +29,46 @@ CHUNK_SIZE = 1000        # Characters per chunk
 CHUNK_OVERLAP = 200      # Overlap between chunks to maintain context
 MIN_CHUNK_SIZE = 20      # Much smaller minimum - only filter out truly empty/whitespace chunks
 
+# --- Streaming Ingestion Configuration ---
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))     # Chunks per embedding call
+INGEST_INSERT_BATCH_SIZE = int(os.getenv("INGEST_INSERT_BATCH_SIZE", "128"))  # Rows per insert
+INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "4"))                # Batches buffered between stages
+# Files ingested at once per worker; further uploads wait for a slot instead of starving the server
+INGEST_MAX_CONCURRENT_FILES = int(os.getenv("INGEST_MAX_CONCURRENT_FILES", "3"))
+
+# Rows per page when loading a document's previous version for re-ingestion
+PREVIOUS_VERSION_PAGE_SIZE = 500
+PREVIOUS_VERSION_COLUMNS = "id, tenant_id, document_id, file_name, content, embedding, chunk_index, total_chunks, metadata, chunk_hash, document_hash"
+
+# Content-hash re-ingestion needs the chunk_hash and document_hash columns (backend/sql/001_content_hashes.sql).
+# Until they exist, ingestion falls back to skipping any filename the tenant already has.
+_content_hash_columns_available: bool | None = None
+
+_ingest_executor = ThreadPoolExecutor(max_workers=max(1, INGEST_MAX_CONCURRENT_FILES), thread_name_prefix="ingest-file")
+
+# (tenant_id, filename) -> [lock, holders]; entries are dropped when the last holder leaves
+_document_locks: dict[tuple, list] = {}
+_document_locks_guard = threading.Lock()
+
+@contextmanager
+def _document_lock(tenant_id: str, filename: str):
+    """
+    Serialize ingestion of one filename per tenant within this process, so concurrent uploads
+    of the same file cannot both miss the existence check or interleave an in-place update.
+    """
+    key = (tenant_id, filename)
+    with _document_locks_guard:
+        entry = _document_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _document_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _document_locks[key]
+
 # --- Global Instances (Lazy Initialization) ---
 embeddings_model_instance = None
 
@@ -26,19 +76,15 @@ def _initialize_embeddings():
     global embeddings_model_instance
     if embeddings_model_instance is None:
         try:
-            print(f"[pdf_uploader DEBUG] Initializing NomicEmbeddings model: {EMBEDDINGS_MODEL_NAME}")
-            embeddings_model_instance = NomicEmbeddings(
-                model=EMBEDDINGS_MODEL_NAME,
-                inference_mode="remote",
-                dimensionality=768,
-            )
-            print("[pdf_uploader DEBUG] NomicEmbeddings initialized successfully with remote API")
+            print(f"[pdf_uploader DEBUG] Initializing {EMBEDDINGS_PROVIDER} embeddings model: {EMBEDDINGS_MODEL_NAME}")
+            embeddings_model_instance = create_embeddings(EMBEDDINGS_MODEL_NAME, 768)
+            print(f"[pdf_uploader DEBUG] Embeddings initialized successfully ({EMBEDDINGS_PROVIDER})")
         except Exception as e:
-            print(f"[pdf_uploader ERROR] Failed to initialize NomicEmbeddings: {e}")
-            raise ConnectionError(f"Failed to initialize NomicEmbeddings for '{EMBEDDINGS_MODEL_NAME}': {e}. Ensure NOMIC_API_KEY is set in your environment variables.")
+            print(f"[pdf_uploader ERROR] Failed to initialize embeddings: {e}")
+            raise ConnectionError(f"Failed to initialize {EMBEDDINGS_PROVIDER} embeddings for '{EMBEDDINGS_MODEL_NAME}': {e}. Ensure NOMIC_API_KEY is set (remote) or sentence-transformers is installed (local).")
     return embeddings_model_instance
 
-def _upload_pdf_to_storage(pdf_bytes: bytes, filename: str, document_uuid: str, tenant_id: str) -> tuple[bool, str | None]:
+def _upload_pdf_to_storage(pdf_bytes: bytes, filename: str, document_uuid: str, tenant_id: str, overwrite: bool = False) -> tuple[bool, str | None]:
     """
     Upload PDF to Supabase storage bucket using document UUID as filename.
     
@@ -47,6 +93,7 @@ def _upload_pdf_to_storage(pdf_bytes: bytes, filename: str, document_uuid: str,
         filename (str): Original filename (for extension)
         document_uuid (str): UUID from database to use as filename
         tenant_id (str): Tenant ID for folder organization
+        overwrite (bool): Replace the stored file (re-ingestion of an updated document)
         
     Returns:
         tuple[bool, str | None]: (success, error_message)
@@ -68,7 +115,7 @@ def _upload_pdf_to_storage(pdf_bytes: bytes, filename: str, document_uuid: str,
         response = supabase.storage.from_(STORAGE_BUCKET).upload(
             path=storage_path,
             file=pdf_bytes,
-            file_options={"content-type": "application/pdf"}
+            file_options={"content-type": "application/pdf", "upsert": "true" if overwrite else "false"}
         )
         
         if hasattr(response, 'error') and response.error:
@@ -81,275 +128,586 @@ def _upload_pdf_to_storage(pdf_bytes: bytes, filename: str, document_uuid: str,
         print(f"[pdf_uploader ERROR] Failed to upload PDF to storage: {e}")
         return False, f"Failed to upload PDF to storage: {e}"
 
-def _extract_text_from_pdf_bytes(pdf_bytes: bytes) -> tuple[str | None, str | None]:
-    """Extracts text from PDF bytes. Returns (text, error_message)."""
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"  
-            return (text.strip(), None) if text else (None, "No text found in PDF.")
-    except Exception as e:
-        return None, f"Error extracting text from PDF bytes: {e}"
+def _iter_pdf_pages(pdf_bytes: bytes):
+    """Yield the text of each PDF page in order (multi-core for larger PDFs, see infra.pdf_extraction)."""
+    return iter_pdf_pages(pdf_bytes)
 
-def _chunk_text(text: str, source_filename: str) -> list[Document]:
-    """
-    Split text into chunks using RecursiveCharacterTextSplitter.
-    
-    Args:
-        text (str): The full text to chunk
-        source_filename (str): Original PDF filename for metadata
-        
-    Returns:
-        list[Document]: List of Document objects with chunked text and metadata
-    """
-    # Initialize text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
+def _new_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         length_function=len,
         separators=["\n\n", "\n", ". ", " ", ""]  # Try to split on natural boundaries
     )
+
+def _keep_chunk(chunk_stripped: str) -> bool:
+    """Smart filtering: keep chunks that are likely valuable even if short."""
+    # Skip truly empty chunks
+    if not chunk_stripped:
+        return False
+        
+    # Always keep chunks that might be valuable regardless of size
+    is_valuable_short_chunk = (
+        # Headers or titles (often short but important)
+        chunk_stripped.isupper() or
+        chunk_stripped.endswith(':') or
+        chunk_stripped.startswith('#') or
+        # Data points or metrics
+        any(char.isdigit() for char in chunk_stripped) or
+        # Bullet points or list items
+        chunk_stripped.startswith('•') or chunk_stripped.startswith('-') or
+        # URLs or references
+        'http' in chunk_stripped.lower() or 'www.' in chunk_stripped.lower() or
+        # Common important keywords
+        any(keyword in chunk_stripped.lower() for keyword in [
+            'summary', 'conclusion', 'key', 'important', 'critical', 
+            'revenue', 'profit', 'growth', 'result', 'finding'
+        ])
+    )
     
-    # Split the text
-    chunks = text_splitter.split_text(text)
-    
-    # Smart filtering: Keep chunks that are likely valuable even if short
-    filtered_chunks = []
-    for chunk in chunks:
-        chunk_stripped = chunk.strip()
-        
-        # Skip truly empty chunks
-        if not chunk_stripped:
+    # Keep if above minimum size OR if it's a valuable short chunk
+    return len(chunk_stripped) >= MIN_CHUNK_SIZE or is_valuable_short_chunk
+
+def _iter_chunks(pages):
+    """
+    Split a stream of page texts into filtered chunks without holding the whole document.
+    Each page is split on its own, prefixed with the last CHUNK_OVERLAP characters of the
+    previous page for continuity. Anchoring chunk boundaries to pages keeps them stable when
+    a document is edited: an edit changes only the chunks of its page (and the start of the
+    next when it touches the page's tail), so re-ingestion can reuse every other chunk.
+    """
+    text_splitter = _new_text_splitter()
+    tail = ""
+    for page_text in pages:
+        if not page_text or not page_text.strip():
             continue
-            
-        # Always keep chunks that might be valuable regardless of size
-        is_valuable_short_chunk = (
-            # Headers or titles (often short but important)
-            chunk_stripped.isupper() or
-            chunk_stripped.endswith(':') or
-            chunk_stripped.startswith('#') or
-            # Data points or metrics
-            any(char.isdigit() for char in chunk_stripped) or
-            # Bullet points or list items
-            chunk_stripped.startswith('•') or chunk_stripped.startswith('-') or
-            # URLs or references
-            'http' in chunk_stripped.lower() or 'www.' in chunk_stripped.lower() or
-            # Common important keywords
-            any(keyword in chunk_stripped.lower() for keyword in [
-                'summary', 'conclusion', 'key', 'important', 'critical', 
-                'revenue', 'profit', 'growth', 'result', 'finding'
-            ])
-        )
-        
-        # Keep if above minimum size OR if it's a valuable short chunk
-        if len(chunk_stripped) >= MIN_CHUNK_SIZE or is_valuable_short_chunk:
-            filtered_chunks.append(chunk_stripped)
-    
-    chunks = filtered_chunks
-    
-    # Create Document objects with metadata
-    documents = []
-    for i, chunk in enumerate(chunks):
-        doc = Document(
-            page_content=chunk,
-            metadata={
-                "source_filename": source_filename,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "chunk_size": len(chunk),
-                "document_type": "pdf_chunk"
-            }
-        )
-        documents.append(doc)
-    
-    return documents
+        for chunk in text_splitter.split_text(f"{tail}\n{page_text}" if tail else page_text):
+            if _keep_chunk(chunk.strip()):
+                yield chunk.strip()
+        tail = _page_tail(page_text)
+
+def _page_tail(page_text: str) -> str:
+    # Start the overlap at a word boundary so the next page does not begin mid-word
+    tail = page_text[-CHUNK_OVERLAP:]
+    if len(page_text) > CHUNK_OVERLAP:
+        boundary = tail.find(" ")
+        if 0 <= boundary < len(tail) - 1:
+            tail = tail[boundary + 1:]
+    return tail.strip()
+
+def _allocate_document_uuid() -> str | None:
+    """Generate a document UUID not yet used in internal_documents."""
+    # Include collision detection (though UUID4 collisions are astronomically unlikely)
+    max_attempts = 5
+    for attempt in range(max_attempts):
+        candidate_uuid = str(uuid.uuid4())
+        
+        # Check if this UUID already exists in the database
+        existing_check = supabase.table("internal_documents").select("id").eq("document_id", candidate_uuid).limit(1).execute()
+        
+        if not existing_check.data:  # UUID is unique
+            return candidate_uuid
+        print(f"[pdf_uploader DEBUG] UUID collision detected on attempt {attempt + 1}, generating new UUID")
+    return None
+
+def _content_hash_columns() -> bool:
+    """Whether internal_documents has the content-hash columns; checked once per process."""
+    global _content_hash_columns_available
+    if _content_hash_columns_available is None:
+        try:
+            response = supabase.table("internal_documents").select("chunk_hash, document_hash").limit(1).execute()
+            if hasattr(response, 'error') and response.error:
+                raise RuntimeError(response.error)
+            _content_hash_columns_available = True
+        except Exception as e:
+            if "chunk_hash" not in str(e) and "document_hash" not in str(e):
+                # Not a schema problem (e.g. a network error): ask again on the next upload
+                print(f"[pdf_uploader WARNING] Could not check for content-hash columns: {e}")
+                return False
+            print("[pdf_uploader WARNING] internal_documents has no chunk_hash/document_hash columns; "
+                  "apply backend/sql/001_content_hashes.sql to enable incremental re-ingestion")
+            _content_hash_columns_available = False
+    return _content_hash_columns_available
+
+def _content_hash(data: bytes | str) -> str:
+    """SHA-256 hex digest identifying a PDF's bytes or a chunk's text."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
 
-def _generate_embeddings_for_chunks(chunks: list[Document]) -> list[list[float]]:
+def _embedding_list(value) -> list[float]:
+    # Embeddings read back from the database arrive as pgvector strings
+    return value if isinstance(value, list) else parse_embedding(value).tolist()
+
+def _build_chunk_row(tenant_id: str, document_uuid: str, original_filename: str, content: str, embedding, chunk_index: int, chunk_hash: str | None) -> dict:
+    embedding = _embedding_list(embedding)
+    row = {
+        "tenant_id": tenant_id,
+        "document_id": document_uuid,  # All chunks share the same UUID
+        "file_name": original_filename,
+        "content": content,
+        "embedding": embedding,
+        "chunk_index": chunk_index,
+        "total_chunks": 0,  # Set once the whole document has been chunked, along with document_hash
+        "metadata": {
+            "chunk_size": len(content),
+            "document_type": "pdf_chunk",
+        }
+    }
+    if chunk_hash is not None:
+        row["chunk_hash"] = chunk_hash
+    return row
+
+class _PreviousVersion:
     """
-    Generate embeddings for a list of document chunks.
-    
-    Args:
-        chunks (list[Document]): List of document chunks
-        
-    Returns:
-        list[list[float]]: List of embedding vectors
+    Rows of the stored version of a document being re-ingested, matched to the new version's
+    chunks by chunk hash. Each row is reused at most once; rows never taken are deleted.
+    Rows written before chunk hashes existed are matched on a hash of their content.
     """
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self._by_hash: dict[str, deque] = {}
+        self._taken = set()
+        for row in sorted(rows, key=lambda row: row.get("chunk_index") or 0):
+            chunk_hash = row.get("chunk_hash") or _content_hash(row.get("content") or "")
+            self._by_hash.setdefault(chunk_hash, deque()).append(row)
+
+    def take(self, chunk_hash: str) -> dict | None:
+        candidates = self._by_hash.get(chunk_hash)
+        if not candidates:
+            return None
+        row = candidates.popleft()
+        self._taken.add(row["id"])
+        return row
+
+    def leftovers(self) -> list[dict]:
+        return [row for row in self.rows if row["id"] not in self._taken]
+
+def _select_document_rows(document_uuid: str) -> list[dict]:
+    rows = []
+    offset = 0
+    while True:
+        response = (
+            supabase.table("internal_documents")
+            .select(PREVIOUS_VERSION_COLUMNS)
+            .eq("document_id", document_uuid)
+            .order("id")
+            .range(offset, offset + PREVIOUS_VERSION_PAGE_SIZE - 1)
+            .execute()
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PREVIOUS_VERSION_PAGE_SIZE:
+            return rows
+        offset += PREVIOUS_VERSION_PAGE_SIZE
+
+def _find_reusable_embeddings(tenant_id: str, chunk_hashes: list[str]) -> dict:
+    """Embeddings of identical chunks the tenant already has (e.g. in a renamed copy), by chunk hash."""
+    wanted = list(dict.fromkeys(chunk_hashes))
+    if not wanted:
+        return {}
     try:
-        embeddings_model = _initialize_embeddings()
-        
-        # Extract text content from chunks
-        texts = [chunk.page_content for chunk in chunks]
-        
-        print(f"[pdf_uploader DEBUG] Generating embeddings for {len(texts)} chunks")
-        
-        # Generate embeddings
-        embeddings = embeddings_model.embed_documents(texts)
-        
-        print(f"[pdf_uploader DEBUG] Generated {len(embeddings)} embeddings")
-        return embeddings
-        
+        response = supabase.table("internal_documents").select("chunk_hash, embedding").eq("tenant_id", tenant_id).in_("chunk_hash", wanted).execute()
     except Exception as e:
-        print(f"[pdf_uploader ERROR] Failed to generate embeddings: {e}")
-        raise e
+        print(f"[pdf_uploader WARNING] Could not look up existing chunk embeddings: {e}")
+        return {}
+    found = {}
+    for row in response.data or []:
+        if row.get("embedding") is not None:
+            found.setdefault(row.get("chunk_hash"), row["embedding"])
+    return found
+
+def _delete_rows(tenant_id: str, row_ids: list):
+    for start in range(0, len(row_ids), INGEST_INSERT_BATCH_SIZE):
+        supabase.table("internal_documents").delete().in_("id", row_ids[start:start + INGEST_INSERT_BATCH_SIZE]).execute()
+    tenant_lexical_indexes.remove_chunks(tenant_id, set(row_ids))
+
+class _PipelineAborted(Exception):
+    """Raised inside a pipeline stage when another stage has failed."""
+
+_END_OF_STREAM = object()
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    # Bounded queues apply backpressure; poll so a failed stage never leaves a producer blocked
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise _PipelineAborted()
 
-def _insert_chunks_to_database(chunks: list[Document], embeddings: list[list[float]], original_filename: str, tenant_id: str) -> tuple[bool, str, str | None]:
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    raise _PipelineAborted()
+
+def _stream_pdf_into_database(pdf_bytes: bytes, original_filename: str, tenant_id: str, document_uuid: str,
+                              document_hash: str | None, progress: dict, on_progress=None,
+                              previous: _PreviousVersion | None = None) -> tuple[int, str | None]:
     """
-    Insert chunks and their embeddings into the internal_documents table.
-    
-    Args:
-        chunks (list[Document]): List of document chunks
-        embeddings (list[list[float]]): List of embedding vectors
-        original_filename (str): Original filename
-        tenant_id (str): Tenant ID for the document
-        
-    Returns:
-        tuple[bool, str, str | None]: (success, message, document_uuid)
+    Streaming ingestion: extract page -> split into chunks -> micro-batch embed -> batched insert,
+    one thread per stage connected by bounded queues, so peak memory does not grow with the
+    document and early chunks are searchable before extraction finishes. The storage upload
+    starts with the first chunk batch and runs alongside embedding.
+    Chunks are identified by a content hash: only chunks the tenant has no embedding for are
+    embedded. Hashes are only stored when document_hash is given (the content-hash columns
+    exist). With previous (re-ingesting a stored document in place) unchanged chunks keep
+    their rows, moved ones are rewritten at their new position, rows for chunks that no longer
+    exist are deleted and, as the last step, the stored file is replaced.
+    Stage counters are kept in progress (pages_extracted, chunks_created, chunks_embedded,
+    chunks_reused, rows_inserted, rows_updated, rows_deleted) and on_progress(snapshot) is
+    called from the stage threads as they advance.
+    Returns (chunk_count, error); on error, everything written for the document is removed,
+    or for an in-place update the previous version is restored.
     """
+    embeddings_model = _initialize_embeddings()
+    chunk_batches: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_DEPTH)
+    embedded_batches: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_DEPTH)
+    stop = threading.Event()
+    text_pages = 0
+    upload = {}
+    progress_lock = threading.Lock()
+
+    def advance(counter: str, amount: int):
+        with progress_lock:
+            progress[counter] += amount
+            snapshot = dict(progress)
+        if on_progress is not None:
+            try:
+                on_progress(snapshot)
+            except Exception as e:
+                print(f"[pdf_uploader WARNING] Progress callback failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="ingest") as stages:
+        def start_upload():
+            # An in-place update keeps serving the stored file until the new version is complete
+            if previous is None and "future" not in upload:
+                upload["future"] = stages.submit(_upload_pdf_to_storage, pdf_bytes, original_filename, document_uuid, tenant_id)
+
+        def extract_and_chunk():
+            def pages():
+                nonlocal text_pages
+                for page_text in _iter_pdf_pages(pdf_bytes):
+                    if page_text.strip():
+                        text_pages += 1
+                    advance("pages_extracted", 1)
+                    yield page_text
+
+            try:
+                batch = []
+                for chunk in _iter_chunks(pages()):
+                    batch.append(chunk)
+                    if len(batch) >= INGEST_EMBED_BATCH_SIZE:
+                        start_upload()
+                        advance("chunks_created", len(batch))
+                        _put(chunk_batches, batch, stop)
+                        batch = []
+                if batch:
+                    start_upload()
+                    advance("chunks_created", len(batch))
+                    _put(chunk_batches, batch, stop)
+                _put(chunk_batches, _END_OF_STREAM, stop)
+            except Exception:
+                stop.set()
+                raise
+
+        def embed():
+            try:
+                while True:
+                    batch = _get(chunk_batches, stop)
+                    if batch is _END_OF_STREAM:
+                        _put(embedded_batches, _END_OF_STREAM, stop)
+                        return
+                    hashes = [_content_hash(chunk) for chunk in batch]
+                    previous_rows = [previous.take(chunk_hash) if previous is not None else None for chunk_hash in hashes]
+                    known = {
+                        chunk_hash: row["embedding"] for chunk_hash, row in zip(hashes, previous_rows)
+                        if row is not None and row.get("embedding") is not None
+                    }
+                    if document_hash is not None:
+                        known.update(_find_reusable_embeddings(tenant_id, [h for h in hashes if h not in known]))
+                    texts = {chunk_hash: chunk for chunk, chunk_hash in zip(batch, hashes) if chunk_hash not in known}
+                    if texts:
+                        known.update(zip(texts, embeddings_model.embed_documents(list(texts.values()))))
+                        advance("chunks_embedded", len(texts))
+                    if len(batch) > len(texts):
+                        advance("chunks_reused", len(batch) - len(texts))
+                    _put(embedded_batches, [
+                        (chunk, chunk_hash, known[chunk_hash], row)
+                        for chunk, chunk_hash, row in zip(batch, hashes, previous_rows)
+                    ], stop)
+            except Exception:
+                stop.set()
+                raise
+
+        producer = stages.submit(extract_and_chunk)
+        embedder = stages.submit(embed)
+
+        # Insert stage runs on this thread
+        position = 0
+        pending = []
+        pending_updates = []
+        inserted_ids = []
+        insert_error = None
+
+        def flush():
+            nonlocal pending
+            response = supabase.table("internal_documents").insert(pending).execute()
+            if hasattr(response, 'error') and response.error:
+                raise RuntimeError(f"Database insert error: {response.error}")
+            # Keep this worker's BM25 index for the tenant in step with the new chunks
+            tenant_lexical_indexes.add_chunks(tenant_id, response.data or [])
+            inserted_ids.extend(row["id"] for row in response.data or [] if row.get("id") is not None)
+            advance("rows_inserted", len(pending))
+            pending = []
+
+        def flush_updates():
+            nonlocal pending_updates
+            response = supabase.table("internal_documents").upsert(pending_updates).execute()
+            if hasattr(response, 'error') and response.error:
+                raise RuntimeError(f"Database upsert error: {response.error}")
+            tenant_lexical_indexes.add_chunks(tenant_id, response.data or [])
+            advance("rows_updated", len(pending_updates))
+            pending_updates = []
+
+        try:
+            while True:
+                batch = _get(embedded_batches, stop)
+                if batch is _END_OF_STREAM:
+                    break
+                for content, chunk_hash, embedding, previous_row in batch:
+                    if document_hash is None:
+                        chunk_hash = None
+                    if previous_row is None:
+                        pending.append(_build_chunk_row(tenant_id, document_uuid, original_filename, content, embedding, position, chunk_hash))
+                    elif previous_row.get("chunk_index") != position or previous_row.get("chunk_hash") != chunk_hash:
+                        # Unchanged chunk that moved (or was stored without a hash): rewrite its row in place
+                        row = _build_chunk_row(tenant_id, document_uuid, original_filename, content, embedding, position, chunk_hash)
+                        row["id"] = previous_row["id"]
+                        row["total_chunks"] = previous_row.get("total_chunks") or 0
+                        pending_updates.append(row)
+                    position += 1
+                    if len(pending) >= INGEST_INSERT_BATCH_SIZE:
+                        flush()
+                    if len(pending_updates) >= INGEST_INSERT_BATCH_SIZE:
+                        flush_updates()
+                # A failed upload dooms the document; stop extracting and embedding early
+                upload_future = upload.get("future")
+                if upload_future is not None and upload_future.done() and not upload_future.result()[0]:
+                    stop.set()
+                    break
+            if pending:
+                flush()
+            if pending_updates:
+                flush_updates()
+        except _PipelineAborted:
+            pass
+        except Exception as e:
+            insert_error = f"Failed to insert chunks into database: {e}"
+            stop.set()
+
+        errors = [insert_error] if insert_error else []
+        for stage, label in ((producer, "Error extracting text from PDF bytes"), (embedder, "Failed to generate embeddings")):
+            exception = stage.exception()
+            if exception is not None and not isinstance(exception, _PipelineAborted):
+                errors.append(f"{label}: {exception}")
+
+        upload_error = None
+        if "future" in upload:
+            upload_success, upload_error = upload["future"].result()
+            if upload_success:
+                upload_error = None
+
+    if not errors and upload_error:
+        errors.append(upload_error)
+    if not errors and not position:
+        errors.append("No text found in PDF." if not text_pages else f"No valid chunks created from '{original_filename}' after text splitting.")
+
+    if not errors and previous is not None:
+        # Every chunk of the new version is written: drop the outdated ones
+        stale_ids = [row["id"] for row in previous.leftovers()]
+        try:
+            _delete_rows(tenant_id, stale_ids)
+            advance("rows_deleted", len(stale_ids))
+        except Exception as e:
+            errors.append(f"Failed to remove outdated chunks: {e}")
+
+    if not errors:
+        try:
+            finalized = {"total_chunks": position}
+            if document_hash is not None:
+                finalized["document_hash"] = document_hash
+            supabase.table("internal_documents").update(finalized).eq("document_id", document_uuid).execute()
+        except Exception as e:
+            errors.append(f"Failed to finalize document chunks: {e}")
+
+    if not errors and previous is not None:
+        # Replace the stored file last: if any database step failed, the restored rows still match it
+        upload_success, upload_error = _upload_pdf_to_storage(pdf_bytes, original_filename, document_uuid, tenant_id, overwrite=True)
+        if not upload_success:
+            errors.append(upload_error)
+
+    if errors:
+        print(f"[pdf_uploader ERROR] Ingestion of '{original_filename}' failed: {errors[0]}")
+        if previous is None:
+            _remove_document(tenant_id, document_uuid, original_filename, uploaded="future" in upload and not upload_error)
+        else:
+            _restore_previous_version(tenant_id, previous.rows, inserted_ids)
+        return 0, errors[0]
+
+    print(f"[pdf_uploader DEBUG] Streamed {position} chunks ({progress['chunks_embedded']} embedded, {progress['chunks_reused']} reused) from {progress['pages_extracted']} pages of '{original_filename}' into database with UUID: {document_uuid}")
+    return position, None
+
+def _remove_document(tenant_id: str, document_uuid: str, original_filename: str, uploaded: bool):
+    """Best-effort cleanup of a partially ingested document."""
     try:
-        print(f"[pdf_uploader DEBUG] Inserting {len(chunks)} chunks into database")
-        
-        # Generate a unique UUID for all chunks of this document
-        # Include collision detection (though UUID4 collisions are astronomically unlikely)
-        max_attempts = 5
-        document_uuid = None
-        
-        for attempt in range(max_attempts):
-            candidate_uuid = str(uuid.uuid4())
-            
-            # Check if this UUID already exists in the database
-            existing_check = supabase.table("internal_documents").select("id").eq("document_id", candidate_uuid).limit(1).execute()
-            
-            if not existing_check.data:  # UUID is unique
-                document_uuid = candidate_uuid
-                break
-            else:
-                print(f"[pdf_uploader DEBUG] UUID collision detected on attempt {attempt + 1}, generating new UUID")
-        
-        if not document_uuid:
-            return False, "Failed to generate unique UUID after multiple attempts", None
-        
-        # Prepare data for batch insert
-        insert_data = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            row = {
-                "tenant_id": tenant_id,
-                "document_id": document_uuid,  # All chunks share the same UUID
-                "file_name": original_filename,
-                "content": chunk.page_content,
-                "embedding": embedding,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                "metadata": {
-                    "chunk_size": len(chunk.page_content),
-                    "document_type": "pdf_chunk",
-                }
-            }
-            insert_data.append(row)
-        
-        # Insert all chunks in batch
-        response = supabase.table("internal_documents").insert(insert_data).execute()
-        
-        if hasattr(response, 'error') and response.error:
-            return False, f"Database insert error: {response.error}", None
-        
-        print(f"[pdf_uploader DEBUG] Successfully inserted {len(insert_data)} chunks into database with UUID: {document_uuid}")
-        return True, f"Successfully inserted {len(insert_data)} chunks into database", document_uuid
-        
+        supabase.table("internal_documents").delete().eq("document_id", document_uuid).execute()
+        tenant_lexical_indexes.remove_document(tenant_id, document_uuid)
+    except Exception as e:
+        print(f"[pdf_uploader WARNING] Could not remove chunks of {document_uuid}: {e}")
+    if uploaded:
+        try:
+            storage_path = f"{tenant_id}/{document_uuid}{os.path.splitext(original_filename)[1]}"
+            supabase.storage.from_(STORAGE_BUCKET).remove([storage_path])
+        except Exception as e:
+            print(f"[pdf_uploader WARNING] Could not remove stored file for {document_uuid}: {e}")
+
+def _restore_previous_version(tenant_id: str, previous_rows: list[dict], inserted_ids: list):
+    """Best-effort rollback of a failed in-place update: drop the new chunks and rewrite the previous rows."""
+    try:
+        _delete_rows(tenant_id, inserted_ids)
+        for start in range(0, len(previous_rows), INGEST_INSERT_BATCH_SIZE):
+            supabase.table("internal_documents").upsert(previous_rows[start:start + INGEST_INSERT_BATCH_SIZE]).execute()
+        tenant_lexical_indexes.add_chunks(tenant_id, previous_rows)
     except Exception as e:
-        print(f"[pdf_uploader ERROR] Failed to insert chunks into database: {e}")
-        return False, f"Failed to insert chunks into database: {e}", None
+        print(f"[pdf_uploader WARNING] Could not restore the previous version of document: {e}")
 
-def _check_existing_document(filename: str, tenant_id: str) -> tuple[bool, int]:
+def _find_existing_document(filename: str, tenant_id: str, with_hash: bool = True) -> dict | None:
     """
-    Check if a document with the same filename already exists in the database for the specific tenant.
+    Find the stored document with the same filename for the specific tenant.
     
     Args:
         filename (str): Original filename to check
         tenant_id (str): Tenant ID to check within
+        with_hash (bool): Also read document_hash (requires the content-hash columns)
         
     Returns:
-        tuple[bool, int]: (exists, chunk_count)
+        dict | None: document_id, document_hash (None for documents stored before content
+        hashing) and total_chunks of the stored document, or None if there is none
     """
+    columns = "document_id, document_hash, total_chunks" if with_hash else "document_id, total_chunks"
     try:
-        response = supabase.table("internal_documents").select("id").eq("file_name", filename).eq("tenant_id", tenant_id).execute()
+        response = supabase.table("internal_documents").select(columns).eq("file_name", filename).eq("tenant_id", tenant_id).limit(1).execute()
         
         if hasattr(response, 'error') and response.error:
             print(f"[pdf_uploader WARNING] Error checking existing document: {response.error}")
-            return False, 0
+            return None
         
-        chunk_count = len(response.data) if response.data else 0
-        exists = chunk_count > 0
-        
-        print(f"[pdf_uploader DEBUG] Document '{filename}' for tenant '{tenant_id}' {'exists' if exists else 'does not exist'} with {chunk_count} chunks")
-        return exists, chunk_count
+        existing = response.data[0] if response.data else None
+        print(f"[pdf_uploader DEBUG] Document '{filename}' for tenant '{tenant_id}' {'exists' if existing else 'does not exist'}")
+        return existing
         
     except Exception as e:
         print(f"[pdf_uploader WARNING] Could not check for existing document {filename} for tenant {tenant_id}: {e}")
-        return False, 0
+        return None
 
-def process_and_add_pdf(pdf_bytes: bytes, original_filename: str, tenant_id: str) -> tuple[bool, str]:
+def process_and_add_pdf(pdf_bytes: bytes, original_filename: str, tenant_id: str, on_progress=None) -> tuple[bool, str, dict]:
     """
     Processes an uploaded PDF, extracts text, chunks it, generates embeddings,
-    and stores everything in Supabase if the document doesn't already exist.
+    and stores everything in Supabase. A document with the same filename and content is
+    left as is; with the same filename but new content it is updated in place, embedding
+    only the chunks the tenant has no stored embedding for.
     
     Args:
         pdf_bytes (bytes): PDF file bytes
         original_filename (str): Original filename
         tenant_id (str): Tenant ID for multi-tenant organization
+        on_progress (callable, optional): Called with a snapshot of the stage counters as
+            ingestion advances; runs on the pipeline threads
         
     Returns:
-        tuple[bool, str]: (success, message)
+        tuple[bool, str, dict]: (success, message, details). details holds the outcome
+        ("added", "updated", "exists" or "failed"), document_id, chunks_created and the stage
+        counters pages_extracted, chunks_embedded, chunks_reused, rows_inserted, rows_updated
+        and rows_deleted.
     """
+    progress = {
+        "pages_extracted": 0, "chunks_created": 0, "chunks_embedded": 0, "chunks_reused": 0,
+        "rows_inserted": 0, "rows_updated": 0, "rows_deleted": 0,
+    }
+    details = {"outcome": "failed", "document_id": None, **progress}
+    
     # Validate tenant_id
     if not tenant_id or not tenant_id.strip():
-        return False, "Tenant ID is required for document processing"
+        return False, "Tenant ID is required for document processing", details
     
+    # The existence check and the write happen under one lock per (tenant, filename)
+    with _document_lock(tenant_id.strip(), original_filename):
+        return _ingest_pdf(pdf_bytes, original_filename, tenant_id.strip(), progress, details, on_progress)
+
+def _ingest_pdf(pdf_bytes: bytes, original_filename: str, tenant_id: str, progress: dict, details: dict,
+                on_progress=None) -> tuple[bool, str, dict]:
     # Check if document already exists BEFORE uploading (per tenant)
-    exists, existing_chunk_count = _check_existing_document(original_filename, tenant_id.strip())
-    if exists:
-        return False, f"File '{original_filename}' already exists in the database with {existing_chunk_count} chunks."
-    
-    # Extract text from PDF first (before uploading to storage)
-    text_content, extract_error = _extract_text_from_pdf_bytes(pdf_bytes)
-    if extract_error:
-        return False, extract_error
-    if not text_content:
-        return False, "No text content extracted from PDF, nothing to add."
+    hash_columns = _content_hash_columns()
+    document_hash = _content_hash(pdf_bytes) if hash_columns else None
+    existing = _find_existing_document(original_filename, tenant_id, with_hash=hash_columns)
+    # Without content hashes any stored document with this filename counts as the same file
+    if existing and (not hash_columns or existing.get("document_hash") == document_hash):
+        existing_chunk_count = existing.get("total_chunks") or 0
+        details.update(outcome="exists", document_id=existing.get("document_id"), chunks_created=existing_chunk_count)
+        return False, f"File '{original_filename}' already exists in the database with {existing_chunk_count} chunks.", details
     
-    # Chunk the text
-    print(f"[pdf_uploader DEBUG] Chunking text from '{original_filename}' (total length: {len(text_content)} chars)")
-    chunked_documents = _chunk_text(text_content, original_filename)
-    
-    if not chunked_documents:
-        return False, f"No valid chunks created from '{original_filename}' after text splitting."
-    
-    print(f"[pdf_uploader DEBUG] Created {len(chunked_documents)} chunks from '{original_filename}'")
+    previous = None
+    if existing:
+        # Same filename, new content: update the stored document in place
+        document_uuid = existing["document_id"]
+        try:
+            previous = _PreviousVersion(_select_document_rows(document_uuid))
+        except Exception as e:
+            return False, f"Failed to load the stored version of '{original_filename}': {e}", details
+    else:
+        document_uuid = _allocate_document_uuid()
+        if not document_uuid:
+            return False, "Failed to generate unique UUID after multiple attempts", details
     
-    # Generate embeddings for all chunks
+    # Extract, chunk, embed and insert page by page; the storage upload runs alongside
     try:
-        embeddings = _generate_embeddings_for_chunks(chunked_documents)
+        chunk_count, error = _stream_pdf_into_database(pdf_bytes, original_filename, tenant_id, document_uuid,
+                                                       document_hash, progress, on_progress, previous)
     except Exception as e:
-        return False, f"Failed to generate embeddings: {e}"
-    
-    # Insert chunks and embeddings into database FIRST to get the document UUID
-    success, message, document_uuid = _insert_chunks_to_database(chunked_documents, embeddings, original_filename, tenant_id.strip())
-    if not success or not document_uuid:
-        return False, message
+        error = f"Failed to process PDF: {e}"
+    details.update(progress)
+    if error:
+        return False, error, details
     
-    # Upload PDF to storage using the document UUID as filename
-    upload_success, upload_error = _upload_pdf_to_storage(pdf_bytes, original_filename, document_uuid, tenant_id.strip())
-    if not upload_success:
-        # Clean up database entries if storage upload fails
-        try:
-            supabase.table("internal_documents").delete().eq("document_id", document_uuid).execute()
-        except:
-            pass  # Don't fail the whole operation if cleanup fails
-        return False, upload_error
+    details.update(document_id=document_uuid, chunks_created=chunk_count)
+    if previous is not None:
+        details["outcome"] = "updated"
+        return True, (
+            f"File '{original_filename}' updated in database as {chunk_count} chunks "
+            f"({progress['chunks_embedded']} re-embedded, {progress['rows_deleted']} removed)."
+        ), details
     
-    return True, f"File '{original_filename}' processed and added to database as {len(chunked_documents)} chunks."
+    details["outcome"] = "added"
+    return True, f"File '{original_filename}' processed and added to database as {chunk_count} chunks.", details
+
+async def process_and_add_pdf_async(pdf_bytes: bytes, original_filename: str, tenant_id: str,
+                                    on_progress=None) -> tuple[bool, str, dict]:
+    """
+    Run process_and_add_pdf on the bounded ingest executor, keeping the event loop free.
+    Concurrent callers beyond INGEST_MAX_CONCURRENT_FILES queue for a slot.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _ingest_executor,
+        functools.partial(context.run, process_and_add_pdf, pdf_bytes, original_filename, tenant_id, on_progress)
+    )
 
 def extract_text_from_pdf(pdf_path):
     """
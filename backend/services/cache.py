@@ -0,0 +1,398 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def normalize_text_key(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a cache entry."""
+    return " ".join(text.split()).casefold()
+
+
+def hash_text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text_key(text).encode("utf-8")).hexdigest()
+
+
+class _LoadAbandoned(Exception):
+    """Set on a shared load whose leading caller was cancelled; waiters retry the load."""
+
+
+class AsyncTTLCache:
+    """
+    Async-safe LRU cache with per-entry TTL and single-flight loading.
+    Concurrent misses for the same key share one loader call; loader errors are
+    propagated to every waiter and never cached. If the caller running the load is
+    cancelled, a waiting caller takes the load over instead of being cancelled too.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 1024):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Keys invalidated while a load is in flight, so a load that started before a write is
+        # not stored; an entry lives only as long as the load it refers to
+        self._invalidated: set = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _get_fresh(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+        if key in self._inflight:
+            self._invalidated.add(key)
+
+    def clear(self):
+        for key in list(self._entries):
+            self.invalidate(key)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, calling loader() at most once per miss."""
+        while True:
+            found, value = self._get_fresh(key)
+            if found:
+                self.hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LoadAbandoned:
+                # The leading caller was cancelled; check again and take the load over if nobody has
+                continue
+
+        self.misses += 1
+        self._invalidated.discard(key)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Fail the shared future with a retryable error rather than cancelling the waiters
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved so an unawaited future does not log a warning
+            future.exception()
+            raise
+        else:
+            if key not in self._invalidated:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                self._invalidated.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SqliteKVStore:
+    """
+    On-disk key/value tier backed by SQLite.
+    The file is shared by every worker process on the host; WAL mode lets readers
+    proceed while another process writes. Values are raw bytes.
+    """
+
+    # Prune to max_entries once every this many writes, not on every write
+    PRUNE_EVERY_WRITES = 500
+
+    def __init__(self, path: str, table: str = "kv", max_entries: int = 100_000):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (value, created_at) or None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[bytes, float]]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            for key, value, created_at in rows:
+                found[key] = (value, created_at)
+        return found
+
+    def set(self, key: str, value: bytes):
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        now = time.time()
+        rows = [(key, value, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+            self._writes_since_prune += len(rows)
+            if self._writes_since_prune >= self.PRUNE_EVERY_WRITES:
+                self._writes_since_prune = 0
+                self._prune_locked()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _prune_locked(self):
+        """Evict the oldest rows beyond max_entries."""
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+# Shared by every SWRCache for background revalidation
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class SWRCache:
+    """
+    Thread-safe LRU cache with TTL and stale-while-revalidate, for blocking loaders.
+    Entries younger than ttl_seconds are served as-is. Entries up to stale_seconds past
+    the TTL are served immediately while a background thread reloads them. Older entries
+    are reloaded inline, with concurrent misses for one key sharing a single load.
+    Memory is bounded by both entry count and the JSON size of the cached values.
+    The optional SqliteKVStore tier shares entries across worker processes.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, stale_seconds: float = 0.0, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024, disk_store: Optional[SqliteKVStore] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._disk = disk_store
+
+        # key -> (created_at, value, size_bytes)
+        self._entries: "OrderedDict[str, tuple[float, Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._refreshing: set = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _memory_put_locked(self, key: str, created_at: float, value: Any, size: int):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous[2]
+        self._entries[key] = (created_at, value, size)
+        self._total_bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted[2]
+            self.evictions += 1
+
+    def _disk_get(self, key: str):
+        if self._disk is None:
+            return None
+        try:
+            found = self._disk.get(key)
+        except Exception as e:
+            print(f"[cache WARNING] {self.name} disk read failed: {e}")
+            return None
+        if found is None:
+            return None
+        blob, created_at = found
+        value = json.loads(blob)
+        with self._lock:
+            self._memory_put_locked(key, created_at, value, len(blob))
+            self.disk_hits += 1
+        return created_at, value, len(blob)
+
+    def _store(self, key: str, value: Any):
+        encoded = json.dumps(value, default=str).encode("utf-8")
+        with self._lock:
+            self._memory_put_locked(key, time.time(), value, len(encoded))
+        if self._disk is not None:
+            try:
+                self._disk.set(key, encoded)
+            except Exception as e:
+                print(f"[cache WARNING] {self.name} disk write failed: {e}")
+
+    def _load(self, key: str, loader: Callable[[], Any], should_cache: Optional[Callable[[Any], bool]]):
+        value = loader()
+        if should_cache is None or should_cache(value):
+            self._store(key, value)
+        return value
+
+    def _refresh(self, key: str, loader: Callable[[], Any], should_cache: Optional[Callable[[Any], bool]]):
+        try:
+            self._load(key, loader, should_cache)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print(f"[cache WARNING] {self.name} background refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: str, loader: Callable[[], Any], should_cache: Optional[Callable[[Any], bool]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        _refresh_executor.submit(self._refresh, key, loader, should_cache)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+        should_cache(value) can reject results (e.g. errors) so they are returned but not stored.
+        """
+        entry = self._memory_get(key) or self._disk_get(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age <= self.ttl_seconds:
+                with self._lock:
+                    self.hits += 1
+                return entry[1]
+            if age <= self.ttl_seconds + self.stale_seconds:
+                with self._lock:
+                    self.stale_hits += 1
+                self._schedule_refresh(key, loader, should_cache)
+                return entry[1]
+
+        with self._lock:
+            event = self._inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = threading.Event()
+                self._inflight[key] = event
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            event.wait()
+            entry = self._memory_get(key)
+            if entry is not None:
+                return entry[1]
+            # The leader's result was not cacheable; load independently
+            return loader()
+
+        try:
+            return self._load(key, loader, should_cache)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry[2]
+        if self._disk is not None:
+            self._disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "disk_enabled": self._disk is not None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
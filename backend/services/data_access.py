@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from services import supabase_service
+from services.metrics import timed
+
+# Async data-access layer over the synchronous Supabase client.
+# Every call runs on a dedicated, bounded thread pool so request handlers never block
+# the event loop, and a burst of slow queries cannot exhaust the default executor.
+
+SUPABASE_MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+
+_supabase_executor = ThreadPoolExecutor(max_workers=SUPABASE_MAX_WORKERS, thread_name_prefix="supabase")
+
+async def run_supabase_call(operation: str, fn, *args, **kwargs):
+    """
+    Run a blocking Supabase call on the bounded executor, preserving context variables.
+    The call (including time queued for a worker) is timed as a "supabase" span named operation.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    with timed("supabase", operation):
+        return await loop.run_in_executor(_supabase_executor, functools.partial(context.run, fn, *args, **kwargs))
+
+def _client():
+    # Looked up at call time so tests and benchmarks can swap the client
+    return supabase_service.supabase
+
+def _raise_for_error(response):
+    if hasattr(response, 'error') and response.error:
+        raise RuntimeError(f"Supabase error: {response.error}")
+    return response
+
+# --- tenants ---
+
+async def fetch_tenant(tenant_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+    """Return the tenant row, or None if it does not exist."""
+    def _query():
+        return _raise_for_error(_client().table('tenants').select(columns).eq('id', tenant_id).execute())
+    response = await run_supabase_call("tenants.select", _query)
+    return response.data[0] if response.data else None
+
+async def tenant_exists(tenant_id: str) -> bool:
+    return await fetch_tenant(tenant_id, columns='id') is not None
+
+async def update_tenant(tenant_id: str, update_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Update a tenant row and return the updated rows."""
+    def _query():
+        return _raise_for_error(_client().table('tenants').update(update_data).eq('id', tenant_id).execute())
+    response = await run_supabase_call("tenants.update", _query)
+    return response.data or []
+
+# --- viral_content ---
+
+async def select_viral_content_since(columns: str, created_after: Optional[str], after_key: Optional[tuple], limit: int) -> List[Dict[str, Any]]:
+    """
+    Page through viral_content in (created_at, id) order, starting at created_after (inclusive).
+    Inclusive so rows sharing the watermark timestamp are never skipped; callers de-duplicate by id.
+    Pages are keyset-paginated: pass the (created_at, id) of the previous page's last row as
+    after_key, so rows sharing a timestamp are neither skipped nor repeated between pages.
+    """
+    def _query():
+        query = _client().table('viral_content').select(columns)
+        if created_after is not None:
+            query = query.gte('created_at', created_after)
+        if after_key is not None:
+            created_at, row_id = after_key
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}")')
+        query = query.order('created_at').order('id').limit(limit)
+        return _raise_for_error(query.execute())
+    response = await run_supabase_call("viral_content.select_since", _query)
+    return response.data or []
+
+# --- RPC ---
+
+async def call_rpc(function_name: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _query():
+        return _raise_for_error(_client().rpc(function_name, params).execute())
+    response = await run_supabase_call(f"rpc.{function_name}", _query)
+    return response.data or []
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Embedding backends behind one interface (embed_query / embed_documents / embed(texts, task_type)).
+# "remote" calls the Nomic API; "local" runs the same nomic-embed-text-v1.5 weights on CPU through
+# sentence-transformers (optionally its ONNX backend), so ingestion and search work offline.
+
+# --- Embedding Provider Configuration ---
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "remote")  # "remote" or "local"
+EMBEDDINGS_LOCAL_MODEL = os.getenv("EMBEDDINGS_LOCAL_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+EMBEDDINGS_LOCAL_BACKEND = os.getenv("EMBEDDINGS_LOCAL_BACKEND", "torch")  # "torch" or "onnx"
+EMBEDDINGS_LOCAL_BATCH_SIZE = int(os.getenv("EMBEDDINGS_LOCAL_BATCH_SIZE", "32"))
+EMBEDDINGS_LOCAL_THREADS = int(os.getenv("EMBEDDINGS_LOCAL_THREADS", str(min(4, os.cpu_count() or 1))))
+
+# Nomic models are trained with task prefixes; the remote API adds them from task_type
+_TASK_PREFIXES = {
+    "search_query": "search_query: ",
+    "search_document": "search_document: ",
+    "classification": "classification: ",
+    "clustering": "clustering: ",
+}
+
+
+class LocalNomicEmbeddings:
+    """
+    nomic-embed-text on CPU via sentence-transformers. Texts are split into batches that run
+    on a small thread pool (the model releases the GIL during inference); vectors are
+    Matryoshka-truncated to dimensionality and unit-normalized like the remote API's.
+    """
+
+    def __init__(self, model_name: str, dimensionality: int, backend: str = "torch",
+                 batch_size: int = 32, threads: int = 1):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDINGS_PROVIDER=local requires sentence-transformers "
+                "(pip install sentence-transformers, plus optimum[onnxruntime] for the onnx backend)"
+            ) from e
+
+        kwargs = {"trust_remote_code": True, "device": "cpu"}
+        if backend != "torch":
+            kwargs["backend"] = backend
+        self._model = SentenceTransformer(model_name, **kwargs)
+        self.dimensionality = dimensionality
+        self.batch_size = max(1, batch_size)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="embeddings")
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        return self._model.encode(texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=False)
+
+    def embed(self, texts: list[str], *, task_type: str) -> list[list[float]]:
+        if not texts:
+            return []
+        prefix = _TASK_PREFIXES.get(task_type, "")
+        prefixed = [prefix + text for text in texts]
+        batches = [prefixed[i:i + self.batch_size] for i in range(0, len(prefixed), self.batch_size)]
+        vectors = np.vstack(list(self._executor.map(self._encode_batch, batches))).astype(np.float32)
+        return _matryoshka(vectors, self.dimensionality).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text], task_type="search_query")[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed(texts, task_type="search_document")
+
+
+def _matryoshka(vectors: np.ndarray, dimensionality: int) -> np.ndarray:
+    # Nomic's recipe for shorter vectors: layer norm over the full vector, truncate, renormalize
+    if dimensionality < vectors.shape[1]:
+        vectors = (vectors - vectors.mean(axis=1, keepdims=True)) / np.sqrt(vectors.var(axis=1, keepdims=True) + 1e-5)
+        vectors = vectors[:, :dimensionality]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def create_embeddings(model_name: str, dimensionality: int, provider: str = EMBEDDINGS_PROVIDER):
+    """Build the configured embedding backend for model_name (a Nomic model name)."""
+    if provider == "local":
+        return LocalNomicEmbeddings(
+            EMBEDDINGS_LOCAL_MODEL,
+            dimensionality,
+            backend=EMBEDDINGS_LOCAL_BACKEND,
+            batch_size=EMBEDDINGS_LOCAL_BATCH_SIZE,
+            threads=EMBEDDINGS_LOCAL_THREADS,
+        )
+    if provider == "remote":
+        from langchain_nomic import NomicEmbeddings
+        # The API key should be set as NOMIC_API_KEY environment variable
+        return NomicEmbeddings(model=model_name, inference_mode="remote", dimensionality=dimensionality)
+    raise ValueError(f"Unknown EMBEDDINGS_PROVIDER '{provider}', expected 'remote' or 'local'")
+
+
+def cache_model_tag(model_name: str, provider: str = EMBEDDINGS_PROVIDER) -> str:
+    """Model name used in embedding cache keys; local vectors differ slightly, so they are cached apart."""
+    return model_name if provider == "remote" else f"{model_name}@{provider}"
@@ -1,22 +1,188 @@
 import os
+import threading
+from array import array
+from collections import OrderedDict
 from dotenv import load_dotenv
-from langchain_nomic import NomicEmbeddings
+from services.cache import SqliteKVStore, hash_text_key
+from services.embedding_providers import EMBEDDINGS_PROVIDER, create_embeddings, cache_model_tag
+from services.metrics import timed
 
 load_dotenv()
 
+EMBEDDINGS_MODEL_NAME = "nomic-embed-text-v1.5"
+EMBEDDINGS_DIMENSIONALITY = 768
+
+# --- Embedding Cache Configuration ---
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))  # In-memory LRU entries
+EMBEDDING_CACHE_DISK_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "200000"))
+# Set EMBEDDING_CACHE_PATH to an empty string to disable the on-disk tier
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'embeddings.sqlite')
+)
+
+
+class CachedEmbeddings:
+    """
+    Embeddings wrapper with an in-memory LRU tier and an optional on-disk SQLite tier.
+    Entries are keyed by (model, dimensionality, task, normalized text hash); query and
+    document embeddings are cached separately because Nomic prefixes them differently.
+    Exposes the same embed_query / embed_documents interface as the wrapped model.
+    """
+
+    def __init__(self, embeddings, model: str, dimensionality: int, memory_entries: int = 4096, disk_store: SqliteKVStore = None):
+        self._embeddings = embeddings
+        self.model = model
+        self.dimensionality = dimensionality
+        self.memory_entries = max(1, memory_entries)
+        self._disk = disk_store
+
+        # Vectors are held as float32 arrays: ~3KB each instead of ~25KB as a list of floats
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str, task: str) -> str:
+        return f"{self.model}:{self.dimensionality}:{task}:{hash_text_key(text)}"
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key: str, vector: array):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list[str]) -> dict:
+        """Resolve keys from memory, then disk; returns {key: float32 array} for hits."""
+        found = {}
+        disk_candidates = []
+        for key in keys:
+            vector = self._memory_get(key)
+            if vector is not None:
+                found[key] = vector
+            else:
+                disk_candidates.append(key)
+
+        memory_hits = len(found)
+        disk_hits = 0
+        if disk_candidates and self._disk is not None:
+            try:
+                for key, (blob, _) in self._disk.get_many(disk_candidates).items():
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+                    self._memory_put(key, vector)
+                    disk_hits += 1
+            except Exception as e:
+                print(f"[embeddings_service WARNING] Embedding disk cache read failed: {e}")
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += len(keys) - memory_hits - disk_hits
+        return found
+
+    def _store(self, entries: list[tuple[str, list[float]]]):
+        disk_rows = []
+        for key, embedding in entries:
+            vector = array("f", embedding)
+            self._memory_put(key, vector)
+            disk_rows.append((key, vector.tobytes()))
+        if disk_rows and self._disk is not None:
+            try:
+                self._disk.set_many(disk_rows)
+            except Exception as e:
+                print(f"[embeddings_service WARNING] Embedding disk cache write failed: {e}")
+
+    def _embed_cached(self, texts: list[str], task: str, embed_missing) -> list[list[float]]:
+        keys = [self._key(text, task) for text in texts]
+        found = self._lookup(keys)
+
+        # Embed each distinct missing text once, in a single upstream call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            with timed("embedding", f"embed_{task}"):
+                embeddings = embed_missing(list(missing.values()))
+            new_entries = list(zip(missing.keys(), embeddings))
+            self._store(new_entries)
+            for key, embedding in new_entries:
+                found[key] = array("f", embedding)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed_cached([text], "query", lambda missing: [self._embeddings.embed_query(missing[0])])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed_cached(texts, "document", self._embeddings.embed_documents)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several search queries with one upstream request; vectors match embed_query."""
+        return self._embed_cached(texts, "query", self._embed_queries_upstream)
+
+    def _embed_queries_upstream(self, texts: list[str]) -> list[list[float]]:
+        # embed_documents would apply Nomic's search_document prefix, so batch with the query task instead
+        if hasattr(self._embeddings, "embed"):
+            return self._embeddings.embed(texts, task_type="search_query")
+        return [self._embeddings.embed_query(text) for text in texts]
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model,
+            "dimensionality": self.dimensionality,
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.memory_entries,
+            "disk_enabled": self._disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _open_disk_cache():
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    try:
+        return SqliteKVStore(EMBEDDING_CACHE_PATH, table="embeddings", max_entries=EMBEDDING_CACHE_DISK_ENTRIES)
+    except Exception as e:
+        print(f"[embeddings_service WARNING] Embedding disk cache disabled: {e}")
+        return None
+
+
 # Initialize embeddings model once
 try:
-    # Use Nomic's remote API instead of local Ollama
-    shared_embeddings = NomicEmbeddings(
-        model="nomic-embed-text-v1.5",
-        inference_mode="remote",  # Use remote API
-        dimensionality=768,  # Full dimensionality for best performance
-        # The API key should be set as NOMIC_API_KEY environment variable
+    # Nomic's remote API by default; EMBEDDINGS_PROVIDER=local runs the model on CPU
+    base_embeddings = create_embeddings(EMBEDDINGS_MODEL_NAME, EMBEDDINGS_DIMENSIONALITY)
+    shared_embeddings = CachedEmbeddings(
+        base_embeddings,
+        model=cache_model_tag(EMBEDDINGS_MODEL_NAME),
+        dimensionality=EMBEDDINGS_DIMENSIONALITY,
+        memory_entries=EMBEDDING_CACHE_SIZE,
+        disk_store=_open_disk_cache(),
     )
-    print("Successfully initialized NomicEmbeddings with remote API")
+    print(f"Successfully initialized {EMBEDDINGS_MODEL_NAME} embeddings ({EMBEDDINGS_PROVIDER})")
 except Exception as e:
-    print(f"CRITICAL: Failed to initialize NomicEmbeddings in embeddings_service.py: {e}")
-    print("Ensure NOMIC_API_KEY is set in your environment variables.")
-    print("Get your API key from https://atlas.nomic.ai/")
+    print(f"CRITICAL: Failed to initialize {EMBEDDINGS_PROVIDER} embeddings in embeddings_service.py: {e}")
+    if EMBEDDINGS_PROVIDER == "remote":
+        print("Ensure NOMIC_API_KEY is set in your environment variables.")
+        print("Get your API key from https://atlas.nomic.ai/")
     # Depending on desired behavior, you might exit or disable tools that need embeddings
-    shared_embeddings = None # Set to None so tools can check and fail gracefully 
\ No newline at end of file
+    shared_embeddings = None # Set to None so tools can check and fail gracefully
+
+def get_embedding_cache_stats() -> dict:
+    return shared_embeddings.stats() if shared_embeddings is not None else {}
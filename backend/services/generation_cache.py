@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from services.cache import hash_text_key
+
+# --- Semantic Generation Cache Configuration ---
+GENERATION_CACHE_ENABLED = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+GENERATION_CACHE_TTL_SECONDS = float(os.getenv("GENERATION_CACHE_TTL_SECONDS", "3600"))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "2048"))
+# Prompt-embedding cosine similarity needed to return a stored post as-is
+GENERATION_CACHE_HIT_THRESHOLD = float(os.getenv("GENERATION_CACHE_HIT_THRESHOLD", "0.97"))
+# Lower bar to reuse a stored post's gathered information and skip straight to post creation
+GENERATION_CACHE_WARM_THRESHOLD = float(os.getenv("GENERATION_CACHE_WARM_THRESHOLD", "0.90"))
+
+
+def context_version(company_context: str) -> str:
+    """Version tag for a tenant's company context; entries from an older context never match."""
+    return hash_text_key(company_context)[:16]
+
+
+class _Entry:
+    __slots__ = ("vector", "context_version", "result", "gathered_info", "expires_at")
+
+    def __init__(self, vector: np.ndarray, version: str, result: Dict[str, Any], gathered_info: str, expires_at: float):
+        self.vector = vector
+        self.context_version = version
+        self.result = result
+        self.gathered_info = gathered_info
+        self.expires_at = expires_at
+
+
+class SemanticGenerationCache:
+    """
+    Finished generations keyed by (tenant, modality, image flag) and looked up by prompt
+    similarity: a near-identical prompt returns the stored result, a similar one returns its
+    gathered information as a warm start. Entries expire after ttl_seconds and the least
+    recently used are evicted past max_entries across all tenants.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, hit_threshold: float, warm_threshold: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.hit_threshold = hit_threshold
+        self.warm_threshold = min(warm_threshold, hit_threshold)
+        # Scope -> {entry id -> entry}, each scope in LRU order; _order tracks global LRU order
+        self._scopes: Dict[Tuple, "OrderedDict[int, _Entry]"] = {}
+        self._order: "OrderedDict[int, Tuple]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.warm_starts = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, tenant_id: str, modality: str, generate_image: bool, version: str,
+               prompt_vector) -> Tuple[str, Optional[Dict[str, Any]], str]:
+        """Return ("hit", result, info), ("warm", None, info) or ("miss", None, "")."""
+        query = _unit(prompt_vector)
+        scope = (tenant_id, modality, bool(generate_image))
+        now = time.monotonic()
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries:
+                for entry_id in [i for i, e in entries.items() if e.expires_at < now or e.context_version != version]:
+                    self._remove(scope, entry_id)
+            if not entries:
+                self.misses += 1
+                return "miss", None, ""
+
+            ids = list(entries)
+            similarities = np.stack([entries[i].vector for i in ids]) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            entry_id = ids[best]
+            entry = entries[entry_id]
+            if similarity < self.warm_threshold:
+                self.misses += 1
+                return "miss", None, ""
+
+            entries.move_to_end(entry_id)
+            self._order.move_to_end(entry_id)
+            if similarity >= self.hit_threshold:
+                self.hits += 1
+                return "hit", dict(entry.result), entry.gathered_info
+            self.warm_starts += 1
+            return "warm", None, entry.gathered_info
+
+    def store(self, tenant_id: str, modality: str, generate_image: bool, version: str,
+              prompt_vector, result: Dict[str, Any], gathered_info: str):
+        scope = (tenant_id, modality, bool(generate_image))
+        entry = _Entry(_unit(prompt_vector), version, dict(result), gathered_info,
+                       time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._scopes.setdefault(scope, OrderedDict())[entry_id] = entry
+            self._order[entry_id] = scope
+            while len(self._order) > self.max_entries:
+                oldest_id, oldest_scope = next(iter(self._order.items()))
+                self._remove(oldest_scope, oldest_id)
+                self.evictions += 1
+
+    def invalidate_tenant(self, tenant_id: str):
+        with self._lock:
+            for scope in [scope for scope in self._scopes if scope[0] == tenant_id]:
+                for entry_id in list(self._scopes[scope]):
+                    self._remove(scope, entry_id)
+
+    def _remove(self, scope: Tuple, entry_id: int):
+        entries = self._scopes.get(scope)
+        if entries is not None:
+            entries.pop(entry_id, None)
+            if not entries:
+                del self._scopes[scope]
+        self._order.pop(entry_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.warm_starts + self.misses
+        return {
+            "enabled": GENERATION_CACHE_ENABLED,
+            "entries": len(self._order),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "warm_starts": self.warm_starts,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _unit(vector) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+generation_cache = SemanticGenerationCache(
+    GENERATION_CACHE_TTL_SECONDS,
+    GENERATION_CACHE_MAX_ENTRIES,
+    GENERATION_CACHE_HIT_THRESHOLD,
+    GENERATION_CACHE_WARM_THRESHOLD,
+)
+
+def get_generation_cache_stats() -> dict:
+    return generation_cache.stats()
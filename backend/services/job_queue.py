@@ -0,0 +1,227 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+# Cap on replayable events per job so a chatty pipeline cannot grow memory without bound;
+# terminal events are always kept and progress is replayed as its latest snapshot only
+MAX_EVENTS_PER_JOB = 2000
+TERMINAL_EVENTS = ("result", "error")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """A unit of background work with a status, a result and a replayable event log."""
+
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params or {}
+        self.status = JOB_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.progress: Dict[str, Any] = {}
+        self.events: List[tuple] = []
+        self._terminal_events: List[tuple] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    def publish(self, event_type: str, payload: Dict[str, Any]):
+        """Record an event and push it to every live subscriber."""
+        item = (event_type, payload)
+        if event_type in TERMINAL_EVENTS:
+            self._terminal_events.append(item)
+        elif len(self.events) < MAX_EVENTS_PER_JOB:
+            self.events.append(item)
+        self._push(item)
+
+    def update_progress(self, **progress):
+        """Merge progress counters and notify subscribers; late subscribers get only the latest snapshot."""
+        self.progress.update(progress)
+        self._push(self._progress_event())
+
+    def _progress_event(self) -> tuple:
+        return ("progress", {"job_id": self.id, "progress": dict(self.progress)})
+
+    def _push(self, item: tuple):
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(item)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Return a queue that replays past events and then receives live ones.
+        A None sentinel marks the end of the stream.
+        """
+        subscriber: asyncio.Queue = asyncio.Queue()
+        replay = list(self.events)
+        if self.progress:
+            replay.append(self._progress_event())
+        for item in replay + self._terminal_events:
+            subscriber.put_nowait(item)
+        if self.status in FINISHED_STATES:
+            subscriber.put_nowait(None)
+        else:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: asyncio.Queue):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def _close_subscribers(self):
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(None)
+        self._subscribers.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded in-process job queue.
+    A fixed number of asyncio workers pull jobs off the queue, so at most max_concurrency
+    jobs run at once; submissions beyond max_queue_size are rejected with QueueFullError.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 4, max_queue_size: int = 100, job_ttl_seconds: float = 3600.0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(1, max_queue_size)
+        self.job_ttl_seconds = job_ttl_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._running = 0
+
+        self.submitted_total = 0
+        self.succeeded_total = 0
+        self.failed_total = 0
+        self.rejected_total = 0
+
+    def _ensure_workers(self):
+        """Start the worker tasks on first use, inside the running event loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrency:
+            self._workers.append(asyncio.create_task(self._worker_loop()))
+
+    async def submit(self, kind: str, job_fn: Callable[[Job], Awaitable[Any]], params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue job_fn(job) for execution and return the Job immediately.
+        Raises QueueFullError when the queue is at capacity.
+        """
+        self._ensure_workers()
+        self._purge_expired()
+
+        job = Job(kind, params)
+        try:
+            self._queue.put_nowait((job, job_fn))
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            raise QueueFullError(f"The {self.name} queue is full ({self.max_queue_size} jobs waiting). Try again shortly.")
+
+        self._jobs[job.id] = job
+        self.submitted_total += 1
+        job.publish("queued", {"job_id": job.id, "queue_depth": self._queue.qsize()})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _worker_loop(self):
+        while True:
+            job, job_fn = await self._queue.get()
+            self._running += 1
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            job.publish("started", {"job_id": job.id})
+            try:
+                job.result = await job_fn(job)
+                job.status = JOB_SUCCEEDED
+                self.succeeded_total += 1
+                job.publish("result", {"job_id": job.id, "result": job.result})
+            except asyncio.CancelledError:
+                job.status = JOB_FAILED
+                job.error = "Job was cancelled"
+                self.failed_total += 1
+                job.publish("error", {"job_id": job.id, "error": job.error})
+                raise
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                self.failed_total += 1
+                job.publish("error", {"job_id": job.id, "error": job.error})
+            finally:
+                job.finished_at = time.time()
+                job._close_subscribers()
+                self._running -= 1
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        """Drop finished jobs whose results have outlived the TTL."""
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters for monitoring."""
+        return {
+            "name": self.name,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "submitted_total": self.submitted_total,
+            "succeeded_total": self.succeeded_total,
+            "failed_total": self.failed_total,
+            "rejected_total": self.rejected_total,
+            "tracked_jobs": len(self._jobs),
+        }
+
+
+# Shared queue for content-generation pipelines (each runs several o3 calls plus tools)
+generation_job_queue = JobQueue(
+    name="generation",
+    max_concurrency=int(os.getenv("MAX_CONCURRENT_PIPELINES", "4")),
+    max_queue_size=int(os.getenv("MAX_QUEUED_GENERATION_JOBS", "100")),
+    job_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600")),
+)
+
+# Shared queue for background document ingestion (extract, embed and insert one uploaded file)
+ingestion_job_queue = JobQueue(
+    name="ingestion",
+    max_concurrency=int(os.getenv("MAX_CONCURRENT_INGESTION_JOBS", os.getenv("INGEST_MAX_CONCURRENT_FILES", "3"))),
+    max_queue_size=int(os.getenv("MAX_QUEUED_INGESTION_JOBS", "50")),
+    job_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600")),
+)
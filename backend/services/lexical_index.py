@@ -0,0 +1,483 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from services import supabase_service
+from services.metrics import timed
+from services.vector_index import VectorIndex, VECTOR_INDEX_SPILL_DIR, parse_embedding
+
+# --- Lexical Index Configuration ---
+# Resident tenant indexes are evicted least recently used first once their estimated size exceeds
+# this. The budget is per process: every uvicorn worker keeps its own indexes, so the total is
+# this times the worker count.
+LEXICAL_INDEX_MAX_MB = float(os.getenv("LEXICAL_INDEX_MAX_MB", "128"))
+# Resident tenant indexes are refreshed in the background after this long to pick up chunks written
+# or removed by other workers; searches keep using the resident index until the refresh lands
+LEXICAL_INDEX_TTL_SECONDS = float(os.getenv("LEXICAL_INDEX_TTL_SECONDS", "600"))
+LEXICAL_INDEX_REFRESH_WORKERS = int(os.getenv("LEXICAL_INDEX_REFRESH_WORKERS", "2"))
+# How long a search waits for a tenant's first load (after a restart or eviction) before
+# answering without BM25; the load keeps running in the background either way
+LEXICAL_INDEX_COLD_WAIT_SECONDS = float(os.getenv("LEXICAL_INDEX_COLD_WAIT_SECONDS", "3"))
+LEXICAL_INDEX_PAGE_SIZE = 1000
+LEXICAL_INDEX_FETCH_BATCH = 200  # chunk ids per in_() filter when fetching changed chunks
+LEXICAL_FIELDS = ("id", "tenant_id", "document_id", "file_name", "content", "chunk_index", "total_chunks")
+# Enough to tell which chunks a refresh has to fetch again
+_POSITION_FIELDS = ("id", "chunk_index", "total_chunks")
+# Rough CPython overheads used to estimate an index's footprint
+_ROW_BYTES = 600
+_POSTING_BYTES = 100
+
+# Optionally keep each resident tenant's chunk embeddings as well, so document vector search
+# runs in-process instead of through the search_internal_documents RPC. Storage is a
+# VectorIndex encoding ("float32", "int8" or "binary"); quantized codes are rescored exactly.
+DOCUMENT_LOCAL_VECTORS = os.getenv("DOCUMENT_LOCAL_VECTORS", "false").lower() == "true"
+DOCUMENT_VECTOR_STORAGE = os.getenv("DOCUMENT_VECTOR_STORAGE", "int8")
+DOCUMENT_VECTOR_SHORT_DIMENSIONALITY = int(os.getenv("DOCUMENT_VECTOR_SHORT_DIMENSIONALITY", "256"))
+DOCUMENT_RERANK_CANDIDATES = int(os.getenv("DOCUMENT_RERANK_CANDIDATES", "100"))
+_VECTOR_PARTITION = "chunks"
+
+RRF_K = 60  # Standard reciprocal rank fusion constant
+
+# Numbers, versions and hyphenated names stay whole ("3.5", "1,200", "gpt-4") and are also split into parts
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,\-/][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_PATTERN.findall((text or "").lower()):
+        if match not in _STOPWORDS:
+            tokens.append(match)
+        parts = re.split(r"[.,\-/]", match)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over chunk rows keyed by id, with per-document removal."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Any, int]] = {}
+        self._lengths: Dict[Any, int] = {}
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        self._by_document: Dict[Any, set] = {}
+        self._total_length = 0
+        self._content_bytes = 0
+        self._posting_count = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, rows: List[Dict[str, Any]]):
+        with self._lock:
+            for row in rows:
+                key = row.get("id")
+                if key is None:
+                    continue
+                if key in self._rows:
+                    self._remove_chunk(key)
+                content = row.get("content") or ""
+                term_counts = Counter(tokenize(content))
+                for term, count in term_counts.items():
+                    self._postings.setdefault(term, {})[key] = count
+                self._posting_count += len(term_counts)
+                self._content_bytes += len(content)
+                length = sum(term_counts.values())
+                self._lengths[key] = length
+                self._total_length += length
+                self._rows[key] = {field: row.get(field) for field in LEXICAL_FIELDS}
+                self._by_document.setdefault(row.get("document_id"), set()).add(key)
+
+    def remove_document(self, document_id: str) -> set:
+        """Remove every chunk of a document; returns the removed chunk ids."""
+        with self._lock:
+            keys = set(self._by_document.pop(document_id, ()))
+            for key in keys:
+                self._remove_chunk(key)
+            return keys
+
+    def remove_chunks(self, keys) -> set:
+        """Remove chunks by id; returns the ids that were indexed."""
+        with self._lock:
+            removed = {key for key in keys if key in self._rows}
+            for key in removed:
+                self._remove_chunk(key)
+            return removed
+
+    def _remove_chunk(self, key):
+        row = self._rows.pop(key)
+        self._total_length -= self._lengths.pop(key, 0)
+        content = row.get("content") or ""
+        self._content_bytes -= len(content)
+        for term in set(tokenize(content)):
+            postings = self._postings.get(term)
+            if postings is not None and postings.pop(key, None) is not None:
+                self._posting_count -= 1
+                if not postings:
+                    del self._postings[term]
+        siblings = self._by_document.get(row.get("document_id"))
+        if siblings is not None:
+            siblings.discard(key)
+
+    def chunk_positions(self) -> Dict[Any, tuple]:
+        """chunk id -> (chunk_index, total_chunks) for every indexed chunk."""
+        with self._lock:
+            return {key: (row.get("chunk_index"), row.get("total_chunks")) for key, row in self._rows.items()}
+
+    def approximate_bytes(self) -> int:
+        with self._lock:
+            return self._content_bytes + len(self._rows) * _ROW_BYTES + self._posting_count * _POSTING_BYTES
+
+    def search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """Top k rows by BM25 score (each a copy with a "bm25_score" field), best first."""
+        with self._lock:
+            total = len(self._rows)
+            if not total:
+                return []
+            average_length = self._total_length / total or 1.0
+            scores: Dict[Any, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, count in postings.items():
+                    norm = count + self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * count * (self.k1 + 1) / norm
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [dict(self._rows[key], bm25_score=round(score, 4)) for key, score in top]
+
+
+class _TenantIndex:
+    __slots__ = ("bm25", "vectors")
+
+    def __init__(self, bm25: BM25Index, vectors: Optional[VectorIndex]):
+        self.bm25 = bm25
+        self.vectors = vectors
+
+    def __len__(self):
+        return len(self.bm25)
+
+    def approximate_bytes(self) -> int:
+        vector_bytes = self.vectors.stats()["bytes"] if self.vectors is not None else 0
+        return self.bm25.approximate_bytes() + vector_bytes
+
+
+class TenantLexicalIndexes:
+    """
+    Per-tenant BM25 indexes over internal_documents (plus local vector indexes when
+    local_vectors is set). A tenant's first search schedules a background load and waits up to
+    cold_wait_seconds for it, then is served without the index; after ttl_seconds searches keep using the resident index while a
+    background refresh applies only the chunks added, moved or removed since. Resident indexes
+    are evicted least recently used first once their estimated size exceeds max_bytes.
+    Ingestion updates resident indexes in place.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, local_vectors: bool = False, refresh_workers: int = 2,
+                 cold_wait_seconds: float = 0.0):
+        self.max_bytes = max(1, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.cold_wait_seconds = cold_wait_seconds
+        self.local_vectors = local_vectors
+        self._indexes: "OrderedDict[str, list]" = OrderedDict()  # tenant_id -> [_TenantIndex, refreshed_at]
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}  # tenant_id -> Future of the load or refresh in flight
+        self._executor = ThreadPoolExecutor(max_workers=max(1, refresh_workers), thread_name_prefix="lexical-index")
+        self.loads = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.cold_searches = 0
+
+    def _resident(self, tenant_id: str) -> Optional[_TenantIndex]:
+        with self._lock:
+            entry = self._indexes.get(tenant_id)
+            if entry is None:
+                return None
+            self._indexes.move_to_end(tenant_id)
+            return entry[0]
+
+    def _schedule(self, tenant_id: str) -> tuple:
+        """
+        (resident index or None, Future of the load or refresh in flight or None). Starts a
+        background load when the tenant is not resident, or a refresh when its index is older
+        than the TTL; never queries on the caller's thread.
+        """
+        with self._lock:
+            entry = self._indexes.get(tenant_id)
+            if entry is not None:
+                self._indexes.move_to_end(tenant_id)
+            expired = entry is None or time.monotonic() - entry[1] > self.ttl_seconds
+            if expired and tenant_id not in self._pending:
+                self._pending[tenant_id] = self._executor.submit(self._refresh, tenant_id)
+            return (entry[0] if entry is not None else None), self._pending.get(tenant_id)
+
+    def _get(self, tenant_id: str) -> Optional[_TenantIndex]:
+        """
+        The tenant's resident index, possibly older than the TTL while a refresh runs. A first
+        load is waited for up to cold_wait_seconds; None if it is still running after that.
+        """
+        index, pending = self._schedule(tenant_id)
+        if index is not None:
+            return index
+        if pending is not None and self.cold_wait_seconds > 0:
+            wait([pending], timeout=self.cold_wait_seconds)
+        index = self._resident(tenant_id)
+        if index is None:
+            self.cold_searches += 1
+            print(f"[lexical_index WARNING] Index for tenant {tenant_id} is still loading; searching without BM25")
+        return index
+
+    def _refresh(self, tenant_id: str):
+        try:
+            with self._lock:
+                entry = self._indexes.get(tenant_id)
+            if entry is None:
+                index = self._load(tenant_id)
+            else:
+                index = entry[0]
+                self._apply_changes(tenant_id, index)
+            with self._lock:
+                self._indexes[tenant_id] = [index, time.monotonic()]
+                self._indexes.move_to_end(tenant_id)
+                self._evict_over_budget(keep=tenant_id)
+        except Exception as e:
+            # The stale index keeps serving; the next search after the TTL retries
+            print(f"[lexical_index WARNING] Refreshing index for tenant {tenant_id} failed: {e}")
+            with self._lock:
+                entry = self._indexes.get(tenant_id)
+                if entry is not None:
+                    entry[1] = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending.pop(tenant_id, None)
+
+    def _evict_over_budget(self, keep: str):
+        # Caller holds self._lock
+        total = sum(entry[0].approximate_bytes() for entry in self._indexes.values())
+        for tenant_id in list(self._indexes):
+            if total <= self.max_bytes:
+                break
+            if tenant_id == keep:
+                continue
+            total -= self._indexes.pop(tenant_id)[0].approximate_bytes()
+            self.evictions += 1
+
+    def _new_vector_index(self, tenant_id: str) -> Optional[VectorIndex]:
+        if not self.local_vectors:
+            return None
+        return VectorIndex(
+            f"internal_documents:{tenant_id}",
+            short_dimensionality=DOCUMENT_VECTOR_SHORT_DIMENSIONALITY,
+            rerank_candidates=DOCUMENT_RERANK_CANDIDATES,
+            storage=DOCUMENT_VECTOR_STORAGE,
+            spill_dir=VECTOR_INDEX_SPILL_DIR,
+        )
+
+    def _load(self, tenant_id: str) -> _TenantIndex:
+        index = _TenantIndex(BM25Index(), self._new_vector_index(tenant_id))
+        columns = LEXICAL_FIELDS + (("embedding",) if index.vectors is not None else ())
+        vectors = []
+        offset = 0
+        with timed("supabase", "internal_documents.select_lexical"):
+            while True:
+                response = (
+                    supabase_service.supabase.table("internal_documents")
+                    .select(", ".join(columns))
+                    .eq("tenant_id", tenant_id)
+                    .order("id")
+                    .range(offset, offset + LEXICAL_INDEX_PAGE_SIZE - 1)
+                    .execute()
+                )
+                page = response.data or []
+                index.bm25.add(page)
+                if index.vectors is not None:
+                    vectors.extend(_vector_items(page))
+                if len(page) < LEXICAL_INDEX_PAGE_SIZE:
+                    break
+                offset += LEXICAL_INDEX_PAGE_SIZE
+        if index.vectors is not None and vectors:
+            index.vectors.replace_all({_VECTOR_PARTITION: vectors})
+        self.loads += 1
+        print(f"[lexical_index DEBUG] Loaded {len(index)} chunks for tenant {tenant_id}")
+        return index
+
+    def _apply_changes(self, tenant_id: str, index: _TenantIndex):
+        """
+        Bring a resident index up to date with internal_documents: list the tenant's chunk ids
+        and positions, then fetch only chunks that are new or moved and drop those that are gone.
+        """
+        # Snapshot before listing so chunks this worker indexes meanwhile are never dropped
+        resident = index.bm25.chunk_positions()
+        current = {}
+        last_id = None
+        with timed("supabase", "internal_documents.select_lexical_positions"):
+            while True:
+                query = (
+                    supabase_service.supabase.table("internal_documents")
+                    .select(", ".join(_POSITION_FIELDS))
+                    .eq("tenant_id", tenant_id)
+                )
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                page = query.order("id").limit(LEXICAL_INDEX_PAGE_SIZE).execute().data or []
+                for row in page:
+                    current[row["id"]] = (row.get("chunk_index"), row.get("total_chunks"))
+                if len(page) < LEXICAL_INDEX_PAGE_SIZE:
+                    break
+                last_id = page[-1]["id"]
+
+        removed = resident.keys() - current.keys()
+        changed = [key for key, position in current.items() if resident.get(key) != position]
+        rows = self._fetch_chunks(tenant_id, changed, with_embeddings=index.vectors is not None)
+        _remove_rows(index, removed)
+        _add_rows(index, rows)
+        self.refreshes += 1
+        if removed or changed:
+            print(f"[lexical_index DEBUG] Refreshed tenant {tenant_id}: {len(changed)} chunks added or moved, {len(removed)} removed")
+
+    def _fetch_chunks(self, tenant_id: str, chunk_ids: list, with_embeddings: bool) -> List[Dict[str, Any]]:
+        columns = LEXICAL_FIELDS + (("embedding",) if with_embeddings else ())
+        rows = []
+        with timed("supabase", "internal_documents.select_lexical"):
+            for start in range(0, len(chunk_ids), LEXICAL_INDEX_FETCH_BATCH):
+                response = (
+                    supabase_service.supabase.table("internal_documents")
+                    .select(", ".join(columns))
+                    .eq("tenant_id", tenant_id)
+                    .in_("id", chunk_ids[start:start + LEXICAL_INDEX_FETCH_BATCH])
+                    .execute()
+                )
+                rows.extend(response.data or [])
+        return rows
+
+    def search(self, tenant_id: str, query: str, k: int) -> Optional[List[Dict[str, Any]]]:
+        """Top k BM25 matches, or None while the tenant's index is still loading (cold)."""
+        index = self._get(tenant_id)
+        if index is None:
+            return None
+        with timed("index", "internal_documents.bm25"):
+            return index.bm25.search(query, k)
+
+    def vector_search_many(self, tenant_id: str, query_vectors: list, k: int) -> Optional[List[List[Dict[str, Any]]]]:
+        """Local vector matches per query, or None when local vectors are disabled or still loading (use the RPC)."""
+        if not self.local_vectors:
+            return None
+        index = self._get(tenant_id)
+        if index is None or index.vectors is None:
+            return None
+        with timed("index", "internal_documents.vector"):
+            results = index.vectors.search_many(query_vectors, _VECTOR_PARTITION, k)
+        # An empty partition means the tenant has no chunks, not that the index is unavailable
+        return results if results is not None else [[] for _ in query_vectors]
+
+    def vector_search(self, tenant_id: str, query_vector: list, k: int) -> Optional[List[Dict[str, Any]]]:
+        results = self.vector_search_many(tenant_id, [query_vector], k)
+        return results[0] if results is not None else None
+
+    def add_chunks(self, tenant_id: str, rows: List[Dict[str, Any]]):
+        """
+        Index freshly ingested chunks if the tenant is resident; otherwise start loading the
+        tenant's index now, so it is ready by the time the new document is searched.
+        """
+        index = self._resident(tenant_id)
+        if index is None:
+            self._schedule(tenant_id)
+            return
+        _add_rows(index, rows)
+        with self._lock:
+            self._evict_over_budget(keep=tenant_id)
+
+    def remove_document(self, tenant_id: str, document_id: str):
+        index = self._resident(tenant_id)
+        if index is not None:
+            removed = index.bm25.remove_document(document_id)
+            if index.vectors is not None and removed:
+                index.vectors.remove(_VECTOR_PARTITION, removed)
+
+    def remove_chunks(self, tenant_id: str, chunk_ids):
+        index = self._resident(tenant_id)
+        if index is not None:
+            _remove_rows(index, chunk_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = [entry[0] for entry in self._indexes.values()]
+            pending = len(self._pending)
+        return {
+            "tenants": len(indexes),
+            "bytes": sum(index.approximate_bytes() for index in indexes),
+            "max_bytes": self.max_bytes,
+            "chunks": sum(len(index) for index in indexes),
+            "vector_bytes": sum(index.vectors.stats()["bytes"] for index in indexes if index.vectors is not None),
+            "pending_refreshes": pending,
+            "loads": self.loads,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "cold_searches": self.cold_searches,
+        }
+
+
+def _add_rows(index: _TenantIndex, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    index.bm25.add(rows)
+    if index.vectors is not None:
+        vectors = _vector_items(rows)
+        if vectors:
+            index.vectors.upsert({_VECTOR_PARTITION: vectors})
+
+
+def _remove_rows(index: _TenantIndex, chunk_ids):
+    removed = index.bm25.remove_chunks(chunk_ids)
+    if index.vectors is not None and removed:
+        index.vectors.remove(_VECTOR_PARTITION, removed)
+
+
+def _vector_items(rows: List[Dict[str, Any]]) -> List[tuple]:
+    return [
+        ({field: row.get(field) for field in LEXICAL_FIELDS}, parse_embedding(row["embedding"]))
+        for row in rows if row.get("embedding") is not None and row.get("id") is not None
+    ]
+
+
+def _chunk_key(row: Dict[str, Any]):
+    # The vector RPC may not return row ids, so chunks are matched on document and content
+    return (row.get("document_id"), row.get("content"))
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[Dict[str, Any]]], limit: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion: score = sum of 1 / (k + rank).
+    Rows found by several retrievers are merged (earlier lists win on conflicting fields).
+    """
+    scores: Dict[Any, float] = {}
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for ranked in ranked_lists:
+        for rank, row in enumerate(ranked):
+            key = _chunk_key(row)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            existing = merged.setdefault(key, dict(row))
+            for field, value in row.items():
+                existing.setdefault(field, value)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [dict(merged[key], rrf_score=round(scores[key], 6)) for key in ordered]
+
+
+tenant_lexical_indexes = TenantLexicalIndexes(
+    int(LEXICAL_INDEX_MAX_MB * 1024 * 1024), LEXICAL_INDEX_TTL_SECONDS, DOCUMENT_LOCAL_VECTORS, LEXICAL_INDEX_REFRESH_WORKERS,
+    LEXICAL_INDEX_COLD_WAIT_SECONDS
+)
+
+def get_lexical_index_stats() -> dict:
+    return tenant_lexical_indexes.stats()
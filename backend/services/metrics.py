@@ -0,0 +1,138 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Latency buckets (seconds) spanning cache hits through multi-minute o3 calls
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Minimal thread-safe Prometheus histogram keyed by a fixed set of label names."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...] = PHASE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # labels -> bucket counts + [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[label_values] = series
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            for upper_bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{upper_bound}"}} {int(count)}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {int(series[-1])}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {int(series[-1])}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Phases: "llm" (o3 calls), "tool" (each tool in call_mcp_tools), "embedding" (Nomic calls
+# that missed the cache), "supabase" (queries, RPCs and storage) and "index" (local vector search)
+phase_latency = Histogram(
+    "audienceai_phase_duration_seconds",
+    "Duration of pipeline phases (LLM calls, tools, embeddings, Supabase) in seconds.",
+    ("phase", "operation"),
+)
+
+# Spans for the request currently being served; propagated into tasks and worker threads
+_request_spans: ContextVar[Optional[list]] = ContextVar("request_spans", default=None)
+
+
+def start_request_timings() -> list:
+    """Begin collecting spans for the current request and return the span list."""
+    spans = []
+    _request_spans.set(spans)
+    return spans
+
+
+class timed:
+    """
+    Time a block as a span of the given phase, for both `with` and `async with`.
+    The duration is recorded in the phase histogram and on the current request's span list.
+    """
+
+    def __init__(self, phase: str, operation: str):
+        self.phase = phase
+        self.operation = operation
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        phase_latency.observe(duration, self.phase, self.operation)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append({
+                "phase": self.phase,
+                "operation": self.operation,
+                "seconds": round(duration, 4),
+                "error": exc_type is not None,
+            })
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+def summarize_timings(spans: list) -> Dict[str, Any]:
+    """Per-phase totals plus the raw spans, for attaching to a response."""
+    phases: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        phase = phases.setdefault(span["phase"], {"count": 0, "seconds": 0.0})
+        phase["count"] += 1
+        phase["seconds"] = round(phase["seconds"] + span["seconds"], 4)
+    return {"phases": phases, "spans": list(spans)}
+
+
+# --- Gauges from component stats (caches, job queues) ---
+
+_stats_collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+
+def register_stats_collector(prefix: str, collect: Callable[[], Dict[str, Any]]):
+    """Expose every numeric field of collect() as a gauge named <prefix>_<field>."""
+    _stats_collectors.append((prefix, collect))
+
+
+def render_prometheus() -> str:
+    lines = phase_latency.render()
+    for prefix, collect in _stats_collectors:
+        try:
+            stats = collect() or {}
+        except Exception as e:
+            lines.append(f"# {prefix} collector failed: {_escape(e)}")
+            continue
+        for field, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {prefix}_{field} gauge")
+            lines.append(f"{prefix}_{field} {value}")
+    return "\n".join(lines) + "\n"
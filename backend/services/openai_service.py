@@ -1,4 +1,7 @@
 import os
+import json
+import threading
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
@@ -6,11 +9,76 @@ from langchain_openai import ChatOpenAI
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path)
 
+# --- Connection Pool Configuration ---
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "32"))
+OPENAI_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "120"))
+OPENAI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("OPENAI_REQUEST_TIMEOUT_SECONDS", "120"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "10"))
+
+# --- Global Instances (Lazy Initialization) ---
+_llm_lock = threading.Lock()
+_shared_llm = None
+
+# Bound runnables keyed by (llm identity, kind, serialized tools/schema, tool_choice).
+# Each value holds a reference to its llm, so the id() in the key cannot be reused.
+_bound_runnables = {}
+_bound_runnables_lock = threading.Lock()
+
+def _build_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Create keep-alive HTTP clients shared by every request to the OpenAI API."""
+    limits = httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(OPENAI_REQUEST_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS)
+    return httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout)
+
 def initialize_llm():
-    """Initialize and return the LLM instance with proper configuration."""
-    return ChatOpenAI(
-        model="o3", 
-        request_timeout=120.0, 
-        
-        model_kwargs={"response_format": {"type": "text"}}
-    ) 
\ No newline at end of file
+    """
+    Return the process-wide LLM instance with proper configuration.
+    The client is built once and reuses pooled HTTP connections across requests.
+    """
+    global _shared_llm
+    if _shared_llm is None:
+        with _llm_lock:
+            if _shared_llm is None:
+                http_client, http_async_client = _build_http_clients()
+                _shared_llm = ChatOpenAI(
+                    model="o3",
+                    request_timeout=OPENAI_REQUEST_TIMEOUT_SECONDS,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    model_kwargs={"response_format": {"type": "text"}}
+                )
+    return _shared_llm
+
+def set_shared_llm(llm):
+    """Replace the process-wide LLM instance (e.g. with a scripted model for offline benchmarks)."""
+    global _shared_llm
+    with _llm_lock:
+        _shared_llm = llm
+
+def _schema_key(value) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+def _get_or_bind(key: tuple, build):
+    runnable = _bound_runnables.get(key)
+    if runnable is None:
+        with _bound_runnables_lock:
+            runnable = _bound_runnables.get(key)
+            if runnable is None:
+                runnable = build()
+                _bound_runnables[key] = runnable
+    return runnable
+
+def bind_tools_cached(llm, tools: list, tool_choice: str = "auto"):
+    """Return llm.bind_tools(tools, tool_choice=...), memoized per llm and tool set."""
+    key = (id(llm), "tools", _schema_key(tools), tool_choice)
+    return _get_or_bind(key, lambda: llm.bind_tools(tools, tool_choice=tool_choice))
+
+def with_structured_output_cached(llm, schema: dict):
+    """Return llm.with_structured_output(schema), memoized per llm and schema."""
+    key = (id(llm), "structured", _schema_key(schema), None)
+    return _get_or_bind(key, lambda: llm.with_structured_output(schema))
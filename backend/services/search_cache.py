@@ -0,0 +1,49 @@
+import os
+from services.cache import SWRCache, SqliteKVStore, hash_text_key
+
+# --- Linkup Result Cache Configuration ---
+LINKUP_CACHE_TTL_SECONDS = float(os.getenv("LINKUP_CACHE_TTL_SECONDS", "3600"))
+# Past the TTL, results are still served for this long while a background refresh runs
+LINKUP_CACHE_STALE_SECONDS = float(os.getenv("LINKUP_CACHE_STALE_SECONDS", "21600"))
+LINKUP_CACHE_MAX_ENTRIES = int(os.getenv("LINKUP_CACHE_MAX_ENTRIES", "2048"))
+LINKUP_CACHE_MAX_BYTES = int(os.getenv("LINKUP_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+LINKUP_CACHE_DISK_ENTRIES = int(os.getenv("LINKUP_CACHE_DISK_ENTRIES", "50000"))
+# Set LINKUP_CACHE_PATH to an empty string to disable the on-disk tier
+LINKUP_CACHE_PATH = os.getenv(
+    "LINKUP_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'search_results.sqlite')
+)
+
+def _open_disk_cache():
+    if not LINKUP_CACHE_PATH:
+        return None
+    try:
+        return SqliteKVStore(LINKUP_CACHE_PATH, table="linkup_results", max_entries=LINKUP_CACHE_DISK_ENTRIES)
+    except Exception as e:
+        print(f"[search_cache WARNING] Linkup disk cache disabled: {e}")
+        return None
+
+# Web and image search results are tenant-independent, so one cache serves every tenant and worker
+linkup_search_cache = SWRCache(
+    name="linkup_search",
+    ttl_seconds=LINKUP_CACHE_TTL_SECONDS,
+    stale_seconds=LINKUP_CACHE_STALE_SECONDS,
+    max_entries=LINKUP_CACHE_MAX_ENTRIES,
+    max_bytes=LINKUP_CACHE_MAX_BYTES,
+    disk_store=_open_disk_cache(),
+)
+
+def cached_linkup_search(search_type: str, query: str, search_fn) -> dict:
+    """
+    Return search_fn(query) through the shared Linkup cache.
+    Keyed by search type and normalized query; error results are never cached.
+    """
+    key = f"{search_type}:{hash_text_key(query)}"
+    return linkup_search_cache.get_or_load(
+        key,
+        lambda: search_fn(query),
+        should_cache=lambda result: isinstance(result, dict) and "error" not in result
+    )
+
+def get_search_cache_stats() -> dict:
+    return linkup_search_cache.stats()
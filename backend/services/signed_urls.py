@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services import supabase_service
+from services.metrics import timed
+
+# --- Signed URL Cache Configuration ---
+SIGNED_URL_EXPIRY_SECONDS = 3600
+# URLs are reissued this long before they expire, so a link handed to the agent stays valid
+SIGNED_URL_REFRESH_MARGIN_SECONDS = float(os.getenv("SIGNED_URL_REFRESH_MARGIN_SECONDS", "300"))
+SIGNED_URL_CACHE_SIZE = int(os.getenv("SIGNED_URL_CACHE_SIZE", "4096"))
+STORAGE_BUCKET = "files"
+
+
+def document_storage_path(tenant_id: str, document_id: str, filename: str) -> str:
+    """Storage path of an uploaded document: {tenant_id}/{document_id}{extension}."""
+    return f"{tenant_id}/{document_id}{os.path.splitext(filename or '')[1]}"
+
+
+class SignedUrlCache:
+    """
+    Thread-safe LRU of storage signed URLs keyed by (bucket, path). Misses for a whole
+    batch of paths are signed with one create_signed_urls call; entries expire
+    refresh_margin seconds before the URL itself does. Failures are never cached.
+    """
+
+    def __init__(self, expiry_seconds: int, refresh_margin_seconds: float, max_entries: int = 4096):
+        self.expiry_seconds = expiry_seconds
+        self.ttl_seconds = max(0.0, expiry_seconds - refresh_margin_seconds)
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def _get_fresh(self, key: tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, url = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return url
+
+    def _store(self, key: tuple, url: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, url)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, paths: List[str], bucket: str = STORAGE_BUCKET) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Return {path: (signed_url, error)} for the distinct paths, signing all misses in one call."""
+        results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        missing = []
+        with self._lock:
+            for path in dict.fromkeys(paths):
+                url = self._get_fresh((bucket, path))
+                if url is not None:
+                    self.hits += 1
+                    results[path] = (url, None)
+                else:
+                    self.misses += 1
+                    missing.append(path)
+        if not missing:
+            return results
+
+        try:
+            with timed("supabase", "storage.create_signed_urls"):
+                response = supabase_service.supabase.storage.from_(bucket).create_signed_urls(
+                    missing, self.expiry_seconds
+                )
+            self.batches += 1
+        except Exception as e:
+            print(f"[signed_urls WARNING] Batch signing of {len(missing)} paths failed: {e}")
+            results.update({path: (None, f"Failed to generate signed URL: {e}") for path in missing})
+            return results
+
+        signed = {}
+        for item in response or []:
+            url = item.get('signedURL') or item.get('signedUrl')
+            if item.get('path') and url and not item.get('error'):
+                signed[item['path']] = url
+            elif item.get('path'):
+                results[item['path']] = (None, f"Failed to create signed URL: {item.get('error')}")
+        with self._lock:
+            for path, url in signed.items():
+                self._store((bucket, path), url)
+        for path in missing:
+            if path in signed:
+                results[path] = (signed[path], None)
+            else:
+                results.setdefault(path, (None, "Failed to create signed URL: no URL returned"))
+        return results
+
+    def get(self, path: str, bucket: str = STORAGE_BUCKET) -> Tuple[Optional[str], Optional[str]]:
+        return self.get_many([path], bucket)[path]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+signed_url_cache = SignedUrlCache(SIGNED_URL_EXPIRY_SECONDS, SIGNED_URL_REFRESH_MARGIN_SECONDS, SIGNED_URL_CACHE_SIZE)
+
+def get_signed_url_cache_stats() -> dict:
+    return signed_url_cache.stats()
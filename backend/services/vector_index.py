@@ -0,0 +1,504 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from services import data_access
+from services.metrics import timed
+
+# --- Viral Content Index Configuration ---
+VIRAL_INDEX_ENABLED = os.getenv("VIRAL_INDEX_ENABLED", "true").lower() == "true"
+VIRAL_INDEX_REFRESH_SECONDS = float(os.getenv("VIRAL_INDEX_REFRESH_SECONDS", "300"))
+# Incremental refreshes only see new rows; a periodic full reload picks up edits and deletions
+VIRAL_INDEX_FULL_RELOAD_SECONDS = float(os.getenv("VIRAL_INDEX_FULL_RELOAD_SECONDS", "21600"))
+VIRAL_INDEX_PAGE_SIZE = 500
+# Two-stage search: shortlist on a Matryoshka prefix of each vector, then rerank the shortlist
+# with the full vector. 0 disables the first stage.
+VIRAL_INDEX_SHORT_DIMENSIONALITY = int(os.getenv("VIRAL_INDEX_SHORT_DIMENSIONALITY", "256"))
+VIRAL_INDEX_RERANK_CANDIDATES = int(os.getenv("VIRAL_INDEX_RERANK_CANDIDATES", "200"))
+# First-stage storage: "float32", "int8" (4x smaller) or "binary" (32x smaller). Quantized
+# candidates are always rescored with the full-precision vectors.
+VIRAL_INDEX_STORAGE = os.getenv("VIRAL_INDEX_STORAGE", "float32")
+# Where two-stage indexes (prefix or quantized first stage) memory-map their full-precision
+# vectors, so only the first-stage codes stay on the heap; "" keeps them on the heap
+VECTOR_INDEX_SPILL_DIR = os.getenv(
+    "VECTOR_INDEX_SPILL_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '.cache', 'vectors')
+)
+# Maximal Marginal Relevance trade-off when examples are over-fetched: 1.0 ranks purely by
+# relevance, lower values favour examples unlike the ones already picked
+VIRAL_MMR_LAMBDA = float(os.getenv("VIRAL_MMR_LAMBDA", "0.7"))
+VIRAL_CONTENT_COLUMNS = "id, type, content, embedding, target_audience, media_description, content_url, created_at"
+
+
+def parse_embedding(value) -> np.ndarray:
+    """pgvector columns arrive over PostgREST as '[0.1,0.2,...]' strings; lists are accepted too."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def truncate_matryoshka(vectors: np.ndarray, dimensionality: int) -> np.ndarray:
+    """Leading dimensions of Matryoshka embeddings (e.g. nomic-embed-text-v1.5), renormalized."""
+    return np.ascontiguousarray(_normalize(vectors[..., :dimensionality]))
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores in each row, best first."""
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def maximal_marginal_relevance(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """
+    Greedy MMR over unit vectors: each pick maximizes
+    lambda * sim(query, row) - (1 - lambda) * max sim(row, already picked).
+    Returns positions into candidates, in pick order.
+    """
+    count = len(candidates)
+    k = min(k, count)
+    if k <= 0:
+        return []
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+    redundancy = np.full(count, -np.inf, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    picks = []
+    for _ in range(k):
+        objective = lambda_mult * relevance - (1.0 - lambda_mult) * (redundancy if picks else 0.0)
+        objective[~available] = -np.inf
+        pick = int(np.argmax(objective))
+        picks.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, pairwise[pick])
+    return picks
+
+
+def diversify_rows(query_vector, rows: List[Dict[str, Any]], k: int, lambda_mult: float = VIRAL_MMR_LAMBDA) -> List[Dict[str, Any]]:
+    """
+    MMR-select k of a similarity-ordered candidate list that carries an "embedding" field
+    (e.g. RPC rows); lists without embeddings are just truncated. Embeddings are dropped.
+    """
+    rows = rows or []
+    vectors = [row.get("embedding") for row in rows]
+    if len(rows) > k > 1:
+        if all(vector is not None for vector in vectors):
+            matrix = _normalize(np.stack([parse_embedding(vector) for vector in vectors]))
+            query = _normalize(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+            rows = [rows[i] for i in maximal_marginal_relevance(query, matrix, k, lambda_mult)]
+        else:
+            print(f"[vector_index WARNING] Skipping MMR: {len(rows)} candidates came back without embeddings, "
+                  f"returning the top {k} by similarity")
+    return [{key: value for key, value in row.items() if key != "embedding"} for row in rows[:k]]
+
+
+# --- First-stage encodings (candidate generation) ---
+
+class _Float32Codes:
+    def __init__(self, vectors: np.ndarray):
+        self.data = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def score(self, queries: np.ndarray) -> np.ndarray:
+        return queries @ self.data.T
+
+
+class _Int8Codes:
+    """Symmetric per-dimension scalar quantization; the scales are folded into the query."""
+
+    # Codes are widened to float32 for BLAS one small block at a time, into a buffer reused
+    # across blocks that stays in cache; NumPy has no fast int8 matmul. Large blocks (or a new
+    # array per block) made the scan several times slower than exact float32 search.
+    BLOCK_ROWS = 256
+
+    def __init__(self, vectors: np.ndarray):
+        self.scale = (np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127.0).astype(np.float32)
+        self.data = np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def score(self, queries: np.ndarray) -> np.ndarray:
+        weighted = queries * self.scale
+        scores = np.empty((len(queries), len(self.data)), dtype=np.float32)
+        buffer = np.empty((min(self.BLOCK_ROWS, len(self.data)), self.data.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.data), self.BLOCK_ROWS):
+            codes = self.data[start:start + self.BLOCK_ROWS]
+            block = buffer[:len(codes)]
+            np.copyto(block, codes, casting="unsafe")
+            scores[:, start:start + len(codes)] = weighted @ block.T
+        return scores
+
+
+class _BinaryCodes:
+    """One sign bit per dimension, packed; candidates are ranked by Hamming distance."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.data = np.packbits(vectors > 0, axis=1)
+
+    def score(self, queries: np.ndarray) -> np.ndarray:
+        packed_queries = np.packbits(queries > 0, axis=1)
+        scores = np.empty((len(queries), len(self.data)), dtype=np.float32)
+        for i, packed in enumerate(packed_queries):
+            scores[i] = -_popcount(np.bitwise_xor(self.data, packed)).sum(axis=1, dtype=np.int32)
+        return scores
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values]
+
+
+FIRST_STAGE_ENCODINGS = {"float32": _Float32Codes, "int8": _Int8Codes, "binary": _BinaryCodes}
+
+
+def _spill_to_disk(matrix: np.ndarray, directory: str) -> np.ndarray:
+    """Move a matrix into an unlinked, memory-mapped temp file so the page cache holds it instead of the heap."""
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".f32", delete=False) as handle:
+        matrix.astype(np.float32).tofile(handle)
+        path = handle.name
+    try:
+        return np.memmap(path, dtype=np.float32, mode="r", shape=matrix.shape)
+    finally:
+        os.unlink(path)  # The mapping stays valid until the partition is garbage collected
+
+
+class _Partition:
+    """
+    Immutable snapshot of one partition: row metadata aligned with a unit-normalized float32
+    matrix (possibly memory-mapped), plus the first-stage encoding when two-stage search is on.
+    """
+
+    __slots__ = ("ids", "rows", "matrix", "first_stage")
+
+    def __init__(self, ids: List[Any], rows: List[Dict[str, Any]], matrix: np.ndarray, first_stage=None):
+        self.ids = ids
+        self.rows = rows
+        self.matrix = matrix
+        self.first_stage = first_stage
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over in-memory NumPy matrices, partitioned by a key.
+    Writers build a new partition snapshot and swap it in, so searches never take a lock
+    and never see a half-applied update. Brute force is sub-millisecond at tens of
+    thousands of rows, which comfortably covers the viral corpus.
+
+    Larger partitions can be searched in two stages: a scan over a compact first-stage copy
+    of the vectors picks rerank_candidates rows, which are then rescored exactly with the full
+    float32 vectors. The first stage uses a Matryoshka prefix (short_dimensionality) and/or a
+    quantized encoding (storage: "int8" or "binary"). Whenever a first stage is kept and a
+    spill_dir is set, the full vectors are memory-mapped from disk and only the first-stage
+    codes stay on the heap; exact rescoring reads just the shortlisted rows.
+    """
+
+    def __init__(self, name: str, short_dimensionality: int = 0, rerank_candidates: int = 200,
+                 storage: str = "float32", spill_dir: str = ""):
+        if storage not in FIRST_STAGE_ENCODINGS:
+            raise ValueError(f"Unknown vector storage '{storage}', expected one of {sorted(FIRST_STAGE_ENCODINGS)}")
+        if storage == "int8" and short_dimensionality <= 0:
+            # Each code is widened back to float32 while scanning, so without a shorter prefix the
+            # first stage is no faster than exact search; it only saves memory
+            print(f"[vector_index WARNING] {name}: int8 storage without a Matryoshka prefix scans at exact-search "
+                  f"speed; set a short dimensionality (e.g. 256) for faster search")
+        self.name = name
+        self.short_dimensionality = short_dimensionality
+        self.rerank_candidates = max(1, rerank_candidates)
+        self.storage = storage
+        self.spill_dir = spill_dir
+        self._partitions: Dict[str, _Partition] = {}
+        self._write_lock = threading.Lock()
+        self.searches = 0
+
+    def replace_all(self, rows_by_partition: Dict[str, List[tuple]]):
+        """Replace every partition with rows given as {partition: [(row, vector), ...]}."""
+        with self._write_lock:
+            self._partitions = {
+                key: self._build_partition(None, items) for key, items in rows_by_partition.items() if items
+            }
+
+    def upsert(self, rows_by_partition: Dict[str, List[tuple]]):
+        """Insert or replace rows by id, leaving other rows and partitions untouched."""
+        with self._write_lock:
+            partitions = dict(self._partitions)
+            for key, items in rows_by_partition.items():
+                if items:
+                    partitions[key] = self._build_partition(partitions.get(key), items)
+            self._partitions = partitions
+
+    def remove(self, partition: str, row_ids: set):
+        """Drop rows by id from a partition."""
+        with self._write_lock:
+            current = self._partitions.get(partition)
+            if current is None:
+                return
+            keep = [i for i, row_id in enumerate(current.ids) if row_id not in row_ids]
+            if len(keep) == len(current.ids):
+                return
+            partitions = dict(self._partitions)
+            if keep:
+                partitions[partition] = self._finish_partition(
+                    [current.ids[i] for i in keep], [current.rows[i] for i in keep], np.asarray(current.matrix[keep])
+                )
+            else:
+                partitions.pop(partition)
+            self._partitions = partitions
+
+    def _build_partition(self, current: Optional[_Partition], items: List[tuple]) -> _Partition:
+        # Last write wins for ids repeated within one batch
+        latest = {}
+        for row, vector in items:
+            latest[row["id"]] = (row, vector)
+
+        ids = list(current.ids) if current else []
+        rows = list(current.rows) if current else []
+        matrix = np.array(current.matrix) if current else None
+        dimensionality = matrix.shape[1] if matrix is not None else len(next(iter(latest.values()))[1])
+        positions = {row_id: i for i, row_id in enumerate(ids)}
+
+        appended = []
+        for row_id, (row, vector) in latest.items():
+            if len(vector) != dimensionality:
+                print(f"[vector_index WARNING] Skipping {self.name} row {row_id}: expected {dimensionality} dims, got {len(vector)}")
+                continue
+            position = positions.get(row_id)
+            if position is not None:
+                rows[position] = row
+                matrix[position] = _normalize(vector)
+            else:
+                ids.append(row_id)
+                rows.append(row)
+                appended.append(vector)
+
+        if appended:
+            new_rows = _normalize(np.stack(appended).astype(np.float32))
+            matrix = new_rows if matrix is None else np.vstack([matrix, new_rows])
+        if matrix is None:
+            matrix = np.empty((0, dimensionality), dtype=np.float32)
+        return self._finish_partition(ids, rows, matrix)
+
+    def _finish_partition(self, ids: List[Any], rows: List[Dict[str, Any]], matrix: np.ndarray) -> _Partition:
+        first_stage = None
+        use_prefix = 0 < self.short_dimensionality < matrix.shape[1]
+        if use_prefix or self.storage != "float32":
+            coarse = truncate_matryoshka(matrix, self.short_dimensionality) if use_prefix else matrix
+            first_stage = FIRST_STAGE_ENCODINGS[self.storage](coarse)
+        if self.spill_dir and first_stage is not None and len(matrix):
+            try:
+                matrix = _spill_to_disk(matrix, self.spill_dir)
+            except OSError as e:
+                print(f"[vector_index WARNING] Keeping {self.name} vectors in memory, spill failed: {e}")
+        return _Partition(ids, rows, matrix, first_stage)
+
+    def search(self, query_vector, partition: str, k: int, fetch_k: int = 0,
+               mmr_lambda: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the k most similar rows (each a copy with a "similarity" field), best first,
+        or None when the partition is not loaded so callers can fall back to the database.
+        """
+        results = self.search_many([query_vector], partition, k, fetch_k, mmr_lambda)
+        return results[0] if results is not None else None
+
+    def search_many(self, query_vectors, partition: str, k: int, fetch_k: int = 0,
+                    mmr_lambda: Optional[float] = None, distinct: bool = False) -> Optional[List[List[Dict[str, Any]]]]:
+        """
+        Score several queries against a partition in one pass; one result list per query.
+        With mmr_lambda set and fetch_k > k, the fetch_k best rows are re-selected down to k
+        by Maximal Marginal Relevance (results are then in pick order). With distinct and
+        fetch_k > k, each query skips rows already returned for an earlier query in the call
+        while its fetch_k shortlist has others, so a batch of similar queries (even with k = 1)
+        does not return the same row over and over.
+        """
+        snapshot = self._partitions.get(partition)
+        if snapshot is None or not snapshot.rows:
+            return None
+
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32))
+        if queries.ndim != 2 or queries.shape[1] != snapshot.matrix.shape[1]:
+            return None
+
+        diversify = mmr_lambda is not None and fetch_k > k > 1
+        distinct = distinct and fetch_k > k and len(queries) > 1
+        fetch = fetch_k if diversify or distinct else k
+        if snapshot.first_stage is not None and len(snapshot.rows) > max(fetch, self.rerank_candidates):
+            # Stage 1: shortlist on the compact encoding; stage 2: exact rescoring of the shortlist
+            coarse_queries = queries
+            if 0 < self.short_dimensionality < queries.shape[1]:
+                coarse_queries = truncate_matryoshka(queries, self.short_dimensionality)
+            candidates = _top_k(snapshot.first_stage.score(coarse_queries), max(fetch, self.rerank_candidates))
+            scores = np.einsum("qd,qcd->qc", queries, np.asarray(snapshot.matrix[candidates.ravel()]).reshape(
+                candidates.shape + (queries.shape[1],)
+            ))
+        else:
+            scores = queries @ np.asarray(snapshot.matrix).T
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+        best = _top_k(scores, min(fetch, scores.shape[1]))
+        results = []
+        returned = set()
+        for query, query_scores, query_candidates, query_best in zip(queries, scores, candidates, best):
+            if distinct:
+                fresh = [i for i in query_best if int(query_candidates[i]) not in returned]
+                if len(fresh) < k:
+                    # Shortlist exhausted: fill up with the best rows an earlier query already got
+                    fresh += [i for i in query_best if int(query_candidates[i]) in returned][:k - len(fresh)]
+                query_best = np.asarray(fresh, dtype=best.dtype)
+            if diversify:
+                shortlist = np.asarray(snapshot.matrix[query_candidates[query_best]])
+                query_best = query_best[maximal_marginal_relevance(query, shortlist, k, mmr_lambda)]
+            query_best = query_best[:k]
+            returned.update(int(query_candidates[i]) for i in query_best)
+            results.append([
+                dict(snapshot.rows[query_candidates[i]], similarity=float(query_scores[i])) for i in query_best
+            ])
+        self.searches += len(results)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        partitions = self._partitions
+        resident = 0
+        spilled = 0
+        for p in partitions.values():
+            if isinstance(p.matrix, np.memmap):
+                spilled += p.matrix.nbytes
+            else:
+                resident += p.matrix.nbytes
+            if p.first_stage is not None:
+                resident += p.first_stage.data.nbytes
+        return {
+            "partitions": len(partitions),
+            "rows": sum(len(p.rows) for p in partitions.values()),
+            "storage": self.storage,
+            "bytes": resident,
+            "spilled_bytes": spilled,
+            "searches": self.searches,
+        }
+
+
+class ViralContentIndex:
+    """
+    In-process replica of the viral_content table, partitioned by content type.
+    Loaded in full at startup, then refreshed incrementally from a created_at watermark.
+    """
+
+    def __init__(self):
+        self.index = VectorIndex(
+            "viral_content",
+            short_dimensionality=VIRAL_INDEX_SHORT_DIMENSIONALITY,
+            rerank_candidates=VIRAL_INDEX_RERANK_CANDIDATES,
+            storage=VIRAL_INDEX_STORAGE,
+            spill_dir=VECTOR_INDEX_SPILL_DIR,
+        )
+        self.loaded = False
+        self.watermark: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+        self._last_full_reload = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def refresh(self, full: bool = False) -> int:
+        """Pull new rows (or every row when full) into the index; returns the number of rows read."""
+        created_after = None if full else self.watermark
+        rows = []
+        after_key = None
+        while True:
+            page = await data_access.select_viral_content_since(VIRAL_CONTENT_COLUMNS, created_after, after_key, VIRAL_INDEX_PAGE_SIZE)
+            rows.extend(page)
+            if len(page) < VIRAL_INDEX_PAGE_SIZE:
+                break
+            after_key = (page[-1].get("created_at"), page[-1].get("id"))
+
+        # Parsing and matrix building are CPU-bound; keep them off the event loop
+        await asyncio.to_thread(self._apply, rows, full)
+        return len(rows)
+
+    def _apply(self, rows: List[Dict[str, Any]], full: bool):
+        rows_by_partition: Dict[str, List[tuple]] = {}
+        watermark = None if full else self.watermark
+        for row in rows:
+            embedding = row.pop("embedding", None)
+            if embedding is None or row.get("id") is None:
+                continue
+            rows_by_partition.setdefault(row.get("type") or "", []).append((row, parse_embedding(embedding)))
+            created_at = row.get("created_at")
+            if created_at is not None and (watermark is None or created_at > watermark):
+                watermark = created_at
+
+        if full:
+            self.index.replace_all(rows_by_partition)
+            self._last_full_reload = time.monotonic()
+        else:
+            self.index.upsert(rows_by_partition)
+        self.watermark = watermark
+        self.loaded = True
+        self.last_refresh = time.time()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(VIRAL_INDEX_REFRESH_SECONDS)
+            full = not self.loaded or time.monotonic() - self._last_full_reload >= VIRAL_INDEX_FULL_RELOAD_SECONDS
+            try:
+                count = await self.refresh(full=full)
+                if count:
+                    print(f"[vector_index DEBUG] {'Reloaded' if full else 'Refreshed'} viral_content index: {count} rows read")
+            except Exception as e:
+                print(f"[vector_index WARNING] viral_content index refresh failed: {e}")
+
+    async def start(self):
+        """Load the index and schedule background refreshes. Search tools use the RPC until this succeeds."""
+        if not VIRAL_INDEX_ENABLED or self._refresh_task is not None:
+            return
+        try:
+            count = await self.refresh(full=True)
+            print(f"[vector_index DEBUG] Loaded viral_content index: {count} rows, {self.index.stats()['partitions']} types")
+        except Exception as e:
+            print(f"[vector_index WARNING] Initial viral_content index load failed, using RPC until next refresh: {e}")
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def search(self, query_vector, content_type: str, match_count: int,
+               fetch_k: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """
+        Top matches for content_type shaped like search_viral_content RPC rows, or None to fall back.
+        When fetch_k exceeds match_count, the fetch_k best are MMR-diversified down to match_count.
+        """
+        if not self.loaded:
+            return None
+        with timed("index", "viral_content.search"):
+            return self.index.search(query_vector, content_type, match_count, fetch_k, VIRAL_MMR_LAMBDA)
+
+    def search_many(self, query_vectors, content_type: str, match_count: int,
+                    fetch_k: int = 0) -> Optional[List[List[Dict[str, Any]]]]:
+        """Like search for several queries (one model turn); examples are kept distinct across the queries."""
+        if not self.loaded:
+            return None
+        with timed("index", "viral_content.search_many"):
+            return self.index.search_many(query_vectors, content_type, match_count, fetch_k, VIRAL_MMR_LAMBDA, distinct=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": VIRAL_INDEX_ENABLED,
+            "loaded": self.loaded,
+            "watermark": self.watermark,
+            "last_refresh_age_seconds": round(time.time() - self.last_refresh, 1) if self.last_refresh else None,
+            **self.index.stats(),
+        }
+
+
+viral_content_index = ViralContentIndex()
+
+def get_viral_index_stats() -> dict:
+    return viral_content_index.stats()
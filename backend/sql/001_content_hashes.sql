@@ -0,0 +1,11 @@
+-- Content-hash re-ingestion (infra/pdf_uploader.py).
+-- chunk_hash: SHA-256 of a chunk's text; unchanged chunks keep their rows and embeddings.
+-- document_hash: SHA-256 of the uploaded PDF; re-uploading identical bytes is a no-op.
+-- Until this is applied, uploads skip any filename the tenant already has.
+
+alter table internal_documents add column if not exists chunk_hash text;
+alter table internal_documents add column if not exists document_hash text;
+
+-- Embedding reuse looks chunks up by (tenant_id, chunk_hash)
+create index if not exists internal_documents_tenant_chunk_hash_idx
+    on internal_documents (tenant_id, chunk_hash);
@@ -16,6 +16,7 @@ if __name__ == "__main__":
     print("   • http://localhost:8000/health - Health check")
     print("   • http://localhost:8000/queries/generate - Generate content")
     print("   • http://localhost:8000/queries/generate-stream - Generate with streaming")
+    print("   • http://localhost:8000/queries/jobs - Submit a background generation job")
     print("   • http://localhost:8000/uploads/ - File uploads")
     print("   • http://localhost:8000/docs - API documentation")
     print()
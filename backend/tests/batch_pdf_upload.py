@@ -75,29 +75,17 @@ def batch_ingest_pdfs_from_directory(pdf_directory_path: str):
                 pdf_bytes = f.read()
             
             # Process and add to vector database (with chunking)
-            success, message = process_and_add_pdf(pdf_bytes, pdf_file)
+            success, message, details = process_and_add_pdf(pdf_bytes, pdf_file)
             
             if success:
                 print(f"   ✅ SUCCESS: {message}")
                 successful_count += 1
-                # Extract chunk count from success message
-                if "chunks" in message:
-                    try:
-                        chunk_count = int(message.split("as ")[1].split(" chunks")[0])
-                        total_chunks_created += chunk_count
-                    except:
-                        pass  # If parsing fails, just continue
+                total_chunks_created += details["chunks_created"]
             else:
-                if "already exists" in message:
+                if details["outcome"] == "exists":
                     print(f"   ⏭️  SKIPPED: {message}")
                     skipped_count += 1
-                    # Extract chunk count from skip message for existing files
-                    if "chunks" in message:
-                        try:
-                            chunk_count = int(message.split("with ")[1].split(" chunks")[0])
-                            total_chunks_skipped += chunk_count
-                        except:
-                            pass
+                    total_chunks_skipped += details["chunks_created"]
                 else:
                     print(f"   ❌ FAILED: {message}")
                     failed_count += 1
@@ -1,11 +1,11 @@
 import os
 import pandas as pd
-from langchain_nomic import NomicEmbeddings
 import sys
 
 # Add the parent directory to the path to import services
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from services.supabase_service import supabase
+from services.embedding_providers import EMBEDDINGS_PROVIDER, create_embeddings
 
 # Determine the absolute path to the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,20 +15,16 @@ CSV_PATH = os.path.join(SCRIPT_DIR, "blog_data.csv")
 # Load the CSV data
 df = pd.read_csv(CSV_PATH)
 
-# Initialize embeddings model with Nomic remote API
-print("Initializing NomicEmbeddings with remote API...")
+# Initialize embeddings model (Nomic remote API unless EMBEDDINGS_PROVIDER=local)
+print(f"Initializing nomic-embed-text-v1.5 embeddings ({EMBEDDINGS_PROVIDER})...")
 try:
-    embeddings = NomicEmbeddings(
-        model="nomic-embed-text-v1.5",
-        inference_mode="remote",  # Use remote API
-        dimensionality=768,  # Full dimensionality for best performance
-        # The API key should be set as NOMIC_API_KEY environment variable
-    )
-    print("Successfully initialized NomicEmbeddings with remote API")
+    embeddings = create_embeddings("nomic-embed-text-v1.5", 768)  # Full dimensionality for best performance
+    print(f"Successfully initialized embeddings ({EMBEDDINGS_PROVIDER})")
 except Exception as e:
-    print(f"CRITICAL: Failed to initialize NomicEmbeddings: {e}")
-    print("Ensure NOMIC_API_KEY is set in your environment variables.")
-    print("Get your API key from https://atlas.nomic.ai/")
+    print(f"CRITICAL: Failed to initialize embeddings: {e}")
+    if EMBEDDINGS_PROVIDER == "remote":
+        print("Ensure NOMIC_API_KEY is set in your environment variables.")
+        print("Get your API key from https://atlas.nomic.ai/")
     raise e
 
 # Process the CSV data (always append posts)
@@ -1,5 +1,6 @@
 import os
 from linkup import LinkupClient
+from services.search_cache import cached_linkup_search
 
 def image_web_search(query: str) -> dict:
     """
@@ -8,7 +9,10 @@ def image_web_search(query: str) -> dict:
     Returns: dict: Dictionary containing image search results with URLs, titles, and truncated content.
     """
     print(f"Tool: Searching web for images with query: '{query}'")
-    
+    return cached_linkup_search("image", query, _image_web_search_uncached)
+
+def _image_web_search_uncached(query: str) -> dict:
+    """Call Linkup directly, bypassing the result cache."""
     try:
         # Initialize Linkup client with API key from environment
         linkup_api_key = os.getenv('LINKUP_API_KEY')
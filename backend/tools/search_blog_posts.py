@@ -1,5 +1,13 @@
+import os
 from services.embeddings_service import shared_embeddings
 from services.supabase_service import supabase
+from services.metrics import timed
+from services.vector_index import viral_content_index, diversify_rows
+
+# Examples returned to the agent, and candidates fetched per search. Fetching more than
+# BLOG_EXAMPLES_K re-selects the examples by MMR so they are not near-duplicates.
+BLOG_EXAMPLES_K = int(os.getenv("BLOG_EXAMPLES_K", "3"))
+BLOG_EXAMPLES_FETCH_K = max(BLOG_EXAMPLES_K, int(os.getenv("BLOG_EXAMPLES_FETCH_K", "10")))
 
 def search_blog_posts(query: str) -> dict:
     """
@@ -8,59 +16,95 @@ def search_blog_posts(query: str) -> dict:
     Returns: dict: Dictionary containing blog post examples with metadata and content.
     """
     print(f"Tool: Searching for blog posts with query: '{query}'")
-    
+
     if shared_embeddings is None:
         return {"error": "Embeddings model not available for blog post search."}
-    
+
     if supabase is None:
         return {"error": "Supabase client not available for blog post search."}
-    
+
     try:
         # Generate embedding for the query
         query_embedding = shared_embeddings.embed_query(query)
-        
-        # Use specific RPC function for viral content search
+
+        # Served from the in-process replica when it is loaded; the RPC is the fallback
+        matches = viral_content_index.search(query_embedding, 'blog', BLOG_EXAMPLES_K, BLOG_EXAMPLES_FETCH_K)
+        if matches is None:
+            matches = _search_viral_content_rpc(query_embedding)
+
+        return _build_search_result(query, matches)
+
+    except Exception as e:
+        print(f"Error in search_blog_posts tool: {e}")
+        print(f"Exception type: {type(e).__name__}")
+        import traceback
+        print(f"Full traceback: {traceback.format_exc()}")
+        return {"error": f"Error retrieving blog posts: {str(e)} (Type: {type(e).__name__})"}
+
+def search_blog_posts_batch(queries: list[str]) -> list[dict]:
+    """
+    Run several blog post searches from one model turn together: one embedding request
+    for all queries and one index pass. Returns one result dict per query, in order.
+    """
+    print(f"Tool: Searching for blog posts with {len(queries)} batched queries")
+
+    if shared_embeddings is None:
+        return [{"error": "Embeddings model not available for blog post search."} for _ in queries]
+
+    try:
+        query_embeddings = shared_embeddings.embed_queries(queries)
+
+        matches_per_query = viral_content_index.search_many(query_embeddings, 'blog', BLOG_EXAMPLES_K, BLOG_EXAMPLES_FETCH_K)
+        if matches_per_query is None:
+            if supabase is None:
+                return [{"error": "Supabase client not available for blog post search."} for _ in queries]
+            matches_per_query = [_search_viral_content_rpc(embedding) for embedding in query_embeddings]
+
+        return [_build_search_result(query, matches) for query, matches in zip(queries, matches_per_query)]
+
+    except Exception as e:
+        print(f"Error in search_blog_posts_batch tool: {e}")
+        return [{"error": f"Error retrieving blog posts: {str(e)} (Type: {type(e).__name__})"} for _ in queries]
+
+def _search_viral_content_rpc(query_embedding: list[float]) -> list[dict]:
+    # Use specific RPC function for viral content search
+    with timed("supabase", "rpc.search_viral_content"):
         response = supabase.rpc(
             'search_viral_content',
             {
                 'query_embedding': query_embedding,
-                'match_count': 5,
+                'match_count': BLOG_EXAMPLES_FETCH_K,
                 'type': 'blog'
             }
         ).execute()
-        
-        if not response.data:
-            return {"error": "No relevant blog posts found for this topic using the vector database."}
-        
-        blog_posts = []
-        for i, doc in enumerate(response.data[:3]):  # Limit to top 3 for conciseness
-            content = doc.get('content', 'No content available')
-            similarity = doc.get('similarity', 0)
-            target_audience = doc.get('target_audience', 'No target audience available')
-            media_description = doc.get('media_description', 'No media description available')
-            content_url = doc.get('content_url', 'No content URL available')
-            
-            post = {
-                "example_number": i + 1,
-                "content": content,
-                "similarity_score": similarity,
-                "target_audience": target_audience,
-                "media_description": media_description,
-                "content_url": content_url
-            }
-            
-            blog_posts.append(post)
-        
-        return {
-            "success": True,
-            "query": query,
-            "total_posts": len(blog_posts),
-            "blog_posts": blog_posts
+    return diversify_rows(query_embedding, response.data, BLOG_EXAMPLES_K)
+
+def _build_search_result(query: str, matches: list[dict]) -> dict:
+    if not matches:
+        return {"error": "No relevant blog posts found for this topic using the vector database."}
+
+    blog_posts = []
+    for i, doc in enumerate(matches[:BLOG_EXAMPLES_K]):
+        content = doc.get('content', 'No content available')
+        similarity = doc.get('similarity', 0)
+        target_audience = doc.get('target_audience', 'No target audience available')
+        media_description = doc.get('media_description', 'No media description available')
+        content_url = doc.get('content_url', 'No content URL available')
+
+        post = {
+            "example_number": i + 1,
+            "content": content,
+            "similarity_score": similarity,
+            "target_audience": target_audience,
+            "media_description": media_description,
+            "content_url": content_url
         }
 
-    except Exception as e:
-        print(f"Error in search_blog_posts tool: {e}")
-        print(f"Exception type: {type(e).__name__}")
-        import traceback
-        print(f"Full traceback: {traceback.format_exc()}")
-        return {"error": f"Error retrieving blog posts: {str(e)} (Type: {type(e).__name__})"} 
\ No newline at end of file
+        blog_posts.append(post)
+
+    return {
+        "success": True,
+        "query": query,
+        "total_posts": len(blog_posts),
+        "blog_posts": blog_posts
+    }
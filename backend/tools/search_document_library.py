@@ -1,8 +1,23 @@
 import os
+import asyncio
 from services.embeddings_service import shared_embeddings
 from services.supabase_service import supabase
+from services.metrics import timed
+from services import data_access
+from services.lexical_index import tenant_lexical_indexes, reciprocal_rank_fusion
+from services.signed_urls import signed_url_cache, document_storage_path
 
-# Search the internal PDF document library using Supabase vector similarity search.
+# Search the internal PDF document library: vector similarity (Supabase RPC) fused with
+# BM25 keyword matches over the tenant's chunks, so exact figures and names are not missed.
+# Hits are then collapsed per document and stitched with their neighbouring chunks into
+# contiguous passages, so the agent gets surrounding context without searching again.
+
+DOCUMENT_MATCH_COUNT = 3        # Segments returned to the agent
+DOCUMENT_CANDIDATE_COUNT = 10   # Candidates taken from each retriever before fusion
+DOCUMENT_SEGMENT_LIMIT = 5      # Most segments rendered (and signed) per result
+# Chunks fetched on each side of a hit (by chunk_index); 0 returns hits without neighbours
+DOCUMENT_NEIGHBOR_CHUNKS = int(os.getenv("DOCUMENT_NEIGHBOR_CHUNKS", "1"))
+DOCUMENT_CHUNK_OVERLAP = 200    # Matches CHUNK_OVERLAP in infra/pdf_uploader.py
 
 def search_document_library(query: str, tenant_id: str = "") -> dict:
     
@@ -19,108 +34,286 @@ def search_document_library(query: str, tenant_id: str = "") -> dict:
         # Generate embedding for the query
         query_embedding = shared_embeddings.embed_query(query)
         
-        # Use specific RPC function for document search with tenant filtering
-        response = supabase.rpc(
-            'search_internal_documents', 
-            {
-                'query_embedding': query_embedding,
-                'match_count': 3,
-                'input_tenant_id': tenant_id
-            }
-        ).execute()
-        
-        if not response.data:
-            return {"error": "No relevant documents found in the library for this topic."}
-        
-        document_segments = []
-        source_files = set()
+        # Served from the tenant's local vector index when enabled; otherwise the RPC
+        vector_matches = tenant_lexical_indexes.vector_search(tenant_id, query_embedding, DOCUMENT_CANDIDATE_COUNT)
+        if vector_matches is None:
+            # Use specific RPC function for document search with tenant filtering
+            with timed("supabase", "rpc.search_internal_documents"):
+                response = supabase.rpc(
+                    'search_internal_documents', 
+                    {
+                        'query_embedding': query_embedding,
+                        'match_count': DOCUMENT_CANDIDATE_COUNT,
+                        'input_tenant_id': tenant_id
+                    }
+                ).execute()
+            vector_matches = response.data
         
-        for i, doc in enumerate(response.data[:5]): 
-            filename = doc.get('file_name', doc.get('source_filename', 'Unknown file'))
-            document_id = doc.get('document_id')
-            tenant_id = doc.get('tenant_id')
-            similarity = doc.get('similarity', 0)
-            content = doc.get('content', 'No content available')
-            
-            # Add to source files set
-            source_files.add(filename)
-            
-            # Generate signed URL
-            document_url = None
-            url_error = None
-            if document_id and tenant_id:
-                try:
-                    signed_url, error = generate_signed_url_for_document(
-                        document_uuid=document_id,
-                        tenant_id=tenant_id,
-                        filename=filename,
-                        expiry_seconds=3600
-                    )
-                    
-                    if signed_url:
-                        document_url = signed_url
-                        print(f"Generated signed URL for {filename}")
-                    else:
-                        url_error = error
-                        print(f"[WARNING] Failed to generate signed URL for {filename}: {error}")
-                        
-                except Exception as e:
-                    url_error = f"Error generating URL: {str(e)}"
-                    print(f"[WARNING] Could not generate signed URL for {filename}: {e}")
-            else:
-                url_error = "Missing document metadata"
-            
-            # Build document segment
-            segment = {
-                "segment_number": i + 1,
-                "filename": filename,
-                "similarity_score": similarity,
-                "content": content,
-                "document_url": document_url,
-                "url_error": url_error if not document_url else None,
-                "document_id": document_id,
-                "tenant_id": tenant_id
-            }
-            
-            document_segments.append(segment)
-        
-        return {
-            "success": True,
-            "query": query,
-            "total_segments": len(document_segments),
-            "source_files": sorted(list(source_files)),
-            "document_segments": document_segments
-        }
+        fused, lexical = _fuse_with_lexical(query, tenant_id, vector_matches)
+        passages = _stitch_passages_many(tenant_id, [fused])[0]
+        return _build_search_result(query, passages, lexical=lexical)
 
     except Exception as e:
         print(f"Error in search_document_library tool: {e}")
         return {"error": f"Error retrieving documents from library: {str(e)}"} 
-    
 
 
-def generate_signed_url_for_document(document_uuid: str, tenant_id: str, filename: str, expiry_seconds: int = 3600) -> tuple[str | None, str | None]:
-    """ Generate a signed URL for a document using its UUID """
+async def search_document_library_batch(queries: list[str], tenant_id: str = "") -> list[dict]:
+    """
+    Run several document library searches from one model turn together: one embedding request
+    for all queries, then one local index pass (or the per-query RPCs concurrently). Returns one result dict per query, in order.
+    """
+    print(f"Tool: Searching document library with {len(queries)} batched queries for tenant: '{tenant_id}'")
+
+    if shared_embeddings is None:
+        return [{"error": "Embeddings model not available for document library search."} for _ in queries]
 
     try:
-        # Construct storage path
-        file_extension = os.path.splitext(filename)[1]
-        storage_path = f"{tenant_id}/{document_uuid}{file_extension}"
-        
-        # Storage configuration for signed URL generation
-        STORAGE_BUCKET = "files"
-        
-        response = supabase.storage.from_(STORAGE_BUCKET).create_signed_url(
-            path=storage_path,
-            expires_in=expiry_seconds
+        query_embeddings = await asyncio.to_thread(shared_embeddings.embed_queries, queries)
+
+        matches_per_query = await asyncio.to_thread(
+            tenant_lexical_indexes.vector_search_many, tenant_id, query_embeddings, DOCUMENT_CANDIDATE_COUNT
         )
+        if matches_per_query is None:
+            matches_per_query = await asyncio.gather(*(
+                data_access.call_rpc('search_internal_documents', {
+                    'query_embedding': query_embedding,
+                    'match_count': DOCUMENT_CANDIDATE_COUNT,
+                    'input_tenant_id': tenant_id
+                })
+                for query_embedding in query_embeddings
+            ))
+
+        fused_per_query = await asyncio.gather(*(
+            asyncio.to_thread(_fuse_with_lexical, query, tenant_id, matches)
+            for query, matches in zip(queries, matches_per_query)
+        ))
+
+        # One neighbour query and one signing call cover every query in the batch
+        passages_per_query = await asyncio.to_thread(_stitch_passages_many, tenant_id, [fused for fused, _ in fused_per_query])
+        all_segments = [doc for passages in passages_per_query for doc in passages[:DOCUMENT_SEGMENT_LIMIT]]
+        signed_urls = await asyncio.to_thread(_sign_segments, all_segments)
+
+        return [
+            _build_search_result(query, passages, signed_urls, lexical)
+            for query, passages, (_, lexical) in zip(queries, passages_per_query, fused_per_query)
+        ]
+
+    except Exception as e:
+        print(f"Error in search_document_library_batch tool: {e}")
+        return [{"error": f"Error retrieving documents from library: {str(e)}"} for _ in queries]
+
+def _fuse_with_lexical(query: str, tenant_id: str, vector_matches: list[dict]) -> tuple[list[dict], str]:
+    """
+    Reciprocal rank fusion of the vector matches with BM25 matches from the tenant's lexical index.
+    Returns (matches, lexical): lexical is "ok", or "cold" / "unavailable" when only vector
+    results were used (e.g. the tenant's index is still loading after a restart).
+    """
+    vector_matches = vector_matches or []
+    try:
+        lexical_matches = tenant_lexical_indexes.search(tenant_id, query, DOCUMENT_CANDIDATE_COUNT)
+    except Exception as e:
+        print(f"[WARNING] Lexical search unavailable, using vector results only: {e}")
+        return vector_matches[:DOCUMENT_MATCH_COUNT], "unavailable"
+    if lexical_matches is None:
+        return vector_matches[:DOCUMENT_MATCH_COUNT], "cold"
+    return reciprocal_rank_fusion([vector_matches, lexical_matches], limit=DOCUMENT_MATCH_COUNT), "ok"
+
+def _collapse_by_document(matches: list[dict]) -> list[dict]:
+    """Group hits by document_id, keeping the best-ranked hit's row and every hit's chunk_index."""
+    groups = {}
+    for doc in matches:
+        key = doc.get('document_id') or id(doc)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = {"row": doc, "hits": set()}
+        if doc.get('chunk_index') is not None:
+            group["hits"].add(doc['chunk_index'])
+    return list(groups.values())
+
+def _fetch_chunks(tenant_id: str, document_ids: set, chunk_indexes: set) -> list[dict]:
+    # One bulk query for every wanted chunk; rows outside each document's window are ignored
+    with timed("supabase", "internal_documents.select_neighbors"):
+        response = (
+            supabase.table('internal_documents')
+            .select('document_id, chunk_index, content')
+            .eq('tenant_id', tenant_id)
+            .in_('document_id', sorted(document_ids))
+            .in_('chunk_index', sorted(chunk_indexes))
+            .execute()
+        )
+    return response.data or []
+
+def _merge_overlapping(left: str, right: str, max_overlap: int = DOCUMENT_CHUNK_OVERLAP) -> str:
+    """Join consecutive chunks, dropping the text the splitter repeated at the boundary."""
+    # Very short matches are more likely coincidence ("." ending one chunk and starting the next)
+    for size in range(min(len(left), len(right), max_overlap), 7, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+def _stitch_passages_many(tenant_id: str, matches_per_query: list[list[dict]]) -> list[list[dict]]:
+    """
+    Collapse each query's hits by document and widen them with the DOCUMENT_NEIGHBOR_CHUNKS
+    chunks on either side, merged into contiguous passages. Neighbours for every query are
+    fetched in one query; if it fails, the hits are returned unstitched.
+    """
+    groups_per_query = [_collapse_by_document(matches or []) for matches in matches_per_query]
+
+    # Per query: document_id -> chunk indexes wanted, so a query never gets another query's window
+    windows_per_query = [{} for _ in groups_per_query]
+    for groups, windows in zip(groups_per_query, windows_per_query):
+        for group in groups:
+            row = group["row"]
+            total = row.get('total_chunks') or 0
+            for hit in group["hits"]:
+                low = max(0, hit - DOCUMENT_NEIGHBOR_CHUNKS)
+                high = hit + DOCUMENT_NEIGHBOR_CHUNKS + 1
+                if total:
+                    high = min(high, total)
+                windows.setdefault(row.get('document_id'), set()).update(range(low, high))
+
+    # Hits already carry their own content; only the missing neighbours are fetched
+    chunks = {
+        (doc.get('document_id'), doc.get('chunk_index')): doc.get('content', '')
+        for matches in matches_per_query for doc in (matches or [])
+    }
+    wanted = {
+        (document_id, index)
+        for windows in windows_per_query for document_id, indexes in windows.items() for index in indexes
+    }
+    if DOCUMENT_NEIGHBOR_CHUNKS > 0 and tenant_id and wanted - set(chunks):
+        try:
+            document_ids = {document_id for document_id, _ in wanted}
+            chunk_indexes = {index for _, index in wanted}
+            for row in _fetch_chunks(tenant_id, document_ids, chunk_indexes):
+                key = (row.get('document_id'), row.get('chunk_index'))
+                if key in wanted:
+                    chunks.setdefault(key, row.get('content', ''))
+        except Exception as e:
+            print(f"[WARNING] Could not fetch neighbouring chunks, returning hits unstitched: {e}")
+
+    passages_per_query = []
+    for groups, windows in zip(groups_per_query, windows_per_query):
+        passages = []
+        for group in groups:
+            row = group["row"]
+            document_id = row.get('document_id')
+            if not group["hits"]:
+                passages.append(row)
+                continue
+            indexes = sorted(index for index in windows.get(document_id, ()) if (document_id, index) in chunks)
+            # Split into runs of consecutive chunks; gaps between runs are marked with an ellipsis
+            runs = []
+            for index in indexes:
+                if runs and index == runs[-1][-1] + 1:
+                    runs[-1].append(index)
+                else:
+                    runs.append([index])
+            texts = []
+            for run in runs:
+                text = chunks[(document_id, run[0])]
+                for index in run[1:]:
+                    text = _merge_overlapping(text, chunks[(document_id, index)])
+                texts.append(text)
+            passages.append(dict(
+                row,
+                content="\n...\n".join(texts),
+                chunk_indexes=indexes,
+                hit_chunk_indexes=sorted(group["hits"]),
+            ))
+        passages_per_query.append(passages)
+    return passages_per_query
+
+def _segment_storage_path(doc: dict) -> str | None:
+    document_id = doc.get('document_id')
+    tenant_id = doc.get('tenant_id')
+    if not (document_id and tenant_id):
+        return None
+    filename = doc.get('file_name', doc.get('source_filename', 'Unknown file'))
+    return document_storage_path(tenant_id, document_id, filename)
+
+def _sign_segments(matches: list[dict]) -> dict:
+    """Signed URLs for the segments' documents: one storage call per batch, de-duplicated by document."""
+    paths = [path for path in map(_segment_storage_path, matches) if path]
+    if not paths:
+        return {}
+    return signed_url_cache.get_many(paths)
+
+def _build_search_result(query: str, matches: list[dict], signed_urls: dict | None = None, lexical: str = "ok") -> dict:
+    if not matches:
+        return {"error": "No relevant documents found in the library for this topic.", "lexical": lexical}
+    
+    document_segments = []
+    source_files = set()
+    
+    matches = matches[:DOCUMENT_SEGMENT_LIMIT]
+    if signed_urls is None:
+        signed_urls = _sign_segments(matches)
+    
+    for i, doc in enumerate(matches): 
+        filename = doc.get('file_name', doc.get('source_filename', 'Unknown file'))
+        document_id = doc.get('document_id')
+        tenant_id = doc.get('tenant_id')
+        similarity = doc.get('similarity', 0)
+        content = doc.get('content', 'No content available')
+        
+        # Add to source files set
+        source_files.add(filename)
         
-        if hasattr(response, 'error') and response.error:
-            return None, f"Failed to create signed URL: {response.error}"
+        # Look up the signed URL generated for this segment's document
+        document_url = None
+        url_error = None
+        path = _segment_storage_path(doc)
+        if path:
+            document_url, url_error = signed_urls.get(path, (None, "Signed URL not generated"))
+            if not document_url:
+                print(f"[WARNING] Failed to generate signed URL for {filename}: {url_error}")
+        else:
+            url_error = "Missing document metadata"
         
-        # Extract the signed URL from the response
-        signed_url = response.get('signedURL') if hasattr(response, 'get') else response
+        # Build document segment
+        segment = {
+            "segment_number": i + 1,
+            "filename": filename,
+            "similarity_score": similarity,
+            "content": content,
+            "chunk_indexes": doc.get('chunk_indexes', [doc.get('chunk_index')] if doc.get('chunk_index') is not None else []),
+            "document_url": document_url,
+            "url_error": url_error if not document_url else None,
+            "document_id": document_id,
+            "tenant_id": tenant_id
+        }
         
-        return signed_url, None
+        document_segments.append(segment)
+    
+    return {
+        "success": True,
+        "query": query,
+        "total_segments": len(document_segments),
+        "source_files": sorted(list(source_files)),
+        "document_segments": document_segments,
+        "lexical": lexical  # "cold" / "unavailable": keyword matching was skipped, exact figures may be missed
+    }
+
+
+def generate_signed_url_for_document(document_uuid: str, tenant_id: str, filename: str, expiry_seconds: int = 3600) -> tuple[str | None, str | None]:
+    """ Generate a signed URL for a document using its UUID """
+
+    try:
+        if expiry_seconds != signed_url_cache.expiry_seconds:
+            # Non-default expiries bypass the shared cache
+            storage_path = document_storage_path(tenant_id, document_uuid, filename)
+            with timed("supabase", "storage.create_signed_url"):
+                response = supabase.storage.from_("files").create_signed_url(
+                    path=storage_path,
+                    expires_in=expiry_seconds
+                )
+            if hasattr(response, 'error') and response.error:
+                return None, f"Failed to create signed URL: {response.error}"
+            return (response.get('signedURL') if hasattr(response, 'get') else response), None
+
+        return signed_url_cache.get(document_storage_path(tenant_id, document_uuid, filename))
         
     except Exception as e:
-        return None, f"Failed to generate signed URL: {e}"
\ No newline at end of file
+        return None, f"Failed to generate signed URL: {e}"
@@ -1,5 +1,14 @@
+import os
 from services.embeddings_service import shared_embeddings
 from services.supabase_service import supabase
+from services.metrics import timed
+from services.vector_index import viral_content_index, diversify_rows
+
+# Examples returned to the agent, and candidates fetched per search. Fetching more than
+# LINKEDIN_EXAMPLES_K re-selects the examples by MMR so they are not near-duplicates, and
+# lets the queries of one batched turn return different posts (even with one example each).
+LINKEDIN_EXAMPLES_K = int(os.getenv("LINKEDIN_EXAMPLES_K", "1"))
+LINKEDIN_EXAMPLES_FETCH_K = max(LINKEDIN_EXAMPLES_K, int(os.getenv("LINKEDIN_EXAMPLES_FETCH_K", "5")))
 
 def search_linkedin_posts(query: str) -> dict:
     """
@@ -8,59 +17,95 @@ def search_linkedin_posts(query: str) -> dict:
     Returns: dict: Dictionary containing viral post examples with metadata and content.
     """
     print(f"Tool: Searching for viral posts with query: '{query}'")
-    
+
     if shared_embeddings is None:
         return {"error": "Embeddings model not available for LinkedIn post search."}
-    
+
     if supabase is None:
         return {"error": "Supabase client not available for LinkedIn post search."}
-    
+
     try:
         # Generate embedding for the query
         query_embedding = shared_embeddings.embed_query(query)
-        
-        # Use specific RPC function for viral content search
+
+        # Served from the in-process replica when it is loaded; the RPC is the fallback
+        matches = viral_content_index.search(query_embedding, 'linkedin', LINKEDIN_EXAMPLES_K, LINKEDIN_EXAMPLES_FETCH_K)
+        if matches is None:
+            matches = _search_viral_content_rpc(query_embedding)
+
+        return _build_search_result(query, matches)
+
+    except Exception as e:
+        print(f"Error in search_linkedin_posts tool: {e}")
+        print(f"Exception type: {type(e).__name__}")
+        import traceback
+        print(f"Full traceback: {traceback.format_exc()}")
+        return {"error": f"Error retrieving viral posts: {str(e)} (Type: {type(e).__name__})"}
+
+def search_linkedin_posts_batch(queries: list[str]) -> list[dict]:
+    """
+    Run several LinkedIn post searches from one model turn together: one embedding request
+    for all queries and one index pass. Returns one result dict per query, in order.
+    """
+    print(f"Tool: Searching for viral posts with {len(queries)} batched queries")
+
+    if shared_embeddings is None:
+        return [{"error": "Embeddings model not available for LinkedIn post search."} for _ in queries]
+
+    try:
+        query_embeddings = shared_embeddings.embed_queries(queries)
+
+        matches_per_query = viral_content_index.search_many(query_embeddings, 'linkedin', LINKEDIN_EXAMPLES_K, LINKEDIN_EXAMPLES_FETCH_K)
+        if matches_per_query is None:
+            if supabase is None:
+                return [{"error": "Supabase client not available for LinkedIn post search."} for _ in queries]
+            matches_per_query = [_search_viral_content_rpc(embedding) for embedding in query_embeddings]
+
+        return [_build_search_result(query, matches) for query, matches in zip(queries, matches_per_query)]
+
+    except Exception as e:
+        print(f"Error in search_linkedin_posts_batch tool: {e}")
+        return [{"error": f"Error retrieving viral posts: {str(e)} (Type: {type(e).__name__})"} for _ in queries]
+
+def _search_viral_content_rpc(query_embedding: list[float]) -> list[dict]:
+    # Use specific RPC function for viral content search
+    with timed("supabase", "rpc.search_viral_content"):
         response = supabase.rpc(
             'search_viral_content',
             {
                 'query_embedding': query_embedding,
-                'match_count': 5,
+                'match_count': LINKEDIN_EXAMPLES_FETCH_K,
                 'type': 'linkedin'
             }
         ).execute()
-        
-        if not response.data:
-            return {"error": "No relevant viral posts found for this topic using the vector database."}
-        
-        viral_posts = []
-        for i, doc in enumerate(response.data[:1]):  # Limit to top 3 for conciseness
-            content = doc.get('content', 'No content available')
-            similarity = doc.get('similarity', 0)
-            target_audience = doc.get('target_audience', 'No target audience available')
-            media_description = doc.get('media_description', 'No media description available')
-            content_url = doc.get('content_url', 'No content URL available')
-            
-            post = {
-                "example_number": i + 1,
-                "content": content,
-                "similarity_score": similarity,
-                "target_audience": target_audience,
-                "media_description": media_description,
-                "content_url": content_url
-            }
-            
-            viral_posts.append(post)
-        
-        return {
-            "success": True,
-            "query": query,
-            "total_posts": len(viral_posts),
-            "viral_posts": viral_posts
+    return diversify_rows(query_embedding, response.data, LINKEDIN_EXAMPLES_K)
+
+def _build_search_result(query: str, matches: list[dict]) -> dict:
+    if not matches:
+        return {"error": "No relevant viral posts found for this topic using the vector database."}
+
+    viral_posts = []
+    for i, doc in enumerate(matches[:LINKEDIN_EXAMPLES_K]):
+        content = doc.get('content', 'No content available')
+        similarity = doc.get('similarity', 0)
+        target_audience = doc.get('target_audience', 'No target audience available')
+        media_description = doc.get('media_description', 'No media description available')
+        content_url = doc.get('content_url', 'No content URL available')
+
+        post = {
+            "example_number": i + 1,
+            "content": content,
+            "similarity_score": similarity,
+            "target_audience": target_audience,
+            "media_description": media_description,
+            "content_url": content_url
         }
 
-    except Exception as e:
-        print(f"Error in search_linkedin_posts tool: {e}")
-        print(f"Exception type: {type(e).__name__}")
-        import traceback
-        print(f"Full traceback: {traceback.format_exc()}")
-        return {"error": f"Error retrieving viral posts: {str(e)} (Type: {type(e).__name__})"} 
\ No newline at end of file
+        viral_posts.append(post)
+
+    return {
+        "success": True,
+        "query": query,
+        "total_posts": len(viral_posts),
+        "viral_posts": viral_posts
+    }
@@ -1,14 +1,15 @@
 import asyncio
 from langchain_core.messages import ToolMessage
+from services.metrics import timed
 
 # Import the direct tool functions from individual files
-from .search_document_library import search_document_library
-from .search_linkedin_posts import search_linkedin_posts
+from .search_document_library import search_document_library, search_document_library_batch
+from .search_linkedin_posts import search_linkedin_posts, search_linkedin_posts_batch
 from .web_search import web_search
 from .image_web_search import image_web_search
 from .generate_image import generate_image
 from .create_diagram import create_diagram
-from .search_blog_posts import search_blog_posts
+from .search_blog_posts import search_blog_posts, search_blog_posts_batch
 
 # Tool Definitions (kept the same for compatibility)
 search_document_library_mcp_tool_def = {
@@ -147,6 +148,9 @@ async def call_mcp_tools(llm_response, async_log_callback=None, tenant_id: str =
     """
     Run all requested tool calls concurrently and return formatted results.
     This streamlined version removes verbose logging and excessive error handling.
+    Each completed tool is reported to async_log_callback as soon as it finishes, with event_type="tool".
+    Repeated calls to the same search tool are coalesced into one batched search (one embedding
+    request and one retrieval pass) whose results fan back out to the individual ToolMessages.
     """
 
     if not llm_response.tool_calls:
@@ -163,8 +167,36 @@ async def call_mcp_tools(llm_response, async_log_callback=None, tenant_id: str =
         "search_blog_posts": search_blog_posts,
     }
 
+    # Search tools that accept a list of queries
+    batched_tool_function_map = {
+        "search_document_library": search_document_library_batch,
+        "search_linkedin_posts": search_linkedin_posts_batch,
+        "search_blog_posts": search_blog_posts_batch,
+    }
+
     generated_images = []
 
+    calls_by_tool = {}
+    for tool_call in llm_response.tool_calls:
+        if tool_call["name"] in batched_tool_function_map and "query" in tool_call.get("args", {}):
+            calls_by_tool.setdefault(tool_call["name"], []).append(tool_call)
+
+    async def run_batch(tool_name, tool_calls):
+        func = batched_tool_function_map[tool_name]
+        queries = [tc["args"]["query"] for tc in tool_calls]
+        kwargs = {"tenant_id": tenant_id} if tool_name == "search_document_library" else {}
+        if asyncio.iscoroutinefunction(func):
+            outputs = await func(queries, **kwargs)
+        else:
+            outputs = await asyncio.to_thread(func, queries, **kwargs)
+        return {tc["id"]: output for tc, output in zip(tool_calls, outputs)}
+
+    # One shared task per tool with several calls; each call awaits its own slice of the results
+    batches = {
+        tool_name: asyncio.ensure_future(run_batch(tool_name, tool_calls))
+        for tool_name, tool_calls in calls_by_tool.items() if len(tool_calls) > 1
+    }
+
     async def run_tool(tool_call):
         tool_name = tool_call["name"]
         args = tool_call["args"]
@@ -188,10 +220,13 @@ async def call_mcp_tools(llm_response, async_log_callback=None, tenant_id: str =
             kwargs = {"query": args["query"]}
 
         try:
-            if asyncio.iscoroutinefunction(func):
-                output = await func(**kwargs)
-            else:
-                output = await asyncio.to_thread(func, **kwargs)
+            async with timed("tool", tool_name):
+                if tool_name in batches:
+                    output = (await batches[tool_name])[tool_call["id"]]
+                elif asyncio.iscoroutinefunction(func):
+                    output = await func(**kwargs)
+                else:
+                    output = await asyncio.to_thread(func, **kwargs)
         except Exception as e:
             return ToolMessage(content=f"Error running '{tool_name}': {e}", tool_call_id=tool_call["id"])
 
@@ -201,7 +236,7 @@ async def call_mcp_tools(llm_response, async_log_callback=None, tenant_id: str =
         formatted = format_output_for_llm(tool_name, output) if isinstance(output, dict) else str(output)
         log_output = format_output_for_log(tool_name, output) if isinstance(output, dict) else str(output)
         if async_log_callback:
-            await async_log_callback(log_output)
+            await async_log_callback(log_output, event_type="tool")
 
         return ToolMessage(content=formatted, tool_call_id=tool_call["id"])
 
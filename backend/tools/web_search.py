@@ -1,5 +1,6 @@
 import os
 from linkup import LinkupClient
+from services.search_cache import cached_linkup_search
 
 def web_search(query: str) -> dict:
     """
@@ -8,7 +9,10 @@ def web_search(query: str) -> dict:
     Returns: dict: Dictionary containing web search results with titles, URLs, and content.
     """
     print(f"Tool: Searching web with query: '{query}'")
-    
+    return cached_linkup_search("web", query, _web_search_uncached)
+
+def _web_search_uncached(query: str) -> dict:
+    """Call Linkup directly, bypassing the result cache."""
     try:
         # Initialize Linkup client with API key from environment
         linkup_api_key = os.getenv('LINKUP_API_KEY')